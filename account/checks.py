@@ -0,0 +1,22 @@
+from django.core.checks import Warning, register
+
+from bookmarks.typing import settings
+
+
+@register()
+def check_google_oauth2(app_configs, **kwargs):
+    if (
+        settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY
+        and settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET
+    ):
+        return []
+    return [
+        Warning(
+            "Google sign-in is not configured.",
+            hint=(
+                "Set the GOOGLE_OAUTH2_KEY and GOOGLE_OAUTH2_SECRET environment "
+                "variables."
+            ),
+            id="account.W001",
+        )
+    ]
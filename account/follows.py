@@ -0,0 +1,185 @@
+"""
+Follows are rows of `Contact`, mirrored in Redis as two sets per user: the ids
+they follow and the ids of their followers. Membership checks, follower counts
+and following lists are then single reads, with no rows loaded.
+
+The sets are maintained by `follow()` and `unfollow()`. Complete sets hold a
+`SENTINEL` member, so a set Redis lost (or never had, for rows created any
+other way, e.g. by `seed_data`) is told apart from an empty one: it's rebuilt
+from `Contact` on first read. While Redis is unavailable, reads fall back to
+`Contact` and writes only change the rows.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+
+import redis
+from actions.utils import create_action
+from django.contrib.auth.models import AbstractUser
+
+from bookmarks.redis_client import r
+
+from . import suggestions
+from .models import Contact
+
+logger = logging.getLogger(__name__)
+
+# Member of every complete set. User ids start at 1.
+SENTINEL = 0
+
+
+def following_key(user_id: int) -> str:
+    return f"user:{user_id}:following"
+
+
+def followers_key(user_id: int) -> str:
+    return f"user:{user_id}:followers"
+
+
+def follow(user_from: AbstractUser, user_to: AbstractUser) -> bool:
+    """
+    Make `user_from` follow `user_to`. Return whether they didn't already.
+    """
+    _, created = Contact.objects.get_or_create(user_from=user_from, user_to=user_to)
+    create_action(user_from, "is following", user_to)
+    try:
+        # Even if they already did, to repair the sets. Adding to a missing
+        #   set creates it without `SENTINEL`: still rebuilt on first read.
+        pipe = r.pipeline(transaction=False)
+        pipe.sadd(following_key(user_from.id), user_to.id)
+        pipe.sadd(followers_key(user_to.id), user_from.id)
+        pipe.execute()
+        if created:
+            suggestions.update_suggestions(user_from.id, user_to.id, followed=True)
+    except redis.RedisError:
+        # The follow is saved, `rebuild_follows` brings the sets back in sync.
+        logger.exception("Couldn't mirror %s following %s", user_from, user_to)
+    return created
+
+
+def unfollow(user_from: AbstractUser, user_to: AbstractUser) -> bool:
+    """
+    Make `user_from` stop following `user_to`. Return whether they did.
+    """
+    deleted, _ = Contact.objects.filter(user_from=user_from, user_to=user_to).delete()
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.srem(following_key(user_from.id), user_to.id)
+        pipe.srem(followers_key(user_to.id), user_from.id)
+        pipe.execute()
+        if deleted:
+            suggestions.update_suggestions(user_from.id, user_to.id, followed=False)
+    except redis.RedisError:
+        logger.exception("Couldn't mirror %s unfollowing %s", user_from, user_to)
+    return bool(deleted)
+
+
+def forget_user(user_id: int):
+    """
+    Remove a deleted user from the sets of the users they followed or were
+    followed by, whose rows were deleted with theirs.
+    """
+    following = {int(id) for id in r.smembers(following_key(user_id))}
+    followers = {int(id) for id in r.smembers(followers_key(user_id))}
+    pipe = r.pipeline(transaction=False)
+    for id in following - {SENTINEL}:
+        pipe.srem(followers_key(id), user_id)
+    for id in followers - {SENTINEL}:
+        pipe.srem(following_key(id), user_id)
+    pipe.delete(following_key(user_id), followers_key(user_id))
+    pipe.execute()
+
+
+def rebuild_sets(user_ids: list[int]):
+    """
+    Rebuild the sets of `user_ids` from `Contact`, each batch in a single
+    transaction: readers never see a set half rebuilt.
+    """
+    following = {user_id: [] for user_id in user_ids}
+    followers = {user_id: [] for user_id in user_ids}
+    for user_from, user_to in Contact.objects.filter(
+        user_from_id__in=user_ids
+    ).values_list("user_from_id", "user_to_id"):
+        following[user_from].append(user_to)
+    for user_from, user_to in Contact.objects.filter(
+        user_to_id__in=user_ids
+    ).values_list("user_from_id", "user_to_id"):
+        followers[user_to].append(user_from)
+
+    pipe = r.pipeline()
+    for user_id in user_ids:
+        pipe.delete(following_key(user_id), followers_key(user_id))
+        pipe.sadd(following_key(user_id), SENTINEL, *following[user_id])
+        pipe.sadd(followers_key(user_id), SENTINEL, *followers[user_id])
+    pipe.execute()
+
+
+def read_sets(user_id: int, read: Callable, is_complete: Callable):
+    """
+    Return `read()`, after rebuilding the sets of `user_id` if `is_complete()`
+    tells they're missing. Return `None` if Redis is unavailable.
+    """
+    try:
+        result = read()
+        if not is_complete(result):
+            rebuild_sets([user_id])
+            result = read()
+        return result
+    except redis.RedisError:
+        logger.exception("Couldn't read the follows of user %s", user_id)
+        return None
+
+
+def is_following(user_id: int, other_id: int) -> bool:
+    return following_states(user_id, [other_id])[other_id]
+
+
+def following_states(user_id: int, other_ids: Iterable[int]) -> dict[int, bool]:
+    """
+    Return whether `user_id` follows each of `other_ids` (e.g. a page of
+    users), with a single `SMISMEMBER`.
+    """
+    other_ids = list(other_ids)
+    if not other_ids:
+        return {}
+    states = read_sets(
+        user_id,
+        lambda: r.smismember(following_key(user_id), [SENTINEL, *other_ids]),
+        lambda states: states[0],
+    )
+    if states is None:
+        followed = set(
+            Contact.objects.filter(
+                user_from_id=user_id, user_to_id__in=other_ids
+            ).values_list("user_to_id", flat=True)
+        )
+        return {id: id in followed for id in other_ids}
+    return {id: bool(state) for id, state in zip(other_ids, states[1:])}
+
+
+def following_ids(user_id: int) -> list[int]:
+    ids = read_sets(
+        user_id,
+        lambda: {int(id) for id in r.smembers(following_key(user_id))},
+        lambda ids: SENTINEL in ids,
+    )
+    if ids is None:
+        return list(
+            Contact.objects.filter(user_from_id=user_id).values_list(
+                "user_to_id", flat=True
+            )
+        )
+    return list(ids - {SENTINEL})
+
+
+def follower_count(user_id: int) -> int:
+    def read():
+        pipe = r.pipeline(transaction=False)
+        pipe.sismember(followers_key(user_id), SENTINEL)
+        pipe.scard(followers_key(user_id))
+        return pipe.execute()
+
+    result = read_sets(user_id, read, lambda result: result[0])
+    if result is None:
+        return Contact.objects.filter(user_to_id=user_id).count()
+    return result[1] - 1
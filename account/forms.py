@@ -1,6 +1,11 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image as PILImage
 
+from bookmarks.typing import settings
+
+from . import photos
 from .models import Profile
 
 # Retrieves the user model dynamically, since it could be a custom model.
@@ -53,3 +58,23 @@ class ProfileEditForm(forms.ModelForm):
         fields = ["date_of_birth", "photo"]
         # # ! Commented out to test for invalid input.
         # widgets = {"date_of_birth": forms.DateInput({"type": "date"})}
+
+    def clean_photo(self):
+        photo = self.cleaned_data["photo"]
+        # Only new uploads: not the current photo, or `False` to clear it.
+        if not isinstance(photo, UploadedFile):
+            return photo
+        try:
+            return photos.normalize_photo(photo)
+        except PILImage.DecompressionBombError:
+            raise forms.ValidationError(
+                "Upload a picture of at most "
+                f"{settings.PROFILE_PHOTO_MAX_PIXELS // 1_000_000} megapixels "
+                f"({settings.PROFILE_PHOTO_MAX_UNSCALED_PIXELS // 1_000_000} if "
+                "it isn't a JPEG)."
+            )
+        except OSError:
+            # Truncated or corrupt, only found out while decoding.
+            raise forms.ValidationError(
+                self.fields["photo"].error_messages["invalid_image"]
+            )
@@ -0,0 +1,41 @@
+from account import photos
+from account.models import Profile
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from PIL import Image as PILImage
+
+from bookmarks.media_gc import queue_deletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Normalize the profile photos uploaded before uploads were (downsized, "
+        "upright and without metadata), and queue the originals for deletion."
+    )
+
+    def handle(self, *args, **options):
+        done = skipped = failed = 0
+        profiles = Profile.objects.exclude(photo="").only("id", "user_id", "photo")
+        for profile in profiles.iterator(chunk_size=200):
+            original = profile.photo.name
+            try:
+                with default_storage.open(original, "rb") as file:
+                    if not photos.needs_normalizing(File(file)):
+                        skipped += 1
+                        continue
+                    photo = photos.normalize_photo(File(file, name=original))
+            except (OSError, PILImage.DecompressionBombError):
+                failed += 1
+                continue
+            profile.photo.save(photo.name, photo, save=False)
+            # Sends `post_save`, which re-renders the fragments showing it.
+            profile.save(update_fields=["photo"])
+            queue_deletion(original)
+            done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Normalized {done} photos ({skipped} already were, {failed} failed)."
+            )
+        )
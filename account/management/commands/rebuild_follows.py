@@ -0,0 +1,47 @@
+import time
+
+from account import follows
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Redis sets of every user's following and followers from "
+        "the `account_contact` table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users whose sets are rebuilt with two queries.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        user_ids = User.objects.order_by("id")
+        batch_size = options["batch_size"]
+        done = 0
+        last_id = 0
+        while True:
+            batch = list(
+                user_ids.filter(id__gt=last_id).values_list("id", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                break
+            follows.rebuild_sets(batch)
+            done += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f"{done} users done, last id {last_id}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt the follow sets of {done} users "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,82 @@
+"""
+Normalization of uploaded profile photos. They're only shown as small
+thumbnails, so they're stored downsized, upright (EXIF orientation applied)
+and without metadata, such as the location a phone recorded.
+"""
+
+import io
+import posixpath
+
+from django.core.files.base import ContentFile, File
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+from bookmarks.typing import settings
+
+
+def max_pixels(picture: PILImage.Image) -> int:
+    # Only JPEGs can be decoded downscaled (see `normalize_photo()`).
+    if picture.format == "JPEG":
+        return settings.PROFILE_PHOTO_MAX_PIXELS
+    return settings.PROFILE_PHOTO_MAX_UNSCALED_PIXELS
+
+
+def check_pixels(picture: PILImage.Image):
+    # Only the header was read: a small file can declare a huge picture,
+    #   whose decoding alone would exhaust the worker's memory.
+    width, height = picture.size
+    if width * height > max_pixels(picture):
+        raise PILImage.DecompressionBombError(
+            f"{width}x{height} pixels, more than {max_pixels(picture)}"
+        )
+
+
+def needs_normalizing(file: File) -> bool:
+    """
+    Whether the picture in `file` is larger than `PROFILE_PHOTO_MAX_SIZE` or
+    carries EXIF data (orientation included).
+    """
+    file.seek(0)
+    max_size = settings.PROFILE_PHOTO_MAX_SIZE
+    with PILImage.open(file) as picture:
+        result = max(picture.size) > max_size or bool(picture.getexif())
+    file.seek(0)
+    return result
+
+
+def normalize_photo(file: File) -> ContentFile:
+    """
+    Return the picture in `file` at most `PROFILE_PHOTO_MAX_SIZE` pixels wide
+    and high, re-encoded as JPEG (PNG if transparent). Raise Pillow's
+    `DecompressionBombError` for pictures of more than
+    `PROFILE_PHOTO_MAX_PIXELS` pixels (`PROFILE_PHOTO_MAX_UNSCALED_PIXELS` if
+    not JPEG), before decoding them.
+    """
+    file.seek(0)
+    max_size = settings.PROFILE_PHOTO_MAX_SIZE
+    with PILImage.open(file) as picture:
+        check_pixels(picture)
+        # Let the JPEG decoder downscale while decoding (by up to 8 times),
+        #   to no less than the maximum size.
+        picture.draft("RGB", (max_size, max_size))
+        picture = ImageOps.exif_transpose(picture)
+        has_alpha = picture.mode in ("RGBA", "LA") or "transparency" in picture.info
+        mode = "RGBA" if has_alpha else "RGB"
+        # `convert()` copies the picture even to the same mode.
+        if picture.mode != mode:
+            picture = picture.convert(mode)
+        picture.thumbnail((max_size, max_size), PILImage.Resampling.LANCZOS)
+
+    # Saved without `exif` or `icc_profile`: none of the original's metadata
+    #   is kept.
+    buffer = io.BytesIO()
+    if has_alpha:
+        format, extension = "PNG", "png"
+        picture.save(buffer, format, optimize=True)
+    else:
+        format, extension = "JPEG", "jpg"
+        picture.save(
+            buffer, format, quality=settings.PROFILE_PHOTO_QUALITY, optimize=True
+        )
+    stem = posixpath.splitext(posixpath.basename(file.name or "photo"))[0]
+    return ContentFile(buffer.getvalue(), name=f"{stem}.{extension}")
@@ -1,9 +1,16 @@
+from functools import partial
+
 from actions.utils import create_action
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from bookmarks.fragments import bump_versions
+from bookmarks.media_gc import queue_deletion
+
+from . import follows
 from .models import Profile
 
 User = get_user_model()
@@ -16,3 +23,31 @@ def user_created(sender, instance: AbstractUser, **kwargs):
 
     Profile.objects.get_or_create(user=instance)
     create_action(instance, "has created an account.")
+
+
+# Re-render the cached fragments showing the user's name or photo.
+@receiver(post_save, sender=User)
+def user_changed_fragments(
+    sender, instance: AbstractUser, update_fields=None, **kwargs
+):
+    # Logging in only saves `last_login`.
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    bump_versions(User, [instance.id])
+
+
+@receiver(post_save, sender=Profile)
+def profile_changed_fragments(sender, instance: Profile, **kwargs):
+    bump_versions(User, [instance.user_id])
+
+
+# Deleted by the `delete_media` worker (see `bookmarks.media_gc`).
+@receiver(post_delete, sender=Profile)
+def profile_deleted_photo(sender, instance: Profile, **kwargs):
+    queue_deletion(instance.photo.name)
+
+
+# Their `Contact` rows are deleted with them, without signals.
+@receiver(post_delete, sender=User)
+def user_deleted_follows(sender, instance: AbstractUser, **kwargs):
+    transaction.on_commit(partial(follows.forget_user, instance.id), robust=True)
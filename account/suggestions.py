@@ -0,0 +1,131 @@
+import heapq
+from collections import defaultdict
+
+from django.db.models import Count
+
+from bookmarks.redis_client import r
+
+from .models import Contact
+
+# Candidates kept per user. More than are shown, so incremental updates have
+#   room to reorder them between full recomputations.
+MAX_SUGGESTIONS = 100
+# Followers whose suggestions are updated on the request path when a user
+#   follows someone. Those of users with more are left to the next
+#   `compute_follow_suggestions` run, rather than make a follow O(followers).
+MAX_FOLLOWER_UPDATES = 1000
+
+
+def suggestions_key(user_id: int) -> str:
+    return f"user:{user_id}:follow_suggestions"
+
+
+def compute_suggestions(user_ids: list[int]) -> dict[int, dict[int, int]]:
+    """
+    Rank the second-degree connections of `user_ids` by how many of the users
+    they follow also follow them (mutual follows).
+    """
+    following = defaultdict(set)
+    for user_from, user_to in Contact.objects.filter(
+        user_from_id__in=user_ids
+    ).values_list("user_from_id", "user_to_id"):
+        following[user_from].add(user_to)
+
+    # Two hops in one grouped query: contacts made by the users that
+    #   `user_ids` follow, counted per (user, candidate).
+    counts = (
+        Contact.objects.filter(user_from__rel_to_set__user_from_id__in=user_ids)
+        .values_list("user_from__rel_to_set__user_from_id", "user_to_id")
+        .annotate(mutual=Count("*"))
+        .order_by()
+    )
+    candidates = defaultdict(dict)
+    for user_id, candidate_id, mutual in counts:
+        if candidate_id != user_id and candidate_id not in following[user_id]:
+            candidates[user_id][candidate_id] = mutual
+
+    return {
+        user_id: dict(
+            heapq.nlargest(
+                MAX_SUGGESTIONS, candidates[user_id].items(), key=lambda c: c[1]
+            )
+        )
+        for user_id in user_ids
+    }
+
+
+def store_suggestions(suggestions: dict[int, dict[int, int]]):
+    pipe = r.pipeline()
+    for user_id, candidates in suggestions.items():
+        pipe.delete(suggestions_key(user_id))
+        if candidates:
+            pipe.zadd(suggestions_key(user_id), candidates)
+    pipe.execute()
+
+
+def get_suggestions(user_id: int, limit: int = 5) -> list[tuple[int, int]]:
+    """
+    Return `(user_id, mutual_follows)` pairs, best first, with a single read.
+    """
+    return [
+        (int(id), int(mutual))
+        for id, mutual in r.zrange(
+            suggestions_key(user_id), 0, limit - 1, desc=True, withscores=True
+        )
+    ]
+
+
+def update_suggestions(user_from_id: int, user_to_id: int, followed: bool):
+    """
+    Adjust the stored suggestions after `user_from` (un)follows `user_to`.
+    """
+    delta = 1 if followed else -1
+    # Who both users follow now (after the change), in one query.
+    following, second_degree = set(), []
+    for from_id, to_id in Contact.objects.filter(
+        user_from_id__in=[user_from_id, user_to_id]
+    ).values_list("user_from_id", "user_to_id"):
+        if from_id == user_from_id:
+            following.add(to_id)
+        else:
+            # Everyone `user_to` follows is one more (or one less) mutual
+            #   follow away from `user_from`.
+            second_degree.append(to_id)
+    # And `user_to` is one more (or one less) mutual follow away from
+    #   everyone following `user_from`, unless they already follow `user_to`.
+    followers = list(
+        Contact.objects.filter(user_to_id=user_from_id)
+        .exclude(
+            user_from_id__in=Contact.objects.filter(user_to_id=user_to_id).values(
+                "user_from_id"
+            )
+        )
+        .values_list("user_from_id", flat=True)[: MAX_FOLLOWER_UPDATES + 1]
+    )
+    if len(followers) > MAX_FOLLOWER_UPDATES:
+        followers = []
+
+    pipe = r.pipeline()
+    key = suggestions_key(user_from_id)
+    for candidate_id in second_degree:
+        if candidate_id != user_from_id and candidate_id not in following:
+            pipe.zincrby(key, delta, candidate_id)
+    if followed:
+        pipe.zrem(key, user_to_id)
+    else:
+        # `user_to` is a candidate again, as much as the followed users say.
+        mutual = Contact.objects.filter(
+            user_from_id__in=following, user_to_id=user_to_id
+        ).count()
+        if mutual:
+            pipe.zadd(key, {user_to_id: mutual})
+    pipe.zremrangebyscore(key, "-inf", 0)
+    pipe.zremrangebyrank(key, 0, -(MAX_SUGGESTIONS + 1))
+
+    for follower_id in followers:
+        if follower_id != user_to_id:
+            follower_key = suggestions_key(follower_id)
+            pipe.zincrby(follower_key, delta, user_to_id)
+            pipe.zremrangebyscore(follower_key, "-inf", 0)
+            pipe.zremrangebyrank(follower_key, 0, -(MAX_SUGGESTIONS + 1))
+    pipe.execute()
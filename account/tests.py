@@ -1,3 +1,188 @@
-from django.test import TestCase
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+
+from bookmarks.redis_client import r
+from bookmarks.testing import FakeRedisMixin, redis_unavailable
+
+from . import follows, photos, suggestions
+from .models import Contact
+
+
+def picture_file(size: tuple[int, int], format: str, **params) -> ContentFile:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", size, (200, 120, 40)).save(buffer, format, **params)
+    return ContentFile(buffer.getvalue(), name=f"photo.{format.lower()}")
+
+
+@override_settings(
+    PROFILE_PHOTO_MAX_PIXELS=200 * 200,
+    PROFILE_PHOTO_MAX_UNSCALED_PIXELS=100 * 100,
+    PROFILE_PHOTO_MAX_SIZE=64,
+)
+class NormalizePhotoTests(SimpleTestCase):
+    def test_downsizes_and_strips_metadata(self):
+        exif = PILImage.Exif()
+        exif[0x010F] = "Camera maker"
+        # Rotated a quarter turn when displayed.
+        exif[0x0112] = 6
+        file = photos.normalize_photo(picture_file((160, 120), "JPEG", exif=exif))
+        self.assertEqual(file.name, "photo.jpg")
+        with PILImage.open(file) as picture:
+            self.assertEqual(picture.size, (48, 64))
+            self.assertFalse(picture.getexif())
+
+    def test_rejects_too_many_pixels(self):
+        with self.assertRaises(PILImage.DecompressionBombError):
+            photos.normalize_photo(picture_file((201, 200), "JPEG"))
+
+    def test_formats_decoded_at_full_size_are_held_to_less(self):
+        photos.normalize_photo(picture_file((200, 200), "JPEG"))
+        photos.normalize_photo(picture_file((100, 100), "PNG"))
+        with self.assertRaises(PILImage.DecompressionBombError):
+            photos.normalize_photo(picture_file((101, 100), "PNG"))
+
+
+class FollowTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        r.flushdb()
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+        self.carol = User.objects.create_user("carol")
+
+    def test_follow_and_unfollow(self):
+        self.assertTrue(follows.follow(self.alice, self.bob))
+        self.assertFalse(follows.follow(self.alice, self.bob))
+        self.assertTrue(follows.is_following(self.alice.id, self.bob.id))
+        self.assertEqual(
+            follows.following_states(self.alice.id, [self.bob.id, self.carol.id]),
+            {self.bob.id: True, self.carol.id: False},
+        )
+        self.assertEqual(follows.following_ids(self.alice.id), [self.bob.id])
+        self.assertEqual(follows.follower_count(self.bob.id), 1)
+
+        self.assertTrue(follows.unfollow(self.alice, self.bob))
+        self.assertFalse(follows.unfollow(self.alice, self.bob))
+        self.assertFalse(follows.is_following(self.alice.id, self.bob.id))
+        self.assertEqual(follows.following_ids(self.alice.id), [])
+        self.assertEqual(follows.follower_count(self.bob.id), 0)
+
+    def test_missing_sets_are_rebuilt(self):
+        # Rows Redis never saw, as after a deploy or a flush.
+        Contact.objects.create(user_from=self.alice, user_to=self.bob)
+        Contact.objects.create(user_from=self.carol, user_to=self.bob)
+        self.assertTrue(follows.is_following(self.alice.id, self.bob.id))
+        self.assertEqual(follows.follower_count(self.bob.id), 2)
+        self.assertEqual(follows.following_ids(self.carol.id), [self.bob.id])
+
+        r.flushdb()
+        # A follow adds to sets that are still missing the others.
+        follows.follow(self.carol, self.alice)
+        self.assertEqual(
+            sorted(follows.following_ids(self.carol.id)),
+            sorted([self.alice.id, self.bob.id]),
+        )
+        self.assertEqual(follows.follower_count(self.alice.id), 1)
+        self.assertEqual(follows.follower_count(self.bob.id), 2)
+
+    def test_redis_unavailable(self):
+        follows.follow(self.alice, self.bob)
+        with redis_unavailable(), self.assertLogs("account.follows", "ERROR"):
+            self.assertTrue(follows.follow(self.alice, self.carol))
+            self.assertTrue(follows.unfollow(self.alice, self.bob))
+            self.assertEqual(
+                follows.following_states(self.alice.id, [self.bob.id, self.carol.id]),
+                {self.bob.id: False, self.carol.id: True},
+            )
+            self.assertEqual(follows.following_ids(self.alice.id), [self.carol.id])
+            self.assertEqual(follows.follower_count(self.carol.id), 1)
+        self.assertTrue(
+            Contact.objects.filter(user_from=self.alice, user_to=self.carol).exists()
+        )
+
+    def test_views(self):
+        Contact.objects.create(user_from=self.carol, user_to=self.bob)
+        self.client.force_login(self.alice)
+        response = self.client.post(
+            reverse("user_follow"), {"id": self.bob.id, "action": "follow"}
+        )
+        self.assertEqual(response.json(), {"status": "ok"})
+        response = self.client.get(reverse("user_detail", args=["bob"]))
+        self.assertEqual(response.context["total_followers"], 2)
+
+        with redis_unavailable(), self.assertLogs("account.follows", "ERROR"):
+            response = self.client.post(
+                reverse("user_follow"), {"id": self.bob.id, "action": "unfollow"}
+            )
+            self.assertEqual(response.json(), {"status": "ok"})
+            response = self.client.get(reverse("user_detail", args=["bob"]))
+            self.assertEqual(response.context["total_followers"], 1)
+
+
+class SuggestionTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        r.flushdb()
+        self.users = {
+            name: User.objects.create_user(name) for name in ("a", "b", "c", "d", "e")
+        }
+        self.follow("a", "b", "c")
+        self.follow("b", "d", "e")
+        self.follow("c", "d")
+        self.follow("e", "a")
+
+    def follow(self, user_from: str, *users_to: str):
+        for user_to in users_to:
+            Contact.objects.create(
+                user_from=self.users[user_from], user_to=self.users[user_to]
+            )
+
+    def compute(self):
+        call_command("compute_follow_suggestions", stdout=io.StringIO())
+
+    def stored(self) -> dict[str, list[tuple[str, int]]]:
+        names = {user.id: name for name, user in self.users.items()}
+        return {
+            name: [
+                (names[id], mutual)
+                for id, mutual in suggestions.get_suggestions(user.id, limit=10)
+            ]
+            for name, user in self.users.items()
+        }
+
+    def test_ranked_by_mutual_follows(self):
+        self.compute()
+        self.assertEqual(
+            self.stored(),
+            {
+                "a": [("d", 2), ("e", 1)],
+                "b": [("a", 1)],
+                "c": [],
+                "d": [],
+                "e": [("c", 1), ("b", 1)],
+            },
+        )
+
+    def test_updates_match_a_full_run(self):
+        self.compute()
+        follows.follow(self.users["a"], self.users["d"])
+        follows.follow(self.users["c"], self.users["e"])
+        follows.unfollow(self.users["a"], self.users["b"])
+        updated = self.stored()
+
+        r.flushdb()
+        self.compute()
+        self.assertEqual(updated, self.stored())
+
+    @mock.patch.object(suggestions, "MAX_SUGGESTIONS", 1)
+    def test_followers_suggestions_are_trimmed(self):
+        self.compute()
+        self.assertEqual(r.zcard(suggestions.suggestions_key(self.users["e"].id)), 1)
+        # Adds `d` to the suggestions of `a`'s follower, `e`.
+        follows.follow(self.users["a"], self.users["d"])
+        self.assertEqual(r.zcard(suggestions.suggestions_key(self.users["e"].id)), 1)
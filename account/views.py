@@ -1,5 +1,3 @@
-from typing import cast
-
 from actions.models import Action
 from actions.utils import create_action
 from decouple import config
@@ -7,15 +5,17 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, get_user_model, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import AbstractUser
-from django.db.models.query import QuerySet
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.template.loader import render_to_string
 from django.utils.html import escape
 from django.views.decorators.http import require_POST
 
+from bookmarks.ratelimit import ratelimit
+
+from . import follows, suggestions
 from .forms import LoginForm, ProfileEditForm, UserEditForm, UserRegistrationForm
-from .models import Contact, Profile
+from .models import Profile
 
 User = get_user_model()
 
@@ -52,14 +52,24 @@ def dashboard(request):
 
     # Display all actions by default.
     actions = Action.objects.exclude(user=request.user)
-    following_ids = cast(QuerySet, request.user.following).values_list("id", flat=True)
+    following_ids = follows.following_ids(request.user.id)
     if following_ids:
         # If user is following others, retrieve only their actions.
         actions = actions.filter(user_id__in=following_ids)
-    # Eager loading `user` and `user__profile` related objects.
-    actions = actions.select_related("user", "user__profile").prefetch_related(
-        "target"
-    )[:10]
+    # Related objects are only loaded for the items missing from the fragment
+    #   cache (see `actions_tags.action_items`).
+    actions = actions[:10]
+
+    # Friends of friends, most mutual follows first.
+    suggested = suggestions.get_suggestions(request.user.id)
+    suggested_users = User.objects.select_related("profile").in_bulk(
+        [user_id for user_id, _ in suggested]
+    )
+    who_to_follow = [
+        (suggested_users[user_id], mutual)
+        for user_id, mutual in suggested
+        if user_id in suggested_users
+    ]
 
     return render(
         request,
@@ -68,10 +78,13 @@ def dashboard(request):
             "section": "dashboard",
             "bookmarklet_launcher": bookmarklet_launcher,
             "actions": actions,
+            "who_to_follow": who_to_follow,
         },
     )
 
 
+# Registering hashes a password, so limit sign-ups per address.
+@ratelimit(key="ip", rate="10/h", methods=["POST"])
 def register(request: HttpRequest):
     if request.method == "POST":
         user_form = UserRegistrationForm(request.POST)
@@ -118,9 +131,15 @@ def edit(request: HttpRequest):
 
 @login_required
 def user_list(request: HttpRequest):
-    users = User.objects.filter(is_active=True)
+    users = list(User.objects.filter(is_active=True).select_related("profile"))
+    following = follows.following_states(request.user.id, [user.id for user in users])
     return render(
-        request, "account/user/list.html", {"section": "people", "users": users}
+        request,
+        "account/user/list.html",
+        {
+            "section": "people",
+            "users": [(user, following[user.id]) for user in users],
+        },
     )
 
 
@@ -128,7 +147,14 @@ def user_list(request: HttpRequest):
 def user_detail(request: HttpRequest, username):
     user = get_object_or_404(User, username=username, is_active=True)
     return render(
-        request, "account/user/detail.html", {"section": "people", "user": user}
+        request,
+        "account/user/detail.html",
+        {
+            "section": "people",
+            "user": user,
+            "total_followers": follows.follower_count(user.id),
+            "following": follows.is_following(request.user.id, user.id),
+        },
     )
 
 
@@ -145,10 +171,9 @@ def user_follow(request: HttpRequest):
         user = User.objects.get(id=user_id)
 
         if action == "follow":
-            Contact.objects.get_or_create(user_from=request.user, user_to=user)
-            create_action(request.user, "is following", user)
+            follows.follow(request.user, user)
         else:
-            Contact.objects.filter(user_from=request.user, user_to=user).delete()
+            follows.unfollow(request.user, user)
 
         return JsonResponse({"status": "ok"})
     except User.DoesNotExist:
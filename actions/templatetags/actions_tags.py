@@ -0,0 +1,57 @@
+from actions.models import Action
+from django import template
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import prefetch_related_objects
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.timesince import timesince
+
+from bookmarks.fragments import Dependency, render_fragments
+
+register = template.Library()
+
+User = get_user_model()
+
+# Cached fragments can't hold the relative date, it's substituted for this
+#   comment on every render (`<` is escaped in any content, so it's unique).
+TIMESINCE_PLACEHOLDER = "<!--timesince-->"
+
+
+def action_dependencies(action: Action) -> list[Dependency]:
+    dependencies = [(User, action.user_id)]
+    if action.target_ct_id and action.target_id:
+        # Content types are cached, this doesn't query.
+        model = ContentType.objects.get_for_id(action.target_ct_id).model_class()
+        if model:
+            dependencies.append((model, action.target_id))
+    return dependencies
+
+
+def prefetch_actions(actions: list[Action]):
+    # Only the actions rendered again need their user and target.
+    prefetch_related_objects(actions, "user__profile", "target")
+
+
+@register.simple_tag
+def action_items(actions):
+    """
+    Render `actions`, from the fragment cache where possible.
+    """
+    actions = list(actions)
+    items = render_fragments(
+        "actions/action/detail.html",
+        "action",
+        actions,
+        action_dependencies,
+        prefetch_actions,
+    )
+    return mark_safe(
+        "".join(
+            item.replace(
+                TIMESINCE_PLACEHOLDER,
+                conditional_escape(f"{timesince(action.created)} ago"),
+            )
+            for action, item in zip(actions, items)
+        )
+    )
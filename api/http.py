@@ -0,0 +1,72 @@
+from functools import wraps
+
+import orjson
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control
+
+
+class OrjsonResponse(HttpResponse):
+    """
+    `JsonResponse` encoding with orjson, which is several times faster than
+    `json` and natively handles datetimes, dataclasses and NumPy types.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=orjson.dumps(data), **kwargs)
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_view(methods: list[str]):
+    """
+    Restrict a view to the given methods and logged-in users, answering errors
+    (including raised `ApiError`s) as JSON.
+    """
+    if "GET" in methods:
+        methods = [*methods, "HEAD"]
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request: HttpRequest, *args, **kwargs):
+            if request.method not in methods:
+                response = OrjsonResponse({"error": "Method not allowed."}, status=405)
+                response["Allow"] = ", ".join(methods)
+                return response
+            if not request.user.is_authenticated:
+                return OrjsonResponse({"error": "Authentication required."}, status=401)
+            try:
+                response = view_func(request, *args, **kwargs)
+            except ApiError as e:
+                return OrjsonResponse({"error": e.message}, status=e.status)
+            except Http404:
+                return OrjsonResponse({"error": "Not found."}, status=404)
+            if request.method in ("GET", "HEAD"):
+                # Cacheable by the client only, which must revalidate (cheap,
+                #   with `If-None-Match`) before reusing a response.
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return _wrapped_view
+
+    return decorator
+
+
+def parse_body(request: HttpRequest) -> dict:
+    """
+    Return the fields of a JSON or form-encoded request body.
+    """
+    if request.content_type == "application/json":
+        try:
+            data = orjson.loads(request.body or b"{}")
+        except orjson.JSONDecodeError:
+            raise ApiError("Invalid JSON body.")
+        if not isinstance(data, dict):
+            raise ApiError("The JSON body must be an object.")
+        return data
+    return request.POST.dict()
@@ -0,0 +1,79 @@
+import base64
+import binascii
+
+import orjson
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+
+from .http import ApiError
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, queryset: QuerySet, keys: list[str]) -> list:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        # Convert back from JSON, e.g. ISO 8601 strings to datetimes.
+        return [
+            queryset.model._meta.get_field(key.lstrip("-")).to_python(value)
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, binascii.Error, ValidationError):
+        raise ApiError("Invalid cursor.")
+
+
+def get_limit(request: HttpRequest) -> int:
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("Invalid limit.")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"The limit must be between 1 and {MAX_LIMIT}.")
+    return limit
+
+
+def page_queryset(request: HttpRequest, queryset: QuerySet, keys: list[str]):
+    """
+    Return the page of `queryset` requested by the `cursor` and `limit`
+    parameters, ordered by `keys` (which must end with a unique field).
+
+    Keyset pagination: the cursor holds the sort keys of the last row of the
+    previous page, so every page is an indexed range scan, however deep.
+    One extra row is fetched to tell whether there is a next page.
+    """
+    queryset = queryset.order_by(*keys)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        values = decode_cursor(cursor, queryset, keys)
+        # Rows after the cursor: the first key beyond it, or equal to it and
+        #   the second key beyond it, and so on.
+        after = Q()
+        for i, key in enumerate(keys):
+            lookup = "lt" if key.startswith("-") else "gt"
+            equal = {k.lstrip("-"): v for k, v in zip(keys[:i], values[:i])}
+            after |= Q(**equal, **{f"{key.lstrip('-')}__{lookup}": values[i]})
+        queryset = queryset.filter(after)
+    return queryset[: get_limit(request) + 1]
+
+
+def paginate(request: HttpRequest, queryset: QuerySet, keys: list[str]):
+    """
+    Return the rows of the requested page and the cursor of the next one.
+    """
+    limit = get_limit(request)
+    rows = list(page_queryset(request, queryset, keys))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, key.lstrip("-")) for key in keys])
+    return rows, next_cursor
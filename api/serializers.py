@@ -0,0 +1,90 @@
+from django.contrib.auth.models import AbstractUser
+from django.http import HttpRequest
+from images.models import Image
+
+from .http import ApiError
+
+
+def profile_photo(user: AbstractUser) -> str | None:
+    photo = user.profile.photo
+    return photo.url if photo else None
+
+
+def action_target(action) -> dict | None:
+    target = action.target
+    if isinstance(target, Image):
+        return {"type": "image", "id": target.id, "title": target.title}
+    if isinstance(target, AbstractUser):
+        return {"type": "user", "id": target.id, "username": target.username}
+    return None
+
+
+# Every field a resource can be serialized with, by name.
+IMAGE_FIELDS = {
+    "id": lambda image: image.id,
+    "title": lambda image: image.title,
+    "slug": lambda image: image.slug,
+    "url": lambda image: image.url,
+    "image": lambda image: image.image.url,
+    "width": lambda image: image.width,
+    "height": lambda image: image.height,
+    "dominant_color": lambda image: image.dominant_color or None,
+    "blurhash": lambda image: image.blurhash or None,
+    "description": lambda image: image.description,
+    "created": lambda image: image.created,
+    "total_likes": lambda image: image.total_likes,
+    "user": lambda image: image.user.username,
+}
+# The columns each image field is serialized from, hashed into ETags instead
+#   of the serialized fields (see `api.views.image_list_etag()`).
+IMAGE_COLUMNS = {
+    "id": ["id"],
+    "title": ["title"],
+    "slug": ["slug"],
+    "url": ["url"],
+    "image": ["image"],
+    "width": ["width"],
+    "height": ["height"],
+    "dominant_color": ["dominant_color"],
+    "blurhash": ["blurhash"],
+    "description": ["description"],
+    "created": ["created"],
+    "total_likes": ["total_likes"],
+    "user": ["user__username"],
+}
+USER_FIELDS = {
+    "id": lambda user: user.id,
+    "username": lambda user: user.username,
+    "first_name": lambda user: user.first_name,
+    "last_name": lambda user: user.last_name,
+    "photo": profile_photo,
+    "date_joined": lambda user: user.date_joined,
+    # Annotated by the views, only when requested.
+    "followers_count": lambda user: user.followers_count,
+}
+ACTION_FIELDS = {
+    "id": lambda action: action.id,
+    "user": lambda action: action.user.username,
+    "verb": lambda action: action.verb,
+    "target": action_target,
+    "created": lambda action: action.created,
+}
+
+
+def get_fields(request: HttpRequest, available: dict) -> list[str]:
+    """
+    Return the fields requested with `?fields=a,b` (sparse fieldset), or all
+    of them.
+    """
+    fields = request.GET.get("fields")
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}.")
+    return names
+
+
+def serialize(obj, fields: list[str], available: dict) -> dict:
+    return {name: available[name](obj) for name in fields}
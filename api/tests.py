@@ -0,0 +1,123 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from images.models import Image
+
+from bookmarks.testing import FakeRedisMixin
+
+from .pagination import MAX_LIMIT, encode_cursor
+
+
+class ImageListTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+        for i in range(5):
+            Image.objects.create(
+                user=cls.user,
+                title=f"Image {i}",
+                url=f"https://example.com/{i}.jpg",
+                image=f"images/{i}.jpg",
+            )
+        # Same timestamp, as for images bookmarked at once: only the id tells
+        #   them apart.
+        created = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+        Image.objects.update(created=created)
+        cls.url = reverse("api:v1:image_list")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_pages_through_equal_created(self):
+        ids, cursor = [], None
+        for _ in range(3):
+            params = {"limit": 2, "fields": "id"}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            ids += [image["id"] for image in page["results"]]
+            cursor = page["next_cursor"]
+        self.assertIsNone(cursor)
+        expected = Image.objects.order_by("-id").values_list("id", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_if_none_match(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        image = Image.objects.first()
+        self.client.post(reverse("api:v1:image_like", args=[image.id]))
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_with_backfilled_metadata(self):
+        image = Image.objects.first()
+        url = reverse("api:v1:image_detail", args=[image.id])
+        etag = self.client.get(url)["ETag"]
+        # As `backfill_metadata` does, without any signal.
+        Image.objects.filter(id=image.id).update(
+            width=640, height=480, dominant_color="#c97829"
+        )
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["width"], 640)
+
+    def test_etag_covers_every_field(self):
+        image = Image.objects.first()
+        url = reverse("api:v1:image_detail", args=[image.id])
+        etag = self.client.get(url)["ETag"]
+        for changes in [
+            {"title": "Renamed"},
+            {"description": "Described"},
+            {"url": "https://example.com/moved.jpg"},
+            {"slug": "renamed"},
+            {"image": "images/moved.jpg"},
+        ]:
+            with self.subTest(changes=changes):
+                Image.objects.filter(id=image.id).update(**changes)
+                response = self.client.get(url, headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+
+        User.objects.filter(id=self.user.id).update(username="renamed")
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"], "renamed")
+
+    def test_etag_covers_the_fields(self):
+        etag = self.client.get(self.url, {"fields": "id"})["ETag"]
+        response = self.client.get(
+            self.url, {"fields": "id,title"}, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("title", response.json()["results"][0])
+        # Fields that didn't change don't matter.
+        Image.objects.update(title="Renamed")
+        response = self.client.get(
+            self.url, {"fields": "id"}, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_cursor(self):
+        for cursor in ["not a cursor", encode_cursor([1]), encode_cursor(["x", 1])]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "Invalid cursor."})
+
+    def test_invalid_limit(self):
+        for limit in ["many", "0", str(MAX_LIMIT + 1)]:
+            with self.subTest(limit=limit):
+                response = self.client.get(self.url, {"limit": limit})
+                self.assertEqual(response.status_code, 400)
+
+    def test_authentication_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
@@ -0,0 +1,20 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = "api"
+
+# Breaking changes go to a new version, served alongside the previous ones.
+v1_patterns = [
+    path("images/", views.image_list, name="image_list"),
+    path("images/<int:id>/", views.image_detail, name="image_detail"),
+    path("images/<int:id>/like/", views.image_like, name="image_like"),
+    path("users/", views.user_list, name="user_list"),
+    path("users/<str:username>/", views.user_detail, name="user_detail"),
+    path("users/<str:username>/follow/", views.user_follow, name="user_follow"),
+    path("feed/", views.feed, name="feed"),
+]
+
+urlpatterns = [
+    path("v1/", include((v1_patterns, "v1"))),
+]
@@ -0,0 +1,213 @@
+import hashlib
+
+import orjson
+from account import follows
+from actions.models import Action
+from actions.utils import create_action
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.http import HttpRequest
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition, conditional_page
+from images.forms import ImageCreateForm
+from images.models import Image
+
+from .http import ApiError, OrjsonResponse, api_view, parse_body
+from .pagination import page_queryset, paginate
+from .serializers import (
+    ACTION_FIELDS,
+    IMAGE_COLUMNS,
+    IMAGE_FIELDS,
+    USER_FIELDS,
+    get_fields,
+    serialize,
+)
+
+User = get_user_model()
+
+# Sort keys of the paginated lists, newest first.
+IMAGE_KEYS = ["-created", "-id"]
+ACTION_KEYS = ["-created", "-id"]
+USER_KEYS = ["id"]
+
+
+def versions_etag(versions) -> str:
+    return f'"{hashlib.md5(orjson.dumps(versions)).hexdigest()}"'
+
+
+def image_version(fields: list[str]) -> list[str]:
+    """
+    Return the columns the requested `fields` are serialized from, so an
+    ETag changes whenever they do, e.g. when the metadata of an image is
+    backfilled without any signal.
+    """
+    columns = ["id"]
+    for field in fields:
+        columns += [c for c in IMAGE_COLUMNS[field] if c not in columns]
+    return columns
+
+
+def safe_method(request: HttpRequest) -> bool:
+    return request.method in ("GET", "HEAD")
+
+
+def image_queryset(request: HttpRequest, fields: list[str] | None = None):
+    images = Image.objects.all()
+    if username := request.GET.get("user"):
+        images = images.filter(user__username=username)
+    if fields is not None and "user" in fields:
+        images = images.select_related("user")
+    return images
+
+
+def feed_queryset(request: HttpRequest):
+    # Same activity as the dashboard: by followed users, or everyone else's.
+    actions = Action.objects.exclude(user=request.user)
+    following_ids = follows.following_ids(request.user.id)
+    if following_ids:
+        actions = actions.filter(user_id__in=following_ids)
+    return actions
+
+
+# ETags are computed from the columns of the requested fields only, so
+#   polling clients get a 304 without the models being built or serialized.
+#   The fields are hashed as well: a sparse fieldset is another representation.
+def image_list_etag(request: HttpRequest):
+    if not safe_method(request):
+        return None
+    fields = get_fields(request, IMAGE_FIELDS)
+    page = page_queryset(request, image_queryset(request), IMAGE_KEYS)
+    return versions_etag([fields, list(page.values_list(*image_version(fields)))])
+
+
+def image_detail_etag(request: HttpRequest, id: int):
+    fields = get_fields(request, IMAGE_FIELDS)
+    versions = (
+        image_queryset(request).filter(id=id).values_list(*image_version(fields))
+    ).first()
+    return versions_etag([fields, versions]) if versions else None
+
+
+def feed_etag(request: HttpRequest):
+    # Actions never change, their ids are their versions.
+    page = page_queryset(request, feed_queryset(request), ACTION_KEYS)
+    return versions_etag(list(page.values_list("id", flat=True)))
+
+
+@api_view(["GET", "POST"])
+@condition(etag_func=image_list_etag)
+def image_list(request: HttpRequest):
+    if request.method == "POST":
+        return image_create(request)
+    fields = get_fields(request, IMAGE_FIELDS)
+    images, next_cursor = paginate(request, image_queryset(request, fields), IMAGE_KEYS)
+    return OrjsonResponse(
+        {
+            "results": [serialize(image, fields, IMAGE_FIELDS) for image in images],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+def image_create(request: HttpRequest):
+    form = ImageCreateForm(data=parse_body(request))
+    if not form.is_valid():
+        return OrjsonResponse(
+            {"error": "Invalid image.", "fields": form.errors.get_json_data()},
+            status=400,
+        )
+    image = form.save(commit=False)
+    image.user = request.user
+    image.save()
+    create_action(request.user, "bookmarked image", image)
+    response = OrjsonResponse(
+        serialize(image, list(IMAGE_FIELDS), IMAGE_FIELDS), status=201
+    )
+    response["Location"] = reverse("api:v1:image_detail", args=[image.id])
+    return response
+
+
+@api_view(["GET"])
+@condition(etag_func=image_detail_etag)
+def image_detail(request: HttpRequest, id: int):
+    fields = get_fields(request, IMAGE_FIELDS)
+    image = get_object_or_404(image_queryset(request, fields), id=id)
+    return OrjsonResponse(serialize(image, fields, IMAGE_FIELDS))
+
+
+@api_view(["POST", "DELETE"])
+def image_like(request: HttpRequest, id: int):
+    image = get_object_or_404(Image, id=id)
+    if request.method == "POST":
+        image.users_like.add(request.user)
+        create_action(request.user, "likes", image)
+    else:
+        image.users_like.remove(request.user)
+    # Updated by the `m2m_changed` signal handler.
+    image.refresh_from_db(fields=["total_likes"])
+    return OrjsonResponse(
+        {"liked": request.method == "POST", "total_likes": image.total_likes}
+    )
+
+
+def user_queryset(fields: list[str]):
+    users = User.objects.filter(is_active=True)
+    if "photo" in fields:
+        users = users.select_related("profile")
+    if "followers_count" in fields:
+        users = users.annotate(followers_count=Count("rel_to_set"))
+    return users
+
+
+# Users have no version column, so their ETags hash the response content:
+#   that saves the transfer, not the work.
+@api_view(["GET"])
+@conditional_page
+def user_list(request: HttpRequest):
+    fields = get_fields(request, USER_FIELDS)
+    users, next_cursor = paginate(request, user_queryset(fields), USER_KEYS)
+    return OrjsonResponse(
+        {
+            "results": [serialize(user, fields, USER_FIELDS) for user in users],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@api_view(["GET"])
+@conditional_page
+def user_detail(request: HttpRequest, username: str):
+    fields = get_fields(request, USER_FIELDS)
+    user = get_object_or_404(user_queryset(fields), username=username)
+    return OrjsonResponse(serialize(user, fields, USER_FIELDS))
+
+
+@api_view(["POST", "DELETE"])
+def user_follow(request: HttpRequest, username: str):
+    user = get_object_or_404(User, username=username, is_active=True)
+    if user == request.user:
+        raise ApiError("You can't follow yourself.")
+    if request.method == "POST":
+        follows.follow(request.user, user)
+    else:
+        follows.unfollow(request.user, user)
+    return OrjsonResponse({"following": request.method == "POST"})
+
+
+@api_view(["GET"])
+@condition(etag_func=feed_etag)
+def feed(request: HttpRequest):
+    fields = get_fields(request, ACTION_FIELDS)
+    actions = feed_queryset(request)
+    if "user" in fields:
+        actions = actions.select_related("user")
+    if "target" in fields:
+        actions = actions.prefetch_related("target")
+    actions, next_cursor = paginate(request, actions, ACTION_KEYS)
+    return OrjsonResponse(
+        {
+            "results": [serialize(action, fields, ACTION_FIELDS) for action in actions],
+            "next_cursor": next_cursor,
+        }
+    )
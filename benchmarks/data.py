@@ -0,0 +1,92 @@
+import io
+import random
+from dataclasses import dataclass
+
+from account import follows
+from account.models import Contact
+from actions.utils import create_action
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AbstractUser
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from images.models import Image
+from PIL import Image as PILImage
+
+User = get_user_model()
+
+# Every generated user can log in with this password (e.g. from the load test).
+PASSWORD = "benchmark"
+USERNAME_PREFIX = "bench_user_"
+SAMPLE_IMAGE_NAME = "images/benchmarks/sample.jpg"
+
+
+@dataclass
+class Scale:
+    users: int = 50
+    follows_per_user: int = 10
+    images_per_user: int = 3
+    likes_per_image: int = 5
+
+
+def sample_image_name() -> str:
+    """
+    Store a single sample picture shared by every generated `Image`.
+    """
+    if not default_storage.exists(SAMPLE_IMAGE_NAME):
+        buffer = io.BytesIO()
+        PILImage.new("RGB", (640, 480), (200, 120, 40)).save(buffer, "JPEG")
+        default_storage.save(SAMPLE_IMAGE_NAME, ContentFile(buffer.getvalue()))
+    return SAMPLE_IMAGE_NAME
+
+
+def generate(scale: Scale = Scale(), seed: int = 0) -> list[AbstractUser]:
+    """
+    Populate the database with users, contacts, images, likes and actions.
+
+    Objects are created through the ORM one by one, so signal handlers fire and
+    the data looks like the data real user journeys produce.
+    """
+    rng = random.Random(seed)
+    # Hashing is deliberately slow, so hash the shared password only once.
+    password = make_password(PASSWORD)
+    offset = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+
+    users = []
+    for i in range(offset, offset + scale.users):
+        user = User(
+            username=f"{USERNAME_PREFIX}{i}",
+            first_name=f"User {i}",
+            email=f"{USERNAME_PREFIX}{i}@example.com",
+            password=password,
+        )
+        user.save()
+        users.append(user)
+
+    for user in users:
+        others = [other for other in users if other != user]
+        for followed in rng.sample(others, min(scale.follows_per_user, len(others))):
+            Contact.objects.create(user_from=user, user_to=followed)
+            create_action(user, "is following", followed)
+    # Mirrored at once, rather than one by one by `follows.follow()`.
+    follows.rebuild_sets([user.id for user in users])
+
+    image_name = sample_image_name()
+    for user in users:
+        for i in range(scale.images_per_user):
+            image = Image(
+                user=user,
+                title=f"Image {i} of {user.username}",
+                url=f"https://example.com/{user.username}/{i}.jpg",
+                description="Generated for benchmarking.",
+            )
+            image.image.name = image_name
+            image.save()
+            create_action(user, "bookmarked image", image)
+
+            likers = rng.sample(users, min(scale.likes_per_image, len(users)))
+            image.users_like.add(*likers)
+            for liker in likers:
+                create_action(liker, "likes", image)
+
+    return users
@@ -0,0 +1,146 @@
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import AbstractUser
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from images.models import Image
+
+
+@dataclass
+class Journey:
+    name: str
+    method: str
+    # Build the URL (and POST data) from the current user and iteration.
+    url: Callable[[AbstractUser, int], str]
+    data: Callable[[AbstractUser, int], dict] | None = None
+    # Budgets enforced by `benchmarks.tests`, at its (small) data scale.
+    #   Latency budgets are loose on purpose, so they only catch big regressions.
+    max_queries: int = 0
+    max_p95_ms: float = 0
+    status_codes: list[int] = field(default_factory=lambda: [200])
+
+
+def _first_image() -> Image:
+    return Image.objects.order_by("id").first()
+
+
+def _toggle(even: str, odd: str) -> Callable[[int], str]:
+    # Alternate between actions, so every run performs a real write.
+    return lambda i: even if i % 2 == 0 else odd
+
+
+_like_action = _toggle("like", "unlike")
+_follow_action = _toggle("follow", "unfollow")
+
+JOURNEYS = [
+    Journey(
+        "dashboard",
+        "get",
+        lambda user, i: reverse("dashboard"),
+        max_queries=10,
+        max_p95_ms=200,
+    ),
+    Journey(
+        "image_list",
+        "get",
+        lambda user, i: reverse("images:list"),
+        max_queries=8,
+        max_p95_ms=200,
+    ),
+    Journey(
+        "image_list_page",
+        "get",
+        lambda user, i: f"{reverse('images:list')}?images_only=1&page=2",
+        max_queries=8,
+        max_p95_ms=200,
+    ),
+    Journey(
+        "image_detail",
+        "get",
+        lambda user, i: _first_image().get_absolute_url(),
+        max_queries=15,
+        max_p95_ms=200,
+    ),
+    Journey(
+        "image_ranking",
+        "get",
+        lambda user, i: reverse("images:ranking"),
+        max_queries=5,
+        max_p95_ms=100,
+    ),
+    Journey(
+        "user_list",
+        "get",
+        lambda user, i: reverse("user_list"),
+        max_queries=10,
+        max_p95_ms=300,
+    ),
+    Journey(
+        "image_like",
+        "post",
+        lambda user, i: reverse("images:like"),
+        lambda user, i: {"id": _first_image().id, "action": _like_action(i)},
+        max_queries=15,
+        max_p95_ms=100,
+    ),
+    Journey(
+        "user_follow",
+        "post",
+        lambda user, i: reverse("user_follow"),
+        lambda user, i: {
+            "id": _first_image().user_id,
+            "action": _follow_action(i),
+        },
+        max_queries=10,
+        max_p95_ms=100,
+    ),
+]
+
+
+def run_journey(client: Client, user: AbstractUser, journey: Journey, repeat: int):
+    """
+    Run `journey` `repeat` times and summarize its latency and query count.
+    """
+    timings = []
+    queries = []
+    for i in range(repeat):
+        url = journey.url(user, i)
+        data = journey.data(user, i) if journey.data else None
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(client, journey.method)(url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code not in journey.status_codes:
+            raise AssertionError(
+                f"{journey.name} returned {response.status_code} for {url}"
+            )
+        queries.append(len(context.captured_queries))
+
+    timings.sort()
+    return {
+        "runs": repeat,
+        "queries": max(queries),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def run_journeys(user: AbstractUser, repeat: int = 20, names=None) -> dict:
+    client = Client()
+    client.force_login(user)
+    # Warm up caches (templates, URL resolvers, content types) before measuring.
+    for journey in JOURNEYS:
+        if names is None or journey.name in names:
+            run_journey(client, user, journey, 1)
+    return {
+        journey.name: run_journey(client, user, journey, repeat)
+        for journey in JOURNEYS
+        if names is None or journey.name in names
+    }
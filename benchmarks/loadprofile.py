@@ -0,0 +1,128 @@
+"""
+Scripted load profile for a running server, in the style of a locustfile.
+
+Each virtual user logs in as one of the `benchmarks.data` users and then keeps
+picking a task, weighted by `@task(weight)`, with a random think time between
+tasks. Run it with the `loadtest` management command.
+"""
+
+import random
+import re
+import time
+
+import requests
+
+from . import data
+
+IMAGE_URL_RE = re.compile(r'href="(/images/detail/\d+/[\w-]+/)"')
+USER_URL_RE = re.compile(r'href="(/account/users/[\w.@+-]+/)"')
+DATA_ID_RE = re.compile(r'data-id="(\d+)"')
+
+
+def task(weight: int = 1):
+    def decorator(func):
+        func.task_weight = weight
+        return func
+
+    return decorator
+
+
+class BookmarksUser:
+    # Seconds to wait between tasks.
+    wait_time = (0.5, 2.0)
+
+    def __init__(self, host: str, username: str, stats, rng: random.Random):
+        self.host = host.rstrip("/")
+        self.username = username
+        self.stats = stats
+        self.rng = rng
+        self.session = requests.Session()
+        self.image_urls: list[str] = []
+        self.user_urls: list[str] = []
+        self.tasks = [
+            getattr(self, name)
+            for name in dir(self)
+            if hasattr(getattr(self, name), "task_weight")
+        ]
+        self.weights = [t.task_weight for t in self.tasks]
+
+    def request(self, name: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.host + path, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(name, (time.perf_counter() - start) * 1000, ok)
+        return response
+
+    def post(self, name: str, path: str, data: dict):
+        headers = {"X-CSRFToken": self.session.cookies.get("csrftoken", "")}
+        return self.request(name, "POST", path, data=data, headers=headers)
+
+    def on_start(self):
+        # Fetch the login form first to get the CSRF cookie.
+        self.request("login_form", "GET", "/account/login/")
+        self.post(
+            "login",
+            "/account/login/",
+            {"username": self.username, "password": data.PASSWORD},
+        )
+
+    def wait(self):
+        time.sleep(self.rng.uniform(*self.wait_time))
+
+    def run_task(self):
+        self.rng.choices(self.tasks, self.weights)[0]()
+
+    @task(2)
+    def dashboard(self):
+        self.request("dashboard", "GET", "/account/")
+
+    @task(5)
+    def image_list(self):
+        response = self.request("image_list", "GET", "/images/")
+        if response is not None:
+            self.image_urls = IMAGE_URL_RE.findall(response.text) or self.image_urls
+
+    @task(3)
+    def image_list_page(self):
+        page = self.rng.randint(2, 5)
+        self.request("image_list_page", "GET", f"/images/?images_only=1&page={page}")
+
+    @task(4)
+    def image_detail(self):
+        if self.image_urls:
+            self.request("image_detail", "GET", self.rng.choice(self.image_urls))
+
+    @task(1)
+    def image_ranking(self):
+        self.request("image_ranking", "GET", "/images/ranking/")
+
+    @task(1)
+    def user_list(self):
+        response = self.request("user_list", "GET", "/account/users/")
+        if response is not None:
+            self.user_urls = USER_URL_RE.findall(response.text) or self.user_urls
+
+    @task(2)
+    def image_like(self):
+        if not self.image_urls:
+            return
+        image_id = self.rng.choice(self.image_urls).split("/")[3]
+        action = self.rng.choice(["like", "unlike"])
+        self.post("image_like", "/images/like/", {"id": image_id, "action": action})
+
+    @task(1)
+    def user_follow(self):
+        if not self.user_urls:
+            return
+        response = self.request("user_detail", "GET", self.rng.choice(self.user_urls))
+        match = DATA_ID_RE.search(response.text) if response is not None else None
+        if match:
+            action = self.rng.choice(["follow", "unfollow"])
+            self.post(
+                "user_follow",
+                "/account/users/follow/",
+                {"id": match.group(1), "action": action},
+            )
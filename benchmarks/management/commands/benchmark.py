@@ -0,0 +1,95 @@
+import json
+import platform
+import subprocess
+import tempfile
+from dataclasses import asdict
+
+import django
+from benchmarks import data
+from benchmarks.journeys import JOURNEYS, run_journeys
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the core user journeys against a throwaway test database "
+        "and write the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        scale = data.Scale()
+        parser.add_argument("--users", type=int, default=scale.users)
+        parser.add_argument("--follows", type=int, default=scale.follows_per_user)
+        parser.add_argument("--images", type=int, default=scale.images_per_user)
+        parser.add_argument("--likes", type=int, default=scale.likes_per_image)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--journey",
+            action="append",
+            choices=[journey.name for journey in JOURNEYS],
+            help="Only run the given journey (can be repeated).",
+        )
+        parser.add_argument(
+            "--output", help="Write the JSON results to a file instead of stdout."
+        )
+
+    def handle(self, *args, **options):
+        scale = data.Scale(
+            users=options["users"],
+            follows_per_user=options["follows"],
+            images_per_user=options["images"],
+            likes_per_image=options["likes"],
+        )
+
+        # Measure with `DEBUG = False`, as in production (this also keeps the
+        #   debug toolbar out of the timings).
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            # Keep generated media out of `MEDIA_ROOT`, and don't let the rate
+            #   limiter reject repeated requests.
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, RATELIMIT_ENABLED=False
+            ):
+                users = data.generate(scale, seed=options["seed"])
+                results = run_journeys(
+                    users[-1], repeat=options["repeat"], names=options["journey"]
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "scale": asdict(scale),
+            "repeat": options["repeat"],
+            "journeys": results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
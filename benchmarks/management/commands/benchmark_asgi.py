@@ -0,0 +1,312 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+from benchmarks import data
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from images.models import Image
+from PIL import Image as PILImage
+
+User = get_user_model()
+
+# Server of each mode, always with a single worker process, and whether the
+#   native async views (`ASYNC_VIEWS`) are enabled.
+MODES = {
+    # Sync views on a pool of 10 threads.
+    "wsgi": (
+        ["gunicorn", "bookmarks.wsgi:application", "--worker-class=gthread"]
+        + ["--threads=10", "--workers=1", "--bind=127.0.0.1:{port}"],
+        False,
+    ),
+    # Sync views under ASGI, each run by Django in a thread.
+    "asgi": (
+        ["uvicorn", "bookmarks.asgi:application", "--workers=1", "--port={port}"]
+        + ["--lifespan=off", "--no-access-log"],
+        False,
+    ),
+    "asgi-async": (
+        ["uvicorn", "bookmarks.asgi:application", "--workers=1", "--port={port}"]
+        + ["--lifespan=off", "--no-access-log"],
+        True,
+    ),
+}
+JOURNEYS = ["image_detail", "image_ranking", "image_create"]
+
+
+def start_upstream(delay: float) -> ThreadingHTTPServer:
+    """
+    Serve a JPEG after `delay` seconds, standing in for the (slow) websites
+    images are bookmarked from.
+    """
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (320, 240), (40, 120, 200)).save(buffer, "JPEG")
+    body = buffer.getvalue()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def count_threads(pid: int) -> int | None:
+    """
+    Count the threads of process `pid` and its children (Linux only).
+    """
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    total = 0
+    for stat in proc.glob("[0-9]*/stat"):
+        try:
+            # The parent pid is the 2nd field after the parenthesized name.
+            ppid = int(stat.read_text().rsplit(")", 1)[1].split()[1])
+            if stat.parent.name == str(pid) or ppid == pid:
+                total += len(list((stat.parent / "task").iterdir()))
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+def summarize(timings: list[float], failures: int, duration: float) -> dict:
+    timings = sorted(timings)
+    return {
+        "requests": len(timings),
+        "failures": failures,
+        "rps": round(len(timings) / duration, 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95)], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent requests a single worker serves under WSGI "
+        "(gunicorn), ASGI (uvicorn) with sync views and ASGI with the native async "
+        "views. Servers are started against the configured database, Redis included "
+        "(set REDIS_CLIENT_CLASS=fakeredis.FakeRedis, "
+        "REDIS_ASYNC_CLIENT_CLASS=fakeredis.FakeAsyncRedis and "
+        "CACHE_BACKEND=django.core.cache.backends.locmem.LocMemCache to run "
+        "without it). "
+        "The image_create journey adds images to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            action="append",
+            help="Concurrent requests (can be repeated, default: 1, 10 and 50).",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per measurement."
+        )
+        parser.add_argument("--mode", action="append", choices=list(MODES))
+        parser.add_argument("--journey", action="append", choices=JOURNEYS)
+        parser.add_argument(
+            "--upstream-delay",
+            type=float,
+            default=0.2,
+            help="Seconds the image host takes to answer (image_create).",
+        )
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--generate",
+            action="store_true",
+            help="Generate benchmark data in the configured database first.",
+        )
+        parser.add_argument("--output", help="Write the JSON results to a file.")
+
+    def handle(self, *args, **options):
+        if options["generate"]:
+            data.generate(data.Scale())
+        username = (
+            User.objects.filter(username__startswith=data.USERNAME_PREFIX)
+            .order_by("id")
+            .values_list("username", flat=True)
+            .first()
+        )
+        if username is None:
+            raise CommandError("No benchmark users found, run with --generate.")
+        images = Image.objects.order_by("id").values_list("id", "slug")[:100]
+        detail_urls = [reverse("images:detail", args=[id, slug]) for id, slug in images]
+        if not detail_urls:
+            raise CommandError("No images found, run with --generate.")
+
+        upstream = start_upstream(options["upstream_delay"])
+        self.upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}"
+        self.detail_urls = detail_urls
+        self.username = username
+        self.base_url = f"http://127.0.0.1:{options['port']}"
+
+        results = {}
+        try:
+            for mode in options["mode"] or list(MODES):
+                results[mode] = self.run_mode(mode, options)
+        finally:
+            upstream.shutdown()
+
+        report = {
+            "upstream_delay": options["upstream_delay"],
+            "requests": options["requests"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
+
+    def run_mode(self, mode: str, options) -> dict:
+        command, async_views = MODES[mode]
+        env = {
+            **os.environ,
+            "ASYNC_VIEWS": str(async_views),
+            # Measure as in production, and don't let the rate limiter reject
+            #   repeated requests.
+            "DEBUG": "False",
+            "RATELIMIT_ENABLED": "False",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m"]
+            + [arg.format(port=options["port"]) for arg in command]
+            + ["--log-level=warning"],
+            env=env,
+        )
+        try:
+            return asyncio.run(self.measure(server, mode, options))
+        finally:
+            server.terminate()
+            server.wait()
+
+    async def measure(self, server: subprocess.Popen, mode: str, options) -> dict:
+        results = {}
+        levels = options["concurrency"] or [1, 10, 50]
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=max(levels)),
+            timeout=60,
+        ) as client:
+            await self.wait_until_ready(server, client)
+            await self.log_in(client)
+            for journey in options["journey"] or JOURNEYS:
+                results[journey] = {}
+                for concurrency in levels:
+                    stats = await self.run_journey(
+                        server, client, journey, concurrency, options["requests"]
+                    )
+                    results[journey][concurrency] = stats
+                    # Progress on stderr, to keep stdout valid JSON.
+                    self.stderr.write(
+                        f"{mode} {journey} x{concurrency}: {stats['rps']} req/s, "
+                        f"p95 {stats['p95_ms']} ms, {stats['failures']} failures, "
+                        f"{stats['max_threads']} threads"
+                    )
+        return results
+
+    async def wait_until_ready(
+        self, server: subprocess.Popen, client: httpx.AsyncClient, timeout: float = 30
+    ):
+        deadline = time.monotonic() + timeout
+        while True:
+            if server.poll() is not None:
+                raise CommandError(f"The server exited with code {server.returncode}.")
+            try:
+                await client.get(reverse("login"))
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise CommandError("The server did not start.")
+                await asyncio.sleep(0.2)
+
+    async def log_in(self, client: httpx.AsyncClient):
+        # Fetch the login form first to get the CSRF cookie.
+        await client.get(reverse("login"))
+        await client.post(
+            reverse("login"),
+            data={"username": self.username, "password": data.PASSWORD},
+            headers={"X-CSRFToken": client.cookies["csrftoken"]},
+        )
+
+    def request(self, client: httpx.AsyncClient, journey: str, i: int):
+        if journey == "image_detail":
+            return client.get(self.detail_urls[i % len(self.detail_urls)])
+        if journey == "image_ranking":
+            return client.get(reverse("images:ranking"))
+        return client.post(
+            reverse("images:create"),
+            data={"title": f"Benchmark {i}", "url": f"{self.upstream_url}/{i}.jpg"},
+            headers={"X-CSRFToken": client.cookies["csrftoken"]},
+        )
+
+    async def run_journey(
+        self,
+        server: subprocess.Popen,
+        client: httpx.AsyncClient,
+        journey: str,
+        concurrency: int,
+        total: int,
+    ) -> dict:
+        timings = []
+        failures = 0
+        max_threads = None
+        pending = iter(range(total))
+        done = asyncio.Event()
+
+        # Threads are what waiting on I/O costs a sync worker, sample them.
+        async def sample_threads():
+            nonlocal max_threads
+            while not done.is_set():
+                threads = count_threads(server.pid)
+                if threads is not None:
+                    max_threads = max(max_threads or 0, threads)
+                await asyncio.sleep(0.05)
+
+        async def worker():
+            nonlocal failures
+            for i in pending:
+                start = time.perf_counter()
+                try:
+                    response = await self.request(client, journey, i)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                timings.append((time.perf_counter() - start) * 1000)
+                failures += not ok
+
+        sampler = asyncio.create_task(sample_threads())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+        done.set()
+        await sampler
+        return {
+            **summarize(timings, failures, duration),
+            "max_threads": max_threads,
+        }
@@ -0,0 +1,90 @@
+import json
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from images import phash
+
+
+def percentiles(timings: list[float]) -> dict:
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 4),
+        "p95_ms": round(timings[int(len(timings) * 0.95)] * 1000, 4),
+        "max_ms": round(timings[-1] * 1000, 4),
+    }
+
+
+class MultiIndex:
+    """
+    In-memory version of the block lookups `phash.find_near_duplicates` runs
+    against the database indexes.
+    """
+
+    def __init__(self):
+        self.tables = [defaultdict(list) for _ in range(phash.BLOCKS)]
+
+    def add(self, value: int, item):
+        for table, block in zip(self.tables, phash.split_blocks(value)):
+            table[block].append((value, item))
+
+    def search(self, value: int, max_distance: int):
+        radius = max_distance // phash.BLOCKS
+        matches = {}
+        for table, block in zip(self.tables, phash.split_blocks(value)):
+            for variant in phash.block_variants(block, radius):
+                for candidate, item in table.get(variant, ()):
+                    distance = phash.hamming(value, candidate)
+                    if distance <= max_distance:
+                        matches[item] = distance
+        return [(distance, item) for item, distance in matches.items()]
+
+
+class Command(BaseCommand):
+    help = "Benchmark Hamming-distance lookups over random perceptual hashes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=1000)
+        parser.add_argument("--distance", type=int, default=6)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON results to a file.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        hashes = [rng.getrandbits(64) for _ in range(options["count"])]
+        # Query with altered copies of stored hashes, like a re-encoded picture.
+        queries = []
+        for value in rng.sample(hashes, options["queries"]):
+            for bit in rng.sample(range(64), rng.randint(0, options["distance"])):
+                value ^= 1 << bit
+            queries.append(value)
+
+        report = {"count": options["count"], "distance": options["distance"]}
+        for name, index in [("multi_index", MultiIndex()), ("bk_tree", phash.BKTree())]:
+            start = time.perf_counter()
+            for id, value in enumerate(hashes):
+                index.add(value, id)
+            build = time.perf_counter() - start
+
+            timings = []
+            found = 0
+            for value in queries:
+                start = time.perf_counter()
+                found += bool(index.search(value, options["distance"]))
+                timings.append(time.perf_counter() - start)
+
+            report[name] = {
+                "build_s": round(build, 3),
+                "recall": found / len(queries),
+                **percentiles(timings),
+            }
+            self.stderr.write(f"{name}: {report[name]}")
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
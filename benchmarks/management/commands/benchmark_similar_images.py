@@ -0,0 +1,75 @@
+import json
+import resource
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from images import recommendations
+from scipy import sparse
+
+
+def peak_rss_mb() -> float:
+    # `ru_maxrss` is in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the similar images computation on a synthetic like matrix "
+        "(no database or Redis involved)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--likes", type=int, default=10_000_000)
+        parser.add_argument("--images", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("-k", type=int, default=10)
+        parser.add_argument("--block-size", type=int, default=1000)
+        parser.add_argument(
+            "--rows",
+            type=int,
+            help="Only compute neighbors of this many images (default: all).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON results to a file.")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        report = {"likes": options["likes"], "images": options["images"]}
+
+        start = time.perf_counter()
+        # Popularity is heavy-tailed: a few images and users get most likes.
+        image_rows = (rng.zipf(1.3, options["likes"]) % options["images"]).astype(
+            np.int32
+        )
+        user_columns = rng.integers(0, options["users"], options["likes"], np.int32)
+        data = np.ones(options["likes"], dtype=np.float32)
+        matrix = sparse.csr_matrix(
+            (data, (image_rows, user_columns)),
+            shape=(options["images"], options["users"]),
+        )
+        # Duplicate (image, user) pairs would be one like in the database.
+        matrix.data[:] = 1
+        del image_rows, user_columns, data
+        report["build_matrix_s"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        rows = np.arange(options["rows"] or options["images"])
+        neighbors = 0
+        for _, row_neighbors, _ in recommendations.top_k_similar(
+            matrix, options["k"], rows=rows, block_size=options["block_size"]
+        ):
+            neighbors += len(row_neighbors)
+        elapsed = time.perf_counter() - start
+        report["top_k_s"] = round(elapsed, 3)
+        report["rows"] = len(rows)
+        report["rows_per_s"] = round(len(rows) / elapsed, 1)
+        report["neighbors"] = neighbors
+        report["peak_rss_mb"] = peak_rss_mb()
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
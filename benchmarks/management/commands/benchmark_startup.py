@@ -0,0 +1,42 @@
+import json
+
+from benchmarks import startup
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the imports of a booting worker (with `-X importtime`, in a "
+        "fresh interpreter) and list the slowest ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--output", help="Write the JSON results to a file.")
+
+    def handle(self, *args, **options):
+        runs = [startup.measure_imports() for _ in range(options["runs"])]
+        # The fastest run, the others include more noise.
+        fastest = min(runs, key=startup.total_ms)
+        slowest_imports = sorted(
+            fastest, key=lambda time: time.cumulative_us, reverse=True
+        )[: options["top"]]
+
+        report = {
+            "total_ms": startup.total_ms(fastest),
+            "budget_ms": startup.STARTUP_BUDGET_MS,
+            "modules": len(fastest),
+            "slowest": [
+                {
+                    "name": time.name,
+                    "depth": time.depth,
+                    "ms": time.cumulative_us / 1000,
+                }
+                for time in slowest_imports
+            ],
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
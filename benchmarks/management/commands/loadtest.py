@@ -0,0 +1,113 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import data
+from benchmarks.loadprofile import BookmarksUser
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+User = get_user_model()
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings: dict[str, list[float]] = defaultdict(list)
+        self.failures: dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, elapsed_ms: float, ok: bool):
+        with self.lock:
+            self.timings[name].append(elapsed_ms)
+            if not ok:
+                self.failures[name] += 1
+
+    def summary(self, duration: float) -> dict:
+        summary = {}
+        for name, timings in sorted(self.timings.items()):
+            timings = sorted(timings)
+            summary[name] = {
+                "requests": len(timings),
+                "failures": self.failures[name],
+                "rps": round(len(timings) / duration, 3),
+                "p50_ms": round(timings[len(timings) // 2], 3),
+                "p95_ms": round(timings[int(len(timings) * 0.95)], 3),
+                "max_ms": round(timings[-1], 3),
+            }
+        return summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the scripted load profile against a running server. Start the server "
+        "without Redis or rate limits with: REDIS_CLIENT_CLASS=fakeredis.FakeRedis "
+        "CACHE_BACKEND=django.core.cache.backends.locmem.LocMemCache "
+        "RATELIMIT_ENABLED=False python manage.py runserver"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--users", type=int, default=10, help="Number of concurrent virtual users."
+        )
+        parser.add_argument(
+            "--duration", type=float, default=60, help="Test duration in seconds."
+        )
+        parser.add_argument(
+            "--generate",
+            action="store_true",
+            help="Generate benchmark data in the configured database first.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON results to a file.")
+
+    def handle(self, *args, **options):
+        if options["generate"]:
+            data.generate(data.Scale(users=max(options["users"], 50)))
+
+        usernames = list(
+            User.objects.filter(username__startswith=data.USERNAME_PREFIX)
+            .order_by("id")
+            .values_list("username", flat=True)[: options["users"]]
+        )
+        if not usernames:
+            raise CommandError("No benchmark users found, run with --generate.")
+
+        stats = Stats()
+        deadline = time.monotonic() + options["duration"]
+
+        def run(index: int, username: str):
+            rng = random.Random(options["seed"] + index)
+            user = BookmarksUser(options["host"], username, stats, rng)
+            user.on_start()
+            while time.monotonic() < deadline:
+                user.run_task()
+                user.wait()
+
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=run, args=(i, username))
+            for i, username in enumerate(usernames)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        report = {
+            "host": options["host"],
+            "users": len(usernames),
+            "duration": options["duration"],
+            "requests": stats.summary(time.monotonic() - start),
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
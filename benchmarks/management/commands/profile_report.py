@@ -0,0 +1,78 @@
+import statistics
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import orjson
+from django.core.management.base import BaseCommand
+
+from bookmarks.typing import settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregate the request profiles of `PROFILING_DIR` into a report of the "
+        "hottest functions, and optionally a single collapsed stacks file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url-name", help="Only the profiles of a URL name.")
+        parser.add_argument("--top", type=int, default=25)
+        parser.add_argument(
+            "--output", help="Write the merged collapsed stacks (for a flamegraph)."
+        )
+
+    def handle(self, *args, **options):
+        stacks = Counter()
+        requests = defaultdict(list)
+        for path in sorted(Path(settings.PROFILING_DIR).glob("*.collapsed")):
+            tags_path = path.with_suffix(".json")
+            if not tags_path.exists():
+                continue
+            tags = orjson.loads(tags_path.read_bytes())
+            if options["url_name"] and tags["url_name"] != options["url_name"]:
+                continue
+            requests[tags["url_name"]].append(tags)
+            for line in path.read_text().splitlines():
+                stack, _, count = line.rpartition(" ")
+                stacks[stack] += int(count)
+
+        if not stacks:
+            self.stderr.write("No profiles.")
+            return
+
+        self.stdout.write("Requests:")
+        for url_name, tags in sorted(requests.items(), key=lambda item: str(item[0])):
+            durations = [t["duration_ms"] for t in tags]
+            queries = [t["queries"] for t in tags]
+            self.stdout.write(
+                f"  {url_name}: {len(tags)} profiled, median "
+                f"{statistics.median(durations):.1f} ms, max {max(durations):.1f} "
+                f"ms, {statistics.mean(queries):.1f} queries"
+            )
+
+        # Self: samples where the function was running. Total: where it was
+        #   on the stack, counted once per stack (recursion included).
+        self_samples, total_samples = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+        total = stacks.total()
+
+        self.stdout.write(f"\nHottest functions by self time ({total} samples):")
+        self.stdout.write(f"  {'self %':>7} {'total %':>7}  function")
+        for frame, count in self_samples.most_common(options["top"]):
+            self.stdout.write(
+                f"  {100 * count / total:7.1f} "
+                f"{100 * total_samples[frame] / total:7.1f}  {frame}"
+            )
+
+        self.stdout.write(f"\nHottest functions by total time ({total} samples):")
+        self.stdout.write(f"  {'total %':>7}  function")
+        for frame, count in total_samples.most_common(options["top"]):
+            self.stdout.write(f"  {100 * count / total:7.1f}  {frame}")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in stacks.items())
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bookmarks import profiling
+from bookmarks.typing import settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a signed token to send in the `X-Profile` header of requests to "
+        "profile, valid for `PROFILING_TOKEN_MAX_AGE` seconds."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{profiling.HEADER}: {profiling.make_token()}")
+        self.stderr.write(
+            f"Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds, profiles are "
+            f"written to {settings.PROFILING_DIR}."
+        )
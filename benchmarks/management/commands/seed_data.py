@@ -0,0 +1,302 @@
+import random
+import time
+from itertools import islice
+
+from account import follows
+from account.models import Contact, Profile
+from actions.models import Action
+from benchmarks import data
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Model
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from images import metadata, phash, search, variants
+from images.models import Image
+
+from bookmarks.backfill import backfill_count
+
+User = get_user_model()
+Like = Image.users_like.through
+
+USERNAME_PREFIX = "seed_user_"
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def insert_rows(model: type[Model], fields: list[str], rows, ignore_conflicts=False):
+    """
+    Insert tuples of already prepared values with a single `executemany()`.
+
+    Unlike `bulk_create()`, no model instance is built per row, which is where
+    most of the time goes when loading millions of rows.
+    """
+    quote = connection.ops.quote_name
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=on_conflict)} "
+        f"{quote(model._meta.db_table)} ({', '.join(map(quote, columns))}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"{connection.ops.on_conflict_suffix_sql([], on_conflict, [], [])}"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk load a large synthetic dataset of users, follows, images, likes "
+        "and actions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--follows-per-user", type=int, default=20)
+        parser.add_argument("--images-per-user", type=int, default=2)
+        parser.add_argument("--likes-per-image", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        # Every row shares one timestamp, prepared for the database only once.
+        self.now = Action._meta.get_field("created").get_db_prep_save(
+            timezone.now(), connection
+        )
+        self.user_ct_id = ContentType.objects.get_for_model(User).id
+        self.image_ct_id = ContentType.objects.get_for_model(Image).id
+
+        # Rows are inserted with raw SQL, which sends no signals: each stage
+        #   also does what their handlers would have, set-based.
+        user_ids = self.stage("users", self.create_users, options["users"])
+        self.stage(
+            "follows", self.create_follows, user_ids, options["follows_per_user"]
+        )
+        image_ids = self.stage(
+            "images", self.create_images, user_ids, options["images_per_user"]
+        )
+        self.stage("search index", self.index_images, image_ids)
+        self.stage(
+            "likes",
+            self.create_likes,
+            user_ids,
+            image_ids,
+            options["likes_per_image"],
+        )
+        self.stage("counters", self.update_counters)
+        self.stage("follow sets", self.rebuild_follow_sets, user_ids)
+
+    def stage(self, name: str, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f"{name}: done in {time.perf_counter() - start:.1f}s")
+        return result
+
+    def batches(self, name: str, rows, total: int):
+        """
+        Yield `rows` in batches, each handled in its own transaction.
+        """
+        done = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                yield batch
+            done += len(batch)
+            self.stdout.write(f"  {name}: {done}/{total}", ending="\r")
+            self.stdout.flush()
+        self.stdout.write("")
+
+    def create_users(self, total: int) -> list[int]:
+        # Hashing is deliberately slow, so every user shares one hash.
+        password = make_password(data.PASSWORD)
+        offset = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        last_id = User.objects.order_by("-id").values_list("id", flat=True).first()
+
+        fields = [
+            "username",
+            "first_name",
+            "last_name",
+            "email",
+            "password",
+            "is_superuser",
+            "is_staff",
+            "is_active",
+            "date_joined",
+        ]
+        rows = (
+            (
+                f"{USERNAME_PREFIX}{i}",
+                f"User {i}",
+                "",
+                f"{USERNAME_PREFIX}{i}@example.com",
+                password,
+                False,
+                False,
+                True,
+                self.now,
+            )
+            for i in range(offset, offset + total)
+        )
+        for batch in self.batches("users", rows, total):
+            insert_rows(User, fields, batch)
+
+        # Read the new ids back instead of keeping every `User` object in memory.
+        user_ids = list(
+            User.objects.filter(
+                id__gt=last_id or 0, username__startswith=USERNAME_PREFIX
+            )
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        # What `account.signals.user_created` does per user, done in bulk.
+        for batch in self.batches("profiles and actions", user_ids, total):
+            insert_rows(Profile, ["user", "photo"], [(id, "") for id in batch])
+            insert_rows(
+                Action,
+                ["user", "verb", "created"],
+                [(id, "has created an account.", self.now) for id in batch],
+            )
+        return user_ids
+
+    def create_follows(self, user_ids: list[int], per_user: int):
+        per_user = min(per_user, len(user_ids) - 1)
+
+        def pairs():
+            for user_id in user_ids:
+                # Sample one extra user in case the user picks themselves.
+                sample = self.rng.sample(user_ids, per_user + 1)
+                followed_ids = [id for id in sample if id != user_id][:per_user]
+                for followed_id in followed_ids:
+                    yield user_id, followed_id
+
+        total = len(user_ids) * per_user
+        for batch in self.batches("follows", pairs(), total):
+            insert_rows(
+                Contact,
+                ["user_from", "user_to", "created"],
+                [(user_from, user_to, self.now) for user_from, user_to in batch],
+            )
+            insert_rows(
+                Action,
+                ["user", "verb", "created", "target_ct", "target_id"],
+                [
+                    (user_from, "is following", self.now, self.user_ct_id, user_to)
+                    for user_from, user_to in batch
+                ],
+            )
+
+    def rebuild_follow_sets(self, user_ids: list[int]):
+        for batch in batched(user_ids, self.batch_size):
+            follows.rebuild_sets(batch)
+
+    def sample_image_fields(self) -> dict:
+        """
+        Return the values of the fields extracted from the picture at ingest,
+        the same for every image: they all share one file, so it's read once.
+        """
+        image_name = data.sample_image_name()
+        with default_storage.open(image_name, "rb") as file:
+            values = metadata.extract_metadata(file)
+            values["variants"] = variants.generate_variants(file)
+        values["variants_digest"] = variants.variants_digest(values["variants"])
+        values["image"] = image_name
+        return {
+            name: Image._meta.get_field(name).get_db_prep_save(value, connection)
+            for name, value in values.items()
+        }
+
+    def random_hash_fields(self) -> list:
+        # Random hashes, as if every image were a different picture: a single
+        #   shared one would put every image in the same block index buckets.
+        value = self.rng.getrandbits(64)
+        return [phash.to_signed(value), *phash.split_blocks(value)]
+
+    def create_images(self, user_ids: list[int], per_user: int) -> list[int]:
+        shared = self.sample_image_fields()
+        last_id = Image.objects.order_by("-id").values_list("id", flat=True).first()
+
+        fields = [
+            "user",
+            "title",
+            "slug",
+            "url",
+            "description",
+            "created",
+            "total_likes",
+            *phash.FIELDS,
+            *shared,
+        ]
+        rows = (
+            (
+                user_id,
+                f"Image {i} of user {user_id}",
+                # `Image.save()` isn't called, so set the slug here.
+                f"image-{i}-of-user-{user_id}",
+                f"https://example.com/{user_id}/{i}.jpg",
+                "Generated by seed_data.",
+                self.now,
+                0,
+                *self.random_hash_fields(),
+                *shared.values(),
+            )
+            for user_id in user_ids
+            for i in range(per_user)
+        )
+        total = len(user_ids) * per_user
+        for batch in self.batches("images", rows, total):
+            insert_rows(Image, fields, batch)
+
+        image_ids = Image.objects.filter(id__gt=last_id or 0).values_list(
+            "id", "user_id"
+        )
+        for batch in self.batches(
+            "image actions", image_ids.iterator(chunk_size=self.batch_size), total
+        ):
+            insert_rows(
+                Action,
+                ["user", "verb", "created", "target_ct", "target_id"],
+                [
+                    (user_id, "bookmarked image", self.now, self.image_ct_id, id)
+                    for id, user_id in batch
+                ],
+            )
+        return list(image_ids.order_by("id").values_list("id", flat=True))
+
+    def index_images(self, image_ids: list[int]):
+        if not image_ids:
+            return
+        # What `images.signals.image_saved` does per image.
+        rows = (
+            Image.objects.filter(id__gte=image_ids[0])
+            .order_by("id")
+            .values_list("id", "title", "description", "url")
+        )
+        for batch in self.batches(
+            "search index", rows.iterator(chunk_size=self.batch_size), len(image_ids)
+        ):
+            search.index_images(batch)
+
+    def create_likes(self, user_ids: list[int], image_ids: list[int], per_image: int):
+        per_image = min(per_image, len(user_ids))
+        rows = (
+            (image_id, user_id)
+            for image_id in image_ids
+            for user_id in self.rng.sample(user_ids, per_image)
+        )
+        total = len(image_ids) * per_image
+        for batch in self.batches("likes", rows, total):
+            insert_rows(Like, ["image", "user"], batch, ignore_conflicts=True)
+
+    def update_counters(self):
+        # What `images.signals.users_like_changed` does per like, done for
+        #   every image in a single `UPDATE`.
+        backfill_count(Image, "total_likes", Like, "image", batch_size=None)
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookmarks.replicas import replicate
+from bookmarks.typing import settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into the `DATABASE_REPLICA_FILES`, "
+        "once or every `--interval` seconds: replicas lagging that much behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float)
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            self.stderr.write("No replicas, set DATABASE_REPLICA_FILES.")
+            return
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                replicate(alias)
+            self.stdout.write(f"Replicated to {', '.join(settings.DATABASE_REPLICAS)}")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
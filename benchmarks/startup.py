@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+from bookmarks.typing import settings
+
+# What a worker runs before serving its first request: the application
+#   (settings, apps and middleware), then the URLconf, which imports every view.
+WORKER_BOOT = (
+    "import bookmarks.wsgi; from django.urls import get_resolver; "
+    "get_resolver().url_patterns"
+)
+
+# Enforced by `benchmarks.tests`. Loose on purpose, only big regressions
+#   should fail it: the modules below are checked for exactly.
+STARTUP_BUDGET_MS = 750
+# Only imported on the cold paths that need them, never by a booting worker.
+DEFERRED_MODULES = [
+    "debug_toolbar",
+    "django_browser_reload",
+    "django_extensions",
+    "httpx",
+    "numpy",
+    "scipy",
+]
+
+
+@dataclass
+class ImportTime:
+    name: str
+    # Nesting level, 0 for the modules imported by the measured code itself.
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def measure_imports(code: str = WORKER_BOOT) -> list[ImportTime]:
+    """
+    Run `code` in a fresh interpreter with `-X importtime`, in the production
+    configuration (`DEBUG=False`), and return the import times it reports, in
+    the order imports complete (submodules first).
+
+    The interpreter's own startup imports are left out.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "bookmarks.settings",
+            "DEBUG": "False",
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    # Lines look like "import time:  self [us] | cumulative | imported package",
+    #   the package name indented by nesting level.
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            # The header.
+            continue
+        times.append(
+            ImportTime(
+                name=name.strip(),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+            )
+        )
+    # `site` is the last module of the interpreter startup.
+    site = next(
+        i for i, time in enumerate(times) if time.name == "site" and not time.depth
+    )
+    return times[site + 1 :]
+
+
+def total_ms(times: list[ImportTime]) -> float:
+    return sum(time.cumulative_us for time in times if not time.depth) / 1000
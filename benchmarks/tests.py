@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from account import follows
+from account.models import Contact
+from actions.models import Action
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from images import search
+from images.models import Image
+
+from bookmarks.redis_client import r
+from bookmarks.testing import FakeRedisMixin
+
+from . import data, startup
+from .journeys import JOURNEYS, run_journeys
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class JourneyBudgetTests(FakeRedisMixin, TestCase):
+    """
+    Fail when a core user journey exceeds its query-count or latency budget.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Read from the environment by the dashboard, for its bookmarklet.
+        environ = mock.patch.dict(os.environ, {"HOST": "testserver"})
+        environ.start()
+        cls.addClassCleanup(environ.stop)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = data.generate(
+            data.Scale(users=20, follows_per_user=5, images_per_user=2)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_journeys_stay_within_budgets(self):
+        results = run_journeys(self.users[-1], repeat=10)
+        for journey in JOURNEYS:
+            with self.subTest(journey=journey.name):
+                result = results[journey.name]
+                self.assertLessEqual(result["queries"], journey.max_queries)
+                self.assertLessEqual(result["p95_ms"], journey.max_p95_ms)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedDataTests(FakeRedisMixin, TestCase):
+    """
+    `seed_data` inserts raw rows: they must be complete without the model.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_data",
+            users=6,
+            follows_per_user=2,
+            images_per_user=2,
+            likes_per_image=3,
+            batch_size=5,
+            stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_row_counts(self):
+        self.assertEqual(Contact.objects.count(), 12)
+        self.assertEqual(Image.objects.count(), 12)
+        self.assertEqual(Image.users_like.through.objects.count(), 36)
+        # One per user, follow and image.
+        self.assertEqual(Action.objects.count(), 30)
+
+    def test_columns_are_filled(self):
+        for image in Image.objects.all():
+            with self.subTest(image=image.id):
+                self.assertEqual(image.total_likes, 3)
+                self.assertIsNotNone(image.phash)
+                self.assertIsNotNone(image.phash_0)
+                self.assertTrue(image.image)
+                self.assertTrue(image.width and image.height)
+                self.assertTrue(image.dominant_color)
+                self.assertTrue(image.blurhash)
+                self.assertTrue(image.variants)
+
+    def test_search_index_and_follow_sets(self):
+        self.assertEqual(len(search.search("generated", limit=100)), 12)
+        user = Contact.objects.first().user_from
+        # Built by the command, rather than on first read.
+        self.assertTrue(r.sismember(follows.followers_key(user.id), follows.SENTINEL))
+        self.assertEqual(follows.follower_count(user.id), user.followers.count())
+        self.assertEqual(
+            sorted(follows.following_ids(user.id)),
+            sorted(user.following.values_list("id", flat=True)),
+        )
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """
+    Fail when booting a worker imports modules it should defer, or exceeds its
+    import-time budget.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The fastest of a few runs, so a busy machine doesn't fail the budget.
+        runs = [startup.measure_imports() for _ in range(3)]
+        cls.imports = min(runs, key=startup.total_ms)
+
+    def test_deferred_modules_are_not_imported(self):
+        imported = {time.name for time in self.imports}
+        for module in startup.DEFERRED_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, imported)
+
+    def test_imports_stay_within_budget(self):
+        self.assertLessEqual(startup.total_ms(self.imports), startup.STARTUP_BUDGET_MS)
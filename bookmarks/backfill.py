@@ -0,0 +1,116 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import transaction
+from django.db.models import Count, Model, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from bookmarks.fragments import bump_versions
+
+
+def backfill_count(
+    model: type[Model],
+    field: str,
+    related_model: type[Model],
+    related_field: str,
+    batch_size: int | None = 10000,
+    start_after=None,
+    progress: Callable[[int, object], None] | None = None,
+) -> int:
+    """
+    Set `model.<field>` to the number of `related_model` rows whose
+    `related_field` points at each row, e.g. `Image.total_likes` from the
+    `Image.users_like` through table.
+
+    The counts are computed by the database with a correlated subquery, in
+    primary key ranges of `batch_size` rows, each committed separately so
+    locks stay short. Pass `batch_size=None` to update every row with a single
+    `UPDATE`. `progress(rows_done, last_pk)` is called after every batch; pass
+    the last reported pk as `start_after` to resume an interrupted backfill.
+    Returns the number of updated rows.
+    """
+    counts = (
+        related_model.objects.filter(**{related_field: OuterRef("pk")})
+        .order_by()
+        .values(related_field)
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    # `COUNT(*)` of an empty group is no row at all, so default to 0.
+    value = Coalesce(Subquery(counts), Value(0))
+
+    queryset = model.objects.all()
+    if start_after is not None:
+        queryset = queryset.filter(pk__gt=start_after)
+
+    if batch_size is None:
+        done = queryset.update(**{field: value})
+        if progress:
+            progress(done, None)
+        return done
+
+    done = 0
+    last_pk = start_after
+    while True:
+        remaining = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        # Find the end of the next range from the primary key index only.
+        pks = remaining.order_by("pk").values_list("pk", flat=True)
+        batch_end = pks[batch_size - 1 : batch_size].first()
+        if batch_end is None:
+            batch_end = pks.last()
+            if batch_end is None:
+                return done
+
+        with transaction.atomic(using=queryset.db):
+            done += remaining.filter(pk__lte=batch_end).update(**{field: value})
+        last_pk = batch_end
+        if progress:
+            progress(done, last_pk)
+
+
+def backfill_files(
+    queryset: QuerySet,
+    file_field: str,
+    extract: Callable[[tuple[int, str]], tuple[int, dict | None]],
+    fields: list[str],
+    batch_size: int = 1000,
+    workers: int | None = None,
+    chunksize: int = 16,
+    progress: Callable[[int, int], None] | None = None,
+) -> tuple[int, int]:
+    """
+    Set `fields` of the rows of `queryset` from the files of their
+    `file_field`, e.g. the metadata of images that don't have it yet.
+
+    `extract((pk, name))` returns `(pk, values)`, a value per field, or
+    `(pk, None)` when the file can't be read. It's called in `workers`
+    processes (the CPU count by default), since decoding is CPU-bound, and
+    must be a module-level function. Their results are saved from this one,
+    one batch of `batch_size` rows at a time. `progress(done, failed)` is
+    called after every batch. Returns the number of rows done and failed.
+    """
+    done = failed = 0
+    rows = queryset.order_by("pk").values_list("pk", file_field)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        last_pk = None
+        while True:
+            # Keyset pagination, so updated rows don't shift the batches.
+            remaining = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+            batch = list(remaining[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            objs = []
+            for pk, values in executor.map(extract, batch, chunksize=chunksize):
+                if values is None:
+                    failed += 1
+                    continue
+                objs.append(queryset.model(pk=pk, **values))
+            queryset.model.objects.bulk_update(objs, fields)
+            # `bulk_update()` sends no `post_save` signals.
+            bump_versions(queryset.model, [obj.pk for obj in objs])
+            done += len(objs)
+            if progress:
+                progress(done, failed)
+    return done, failed
@@ -0,0 +1,120 @@
+import logging
+import time
+from typing import Callable, Iterable
+
+import redis
+from django.core.cache import cache
+from django.db.models import Model
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+# Fragment keys change with the versions they were rendered from, so stale
+#   fragments are never read again and only need to expire eventually.
+FRAGMENT_TIMEOUT = 60 * 60 * 24 * 7
+
+logger = logging.getLogger(__name__)
+
+Dependency = tuple[type[Model], int]
+
+
+def version_key(model: type[Model], id: int) -> str:
+    return f"version:{model._meta.label_lower}:{id}"
+
+
+def bump_versions(model: type[Model], ids: Iterable[int]):
+    """
+    Invalidate every cached fragment rendered from these objects.
+    """
+    version = time.time_ns()
+    try:
+        cache.set_many({version_key(model, id): version for id in ids}, timeout=None)
+    except redis.RedisError:
+        # Fail open: the change is saved, its fragments are stale until they
+        #   expire (or the objects change again).
+        logger.exception("Couldn't bump the versions of %s", model._meta.label)
+
+
+def get_versions(keys: set[str]) -> dict[str, int]:
+    versions = cache.get_many(keys)
+    # Never bumped (or evicted) versions get a new stamp, so fragments cached
+    #   under an evicted stamp can't be served.
+    missing = {key: time.time_ns() for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def render_fragments(
+    template_name: str,
+    name: str,
+    objects: Iterable[Model],
+    dependencies: Callable[[Model], list[Dependency]],
+    prepare: Callable[[list[Model]], None] | None = None,
+) -> list[SafeString]:
+    """
+    Render `template_name` for each of `objects` (as `name` in its context),
+    reusing the fragments cached under the current versions of the objects
+    they're rendered from, as returned by `dependencies(obj)`.
+
+    The versions and the fragments of the whole list are fetched with one
+    `get_many()` each. Only the missing fragments are rendered, after
+    `prepare(missing)` (e.g. to prefetch the related objects they need).
+    Fragments can't depend on the request.
+    """
+    objects = list(objects)
+
+    def render(obj: Model) -> str:
+        return render_to_string(template_name, {name: obj})
+
+    try:
+        keys = fragment_keys(template_name, objects, dependencies)
+        fragments = cache.get_many(keys)
+    except redis.RedisError:
+        # Fail open: render the page as without a fragment cache.
+        logger.exception("Couldn't read the cached fragments of %s", template_name)
+        if prepare:
+            prepare(objects)
+        return [mark_safe(render(obj)) for obj in objects]
+
+    missing = [obj for obj, key in zip(objects, keys) if key not in fragments]
+    if missing:
+        if prepare:
+            prepare(missing)
+        rendered = {
+            key: render(obj) for obj, key in zip(objects, keys) if key not in fragments
+        }
+        try:
+            cache.set_many(rendered, timeout=FRAGMENT_TIMEOUT)
+        except redis.RedisError:
+            logger.exception("Couldn't cache the fragments of %s", template_name)
+        fragments.update(rendered)
+    return [mark_safe(fragments[key]) for key in keys]
+
+
+def fragment_keys(
+    template_name: str,
+    objects: list[Model],
+    dependencies: Callable[[Model], list[Dependency]],
+) -> list[str]:
+    # Made of the current versions of the objects each fragment depends on.
+    object_dependencies = [dependencies(obj) for obj in objects]
+    versions = get_versions(
+        {
+            version_key(*dependency)
+            for deps in object_dependencies
+            for dependency in deps
+        }
+    )
+    return [
+        ":".join(
+            [
+                f"fragment:{template_name}:{obj.pk}",
+                *(
+                    f"{model._meta.label_lower}.{id}.{versions[version_key(model, id)]}"
+                    for model, id in deps
+                ),
+            ]
+        )
+        for obj, deps in zip(objects, object_dependencies)
+    ]
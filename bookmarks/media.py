@@ -0,0 +1,107 @@
+import functools
+import hashlib
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.core.files.storage import Storage
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from bookmarks.typing import settings
+
+# Image variants and thumbnails are named by the hash of their content or of
+#   their source's (see `images.variants` and `content_hashed_namer()`), e.g.
+#   `variants/3f/3f2a9c0e4b1d7a65_640w.webp` and
+#   `images/2026/10/19/3f2a9c0e4b1d7a65_300x300_1c9e4f0a.jpg`.
+VARIANT_NAME_RE = re.compile(
+    r"^variants/[0-9a-f]{2}/(?P<digest>[0-9a-f]{16})_\d+w\.\w+$"
+)
+THUMBNAIL_NAME_RE = re.compile(
+    r"^(?:images|users)/(?:.+/)?[0-9a-f]{16}_\d+x\d+_[0-9a-f]{8}\.\w+$"
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def source_digest(storage: Storage, name: str, modified, size: int) -> str:
+    # Keyed by modification time and size too: a file replaced under the same
+    #   name is hashed again.
+    sha256 = hashlib.sha256()
+    with storage.open(name, "rb") as file:
+        for chunk in file.chunks():
+            sha256.update(chunk)
+    return sha256.hexdigest()[:16]
+
+
+def content_hashed_namer(thumbnailer, prepared_options, thumbnail_extension, **kwargs):
+    """
+    easy-thumbnails namer (see `THUMBNAIL_NAMER`): name a thumbnail by the
+    hash of its source's content, its size and the hash of its other options.
+    Its name changes with the picture, so its URL can be cached as immutable.
+    """
+    storage, name = thumbnailer.source_storage, thumbnailer.name
+    digest = source_digest(
+        storage, name, storage.get_modified_time(name), storage.size(name)
+    )
+    options = ":".join(prepared_options[1:])
+    options_digest = hashlib.sha256(options.encode()).hexdigest()[:8]
+    return f"{digest}_{prepared_options[0]}_{options_digest}.{thumbnail_extension}"
+
+
+def is_public(path: str) -> bool:
+    return posixpath.normpath(path).split("/", 1)[0] in settings.MEDIA_PUBLIC_DIRS
+
+
+def is_immutable(path: str) -> bool:
+    return bool(VARIANT_NAME_RE.match(path) or THUMBNAIL_NAME_RE.match(path))
+
+
+@require_safe
+def serve_media(request: HttpRequest, path: str):
+    """
+    Serve a file of the `MEDIA_PUBLIC_DIRS` of `MEDIA_ROOT` with validators and
+    caching headers.
+    """
+    # `safe_join()` rejects paths outside `MEDIA_ROOT` with a 400 response.
+    fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    if not is_public(path) or not fullpath.is_file():
+        raise Http404("File not found.")
+    stat = fullpath.stat()
+
+    # Files are never modified in place, so size and modification time
+    #   identify the content as well as a content hash would.
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+    headers = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type, encoding = mimetypes.guess_type(fullpath)
+        if settings.MEDIA_SENDFILE_HEADER == "X-Accel-Redirect":
+            # Let nginx send the file from an `internal` location.
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        elif settings.MEDIA_SENDFILE_HEADER == "X-Sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = str(fullpath)
+        else:
+            # `FileResponse` hands the file object to the server's
+            #   `wsgi.file_wrapper`, which uses `sendfile()` where available
+            #   instead of copying the bytes through Python.
+            response = FileResponse(fullpath.open("rb"), content_type=content_type)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+    for header, value in headers.items():
+        response.headers[header] = value
+
+    if is_immutable(path):
+        patch_cache_control(
+            response, public=True, max_age=60 * 60 * 24 * 365, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
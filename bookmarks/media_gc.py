@@ -0,0 +1,202 @@
+"""
+Deletion of the media files no row references anymore.
+
+Deleted rows (cascades included, e.g. every image and the profile of a deleted
+user) queue their files in Redis once the transaction commits, and the
+`delete_media` worker deletes them with their thumbnails, outside of the
+request. `gc_media` walks `MEDIA_ROOT` for the files left behind anyway:
+replaced profile photos, image variants (shared by identical pictures), or
+files of a queue lost with Redis.
+"""
+
+import logging
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from pathlib import Path
+
+from account.models import Profile
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from easy_thumbnails.models import Source, Thumbnail
+from easy_thumbnails.storage import thumbnail_default_storage
+from images.models import Image, ImportJob
+
+from bookmarks.media import THUMBNAIL_NAME_RE, VARIANT_NAME_RE
+from bookmarks.redis_client import r
+from bookmarks.typing import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "media:delete_queue"
+# Names looked up per query.
+BATCH_SIZE = 500
+
+
+def queue_deletion(*names: str):
+    names = [name for name in names if name]
+    if names:
+        # Only once the rows are gone for good. `robust`: an unavailable Redis
+        #   doesn't fail the request, `gc_media` finds the files later.
+        transaction.on_commit(partial(r.rpush, QUEUE_KEY, *names), robust=True)
+
+
+def batches(names: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(names), BATCH_SIZE):
+        yield names[start : start + BATCH_SIZE]
+
+
+def referenced_files(names: list[str]) -> set[str]:
+    """
+    Return those of `names` that rows still reference as their file.
+    """
+    referenced = set()
+    for batch in batches(names):
+        referenced.update(
+            Image.objects.filter(image__in=batch).values_list("image", flat=True)
+        )
+        referenced.update(
+            Profile.objects.filter(photo__in=batch).values_list("photo", flat=True)
+        )
+        referenced.update(
+            ImportJob.objects.filter(file__in=batch).values_list("file", flat=True)
+        )
+    return referenced
+
+
+def referenced_thumbnails(names: list[str]) -> set[str]:
+    """
+    Return those of `names` that are thumbnails of files rows still reference,
+    named by the current `THUMBNAIL_NAMER`: the thumbnails of previous names
+    are never used again.
+    """
+    names = [name for name in names if THUMBNAIL_NAME_RE.match(name)]
+    referenced = set()
+    for batch in batches(names):
+        thumbnails = Thumbnail.objects.filter(name__in=batch)
+        sources = dict(thumbnails.values_list("name", "source__name"))
+        live_sources = referenced_files(list(set(sources.values())))
+        referenced.update(
+            name for name, source in sources.items() if source in live_sources
+        )
+    return referenced
+
+
+def referenced_variants(names: list[str]) -> set[str]:
+    """
+    Return those of `names` that are variants of images rows still list.
+    Variants are content-addressed (and shared by identical pictures): they're
+    looked up by the digest their names start with.
+    """
+    digests = {
+        match["digest"] for name in names if (match := VARIANT_NAME_RE.match(name))
+    }
+    referenced = set()
+    for batch in batches(sorted(digests)):
+        rows = Image.objects.filter(variants_digest__in=batch).values_list(
+            "variants", flat=True
+        )
+        for variants in rows.iterator(chunk_size=2000):
+            for format_variants in variants.values():
+                referenced.update(variant["name"] for variant in format_variants)
+    return referenced.intersection(names)
+
+
+def delete_file(storage: Storage, name: str) -> bool:
+    try:
+        storage.delete(name)
+    except OSError:
+        logger.exception("Couldn't delete %s", name)
+        return False
+    return True
+
+
+def delete_files(names: list[str]) -> int:
+    """
+    Delete those of `names` no row references (a file can be shared), and
+    their thumbnails. Return the number of files deleted.
+    """
+    names = list(set(names) - referenced_files(names))
+    deleted = 0
+    for batch in batches(names):
+        thumbnails = Thumbnail.objects.filter(source__name__in=batch)
+        for name in thumbnails.values_list("name", flat=True):
+            deleted += delete_file(thumbnail_default_storage, name)
+        for name in batch:
+            deleted += delete_file(default_storage, name)
+        # Cascades to the thumbnails' records.
+        Source.objects.filter(name__in=batch).delete()
+    return deleted
+
+
+FileStat = tuple[str, os.stat_result]
+
+
+def scan_directory(path: str) -> tuple[list[FileStat], list[str]]:
+    files, directories = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                files.append((entry.path, entry.stat(follow_symlinks=False)))
+    return files, directories
+
+
+def walk(directories: list[str], workers: int) -> Iterator[FileStat]:
+    """
+    Yield the path and stat of every file under `directories`, scanning
+    directories in parallel: `scandir()` and `stat()` release the GIL while
+    they wait on the file system.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {
+            executor.submit(scan_directory, directory)
+            for directory in directories
+            if os.path.isdir(directory)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                pending.update(
+                    executor.submit(scan_directory, directory)
+                    for directory in subdirectories
+                )
+                yield from files
+
+
+def find_orphans(workers: int = 8) -> Iterator[tuple[str, int]]:
+    """
+    Yield the name and size of every file of the `MEDIA_GC_DIRS` that no row
+    references, and that is older than `MEDIA_GC_MIN_AGE` (younger ones may
+    belong to rows not committed yet). Files are looked up in batches.
+    """
+    root = Path(settings.MEDIA_ROOT)
+    cutoff = time.time() - settings.MEDIA_GC_MIN_AGE
+
+    def unreferenced(batch: dict[str, int]) -> Iterator[tuple[str, int]]:
+        names = list(batch)
+        referenced = (
+            referenced_files(names)
+            | referenced_thumbnails(names)
+            | referenced_variants(names)
+        )
+        for name, size in batch.items():
+            if name not in referenced:
+                yield name, size
+
+    directories = [str(root / directory) for directory in settings.MEDIA_GC_DIRS]
+    batch = {}
+    for path, stat in walk(directories, workers):
+        if stat.st_mtime > cutoff:
+            continue
+        batch[Path(path).relative_to(root).as_posix()] = stat.st_size
+        if len(batch) == BATCH_SIZE:
+            yield from unreferenced(batch)
+            batch = {}
+    yield from unreferenced(batch)
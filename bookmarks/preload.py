@@ -0,0 +1,63 @@
+"""
+Warm-up of a preloaded application, run by the server's master process before
+it forks its workers (see `gunicorn.conf.py`).
+
+Everything Django otherwise builds lazily on the first requests of each
+worker is built once, in the master, and shared by the workers' memory pages
+until they write to them.
+"""
+
+import gc
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.template.loader import get_template
+from django.template.utils import get_app_template_dirs
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+
+
+def warm_resolver(resolver: URLResolver):
+    # Accessing `reverse_dict` populates the lookup tables of `reverse()`,
+    #   each namespace has its own.
+    resolver.reverse_dict
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        warm_resolver(namespace_resolver)
+
+
+def warm_up():
+    # Imports every view, and builds the URL patterns.
+    resolver = get_resolver()
+    resolver.url_patterns
+    warm_resolver(resolver)
+
+    # Compiled templates, kept by the cached template loader. Only the
+    #   project's own, the admin's are rarely rendered.
+    for directory in get_app_template_dirs("templates"):
+        if not directory.is_relative_to(settings.BASE_DIR):
+            continue
+        for path in Path(directory).rglob("*"):
+            if path.is_file():
+                get_template(path.relative_to(directory).as_posix())
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+
+    # Actions and fragment versions look content types up by model and by id.
+    ContentType.objects.get_for_models(*apps.get_models())
+    # Connections can't be shared with the forked workers.
+    connections.close_all()
+
+
+def freeze():
+    """
+    Warm the application up, then move every object it allocated to the
+    permanent generation, ignored by the garbage collector: its collections in
+    the workers would otherwise write to (and copy) every shared page holding
+    an object.
+    """
+    warm_up()
+    gc.freeze()
@@ -0,0 +1,222 @@
+"""
+On-demand profiling of production requests, with a statistical profiler: a
+thread samples the request's call stack every `PROFILING_INTERVAL` seconds.
+Unlike a deterministic profiler (`cProfile`), the view runs at full speed.
+
+A request is profiled when it carries a signed `X-Profile` header (see the
+`profiling_token` command), or at random at `PROFILING_SAMPLE_RATE`. Its
+samples are written to `PROFILING_DIR` as collapsed stacks, the input of
+`flamegraph.pl` and speedscope, next to a JSON file of its tags (URL name,
+status, latency, query count...). `profile_report` aggregates them. Only the
+newest `PROFILING_MAX_PROFILES` are kept, pruned every `PROFILING_PRUNE_EVERY`
+profiles a worker saves.
+"""
+
+import itertools
+import logging
+import random
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from functools import lru_cache
+from pathlib import Path
+from types import CodeType, FrameType
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core import signing
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+
+from bookmarks.typing import settings
+
+logger = logging.getLogger(__name__)
+
+
+HEADER = "X-Profile"
+SALT = "bookmarks.profiling"
+
+# Profiles saved by this process, to prune every `PROFILING_PRUNE_EVERY`.
+saves = itertools.count(1)
+
+
+def make_token() -> str:
+    return signing.TimestampSigner(salt=SALT).sign("profile")
+
+
+def has_valid_token(request: HttpRequest) -> bool:
+    token = request.headers.get(HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+@lru_cache
+def path_prefixes() -> list[str]:
+    # Longest first: site-packages is under the standard library's directory.
+    paths = {str(settings.BASE_DIR), *sysconfig.get_paths().values()}
+    return sorted((f"{path}/" for path in paths), key=len, reverse=True)
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code: CodeType) -> str:
+    filename = code.co_filename
+    for prefix in path_prefixes():
+        if filename.startswith(prefix):
+            filename = filename.removeprefix(prefix)
+            break
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame: FrameType, root: FrameType) -> str:
+    """
+    Return the stack of `frame` as a collapsed stack, outermost first and
+    starting below `root`: "caller (file:line);callee (file:line)".
+    """
+    labels = []
+    while frame is not None and frame is not root:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """
+    Count the stacks of another thread, sampled every `interval` seconds until
+    `stop()` is called.
+    """
+
+    def __init__(self, thread_id: int, root: FrameType, interval: float):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame, self.root)] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def save_profile(stacks: Counter[str], tags: dict) -> Path:
+    """
+    Write `stacks` to `PROFILING_DIR` as `<name>.collapsed` and `tags` as
+    `<name>.json`. Return the path of the former.
+    """
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    url_name = (tags["url_name"] or "unresolved").replace(":", "-")
+    name = f"{timezone.now():%Y%m%dT%H%M%S%f}-{url_name}-{uuid.uuid4().hex[:8]}"
+    path = directory / f"{name}.collapsed"
+    path.write_text(
+        "".join(f"{stack} {count}\n" for stack, count in stacks.items() if stack)
+    )
+    path.with_suffix(".json").write_bytes(orjson.dumps(tags))
+    # Listing the directory costs as much as the profile: not on every save.
+    if next(saves) % settings.PROFILING_PRUNE_EVERY == 0:
+        try:
+            prune_profiles(directory, settings.PROFILING_MAX_PROFILES)
+        except OSError:
+            logger.exception("Could not prune the profiles of %s", directory)
+    return path
+
+
+def prune_profiles(directory: Path, keep: int):
+    """
+    Delete all but the `keep` newest profiles of `directory`, so profiling
+    left on can't fill the disk.
+    """
+    # Names start with the time, so they sort oldest first.
+    paths = sorted(directory.glob("*.collapsed"))
+    for path in paths[: max(0, len(paths) - keep)]:
+        # Other workers may be pruning as well.
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests carrying a valid `X-Profile` token, and a sample of
+    the others (see the module's docstring).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        # Under ASGI the sampled thread would be the event loop's, running
+        #   every other request too: only WSGI workers profile.
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        if has_valid_token(request):
+            trigger = "header"
+        elif random.random() < settings.PROFILING_SAMPLE_RATE:
+            trigger = "sampled"
+        else:
+            return self.get_response(request)
+        return self.profile(request, trigger)
+
+    def profile(self, request: HttpRequest, trigger: str) -> HttpResponse:
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        sampler = Sampler(
+            threading.get_ident(), sys._getframe(), settings.PROFILING_INTERVAL
+        )
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            start = time.perf_counter()
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        tags = {
+            "url_name": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "queries": queries,
+            "samples": sampler.stacks.total(),
+            "interval_ms": settings.PROFILING_INTERVAL * 1000,
+            "trigger": trigger,
+            "created": timezone.now().isoformat(),
+        }
+        try:
+            save_profile(sampler.stacks, tags)
+        except Exception:
+            # Profiling must not fail the request it profiled.
+            logger.exception("Could not save the profile of %s", request.path)
+        return response
@@ -0,0 +1,145 @@
+import hashlib
+import time
+from functools import wraps
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpRequest, HttpResponse
+
+from bookmarks.redis_client import r
+from bookmarks.typing import settings
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """
+    Parse a rate such as `"10/m"` or `"100/5m"` into `(limit, period_seconds)`.
+    """
+    limit, period = rate.split("/")
+    multiplier = int(period[:-1]) if len(period) > 1 else 1
+    return int(limit), multiplier * PERIODS[period[-1]]
+
+
+def get_client_ip(request: HttpRequest) -> str:
+    if settings.RATELIMIT_TRUST_X_FORWARDED_FOR:
+        forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+        if forwarded_for:
+            # The left-most address is the original client.
+            return forwarded_for.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def get_ident(request: HttpRequest, key: str) -> str | None:
+    """
+    Identify the client a rule applies to, without touching the database.
+    """
+    if key == "ip":
+        return get_client_ip(request)
+    if key in ("user", "user_or_ip"):
+        # Read the user id straight from the session instead of loading
+        #   `request.user`, which would query the `auth_user` table.
+        user_id = request.session.get(SESSION_KEY)
+        if user_id is not None:
+            return f"user:{user_id}"
+        return get_client_ip(request) if key == "user_or_ip" else None
+    if key.startswith("post:"):
+        # e.g. `post:username` limits attempts against a single account.
+        value = request.POST.get(key.removeprefix("post:"))
+        return f"{key}:{value.lower()}" if value else None
+    raise ValueError(f"Unknown rate limit key: {key}")
+
+
+def is_ratelimited(request: HttpRequest, group: str, key: str, rate: str) -> bool:
+    """
+    Count the request against a sliding window and check whether it exceeds
+    `rate`.
+    """
+    if not settings.RATELIMIT_ENABLED:
+        return False
+
+    ident = get_ident(request, key)
+    if ident is None:
+        return False
+
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    # Sliding window counter: weight the previous fixed window by how much
+    #   of it still overlaps the last `period` seconds.
+    overlap = 1 - (now % period) / period
+    ident = hashlib.sha1(ident.encode()).hexdigest()
+    current_key = f"ratelimit:{group}:{ident}:{window}"
+    previous_key = f"ratelimit:{group}:{ident}:{window - 1}"
+
+    try:
+        pipe = r.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, period * 2)
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+    except redis.RedisError:
+        # Fail open, an unavailable Redis must not lock every user out.
+        return False
+
+    return current + int(previous or 0) * overlap > limit
+
+
+def too_many_requests(rate: str) -> HttpResponse:
+    _, period = parse_rate(rate)
+    response = HttpResponse("Too many requests.", status=429)
+    response["Retry-After"] = str(period)
+    return response
+
+
+def ratelimit(key: str, rate: str, methods: list[str] | None = None, group=None):
+    """
+    Reject requests to the decorated view once `rate` is exceeded for `key`.
+    """
+
+    def decorator(view_func):
+        rule_group = group or f"{view_func.__module__}.{view_func.__qualname__}"
+
+        @wraps(view_func)
+        def _wrapped_view(request: HttpRequest, *args, **kwargs):
+            if (methods is None or request.method in methods) and is_ratelimited(
+                request, rule_group, key, rate
+            ):
+                return too_many_requests(rate)
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
+
+
+class RateLimitMiddleware:
+    """
+    Apply the `RATELIMITS` rules configured for the resolved URL name.
+    """
+
+    # Under ASGI, a sync-only middleware would make Django run the rest of the
+    #   chain, async views included, in a thread.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        return self.get_response(request)
+
+    # Runs after URL resolution but before the view, so rejected requests never
+    #   reach the view's database queries or password hashing.
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        for rule in settings.RATELIMITS.get(view_name, []):
+            methods = rule.get("methods")
+            if methods is not None and request.method not in methods:
+                continue
+            if is_ratelimited(request, view_name, rule["key"], rule["rate"]):
+                return too_many_requests(rule["rate"])
+        return None
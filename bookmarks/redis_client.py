@@ -0,0 +1,22 @@
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from bookmarks.typing import settings
+
+
+def connect(client_class: str):
+    return import_string(client_class)(
+        host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB
+    )
+
+
+# Connect to redis
+# Shared by every module that talks to Redis, so each process keeps a single
+#   connection pool. Clients are created on first use: importing this module
+#   neither imports the client library nor creates a pool, and a pool is never
+#   created in a server's master process and inherited by the forked workers.
+r = SimpleLazyObject(lambda: connect(settings.REDIS_CLIENT_CLASS))
+
+# Connections of an asyncio client belong to the event loop that opened them,
+#   so this one is only used by the async views, on the ASGI server's loop.
+ar = SimpleLazyObject(lambda: connect(settings.REDIS_ASYNC_CLIENT_CLASS))
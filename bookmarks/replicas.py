@@ -0,0 +1,108 @@
+"""
+Read replicas: the reads of safe requests (GET, HEAD, OPTIONS) go to one of
+the `DATABASE_REPLICAS`, writes and every other read to the primary
+(`default`).
+
+Replicas lag behind the primary, so a user is pinned to it (by a cookie) for
+`REPLICA_PIN_SECONDS` after each unsafe request (POST...) of theirs: they
+always see their own likes and follows. Safe requests aren't pinned by what
+they write, such as the records of the thumbnails they render.
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest, HttpResponse
+
+from bookmarks.typing import settings
+
+PIN_COOKIE = "pin_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+# Only set while a request is handled: reads of commands, workers or streamed
+#   responses (generated after the middleware returned) use the primary.
+use_replicas: ContextVar[bool] = ContextVar("use_replicas", default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_replicas.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        # Explicitly, otherwise Django would read the relations of an instance
+        #   from the database it came from.
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Also the reads of `get_or_create()` and `select_for_update()`.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same rows, e.g. a user read from a replica liking an image.
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of the request (see `ReplicaRouter`), and pin its user to
+    the primary after an unsafe one. Must come before any middleware that
+    reads, such as `SessionMiddleware`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = use_replicas.set(self.may_use_replicas(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request: HttpRequest):
+        # Sync views run in a copy of the context.
+        token = use_replicas.set(self.may_use_replicas(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        return self.pin(request, response)
+
+    def may_use_replicas(self, request: HttpRequest) -> bool:
+        return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+    def pin(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def replicate(replica: str):
+    """
+    Copy the primary into `replica`, as replication would: both must be SQLite
+    databases. To try replicas locally (see the `sync_replicas` command), and
+    to simulate their lag in tests.
+    """
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[replica]
+    primary.ensure_connection()
+    replica.ensure_connection()
+    primary.connection.backup(replica.connection)
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 from django.conf import settings
 from django.urls import reverse_lazy
 
@@ -27,7 +27,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "django-insecure-+h_bd3-xci%s^#nnq^17g9ll7=dj+j_(n@fp7b1#&-nwyna4#k"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = config("DEBUG", default=True, cast=bool)
 
 # `mysite.com` is configured in the `hosts` file.
 ALLOWED_HOSTS = ["mysite.com", "localhost", "127.0.0.1"]
@@ -44,25 +44,36 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "social_django",
-    "django_extensions",
     "easy_thumbnails",
-    "django_browser_reload",
-    "debug_toolbar",
     "images.apps.ImagesConfig",
     "actions.apps.ActionsConfig",
+    "benchmarks.apps.BenchmarksConfig",
+    "api.apps.ApiConfig",
 ]
 
 MIDDLEWARE = [
-    "debug_toolbar.middleware.DebugToolbarMiddleware",  # Must be placed before any other middleware, except for middleware that encodes the response's content, such as `GZipMiddleware`.
     "django.middleware.security.SecurityMiddleware",
+    "bookmarks.profiling.ProfilingMiddleware",  # Measures every other one.
+    "bookmarks.replicas.ReplicaRoutingMiddleware",  # Before any middleware that reads.
     "django.contrib.sessions.middleware.SessionMiddleware",  # Handles the session across requests.
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",  # Associate users with requests (`request.user`) using sessions.
+    "bookmarks.ratelimit.RateLimitMiddleware",  # Needs the session to identify users.
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django_browser_reload.middleware.BrowserReloadMiddleware",  # Must be placed after any others that encode the response's content, such as Django's `GZipMiddleware`.
 ]
+if DEBUG:
+    # Development tools, not even imported by production workers. The
+    #   toolbar's middleware is also sync-only, under ASGI it would make every
+    #   request run through a thread.
+    INSTALLED_APPS += ["django_extensions", "django_browser_reload", "debug_toolbar"]
+    # Must be placed before any other middleware, except for middleware that
+    #   encodes the response's content, such as `GZipMiddleware`.
+    MIDDLEWARE.insert(0, "debug_toolbar.middleware.DebugToolbarMiddleware")
+    # Must be placed after any others that encode the response's content, such
+    #   as Django's `GZipMiddleware`.
+    MIDDLEWARE.append("django_browser_reload.middleware.BrowserReloadMiddleware")
 
 ROOT_URLCONF = "bookmarks.urls"
 
@@ -84,6 +95,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "bookmarks.wsgi.application"
 
+# Serve the Redis- and I/O-bound views as native `async def` views. Only enable
+#   under an ASGI server (see `serve-asgi.sh`): their Redis and HTTP clients
+#   keep connections open on the server's event loop.
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -95,6 +111,22 @@ DATABASES = {
     }
 }
 
+# Read replicas, see `bookmarks.replicas`. To try them locally, list SQLite
+#   files (e.g. `DATABASE_REPLICA_FILES=db-replica.sqlite3`) and copy the
+#   primary into them with `python manage.py sync_replicas`.
+for i, name in enumerate(config("DATABASE_REPLICA_FILES", default="", cast=Csv())):
+    DATABASES[f"replica_{i}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / name,
+        # Tests use the primary's database.
+        "TEST": {"MIRROR": "default"},
+    }
+# Aliases the reads of safe requests are spread over.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["bookmarks.replicas.ReplicaRouter"]
+# Seconds users read from the primary after writing: longer than replicas lag.
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -122,8 +154,10 @@ LOGOUT_URL = "logout"
 
 # Social authentication
 
-SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = config("GOOGLE_OAUTH2_KEY")
-SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = config("GOOGLE_OAUTH2_SECRET")
+# Processes start without them (Google sign-in just fails), `account.checks`
+#   warns when they're missing.
+SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = config("GOOGLE_OAUTH2_KEY", default="")
+SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = config("GOOGLE_OAUTH2_SECRET", default="")
 
 SOCIAL_AUTH_PIPELINE = [
     "social_core.pipeline.social_auth.social_details",
@@ -168,6 +202,57 @@ STATICFILES_DIRS = [BASE_DIR / "dist"]
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Media files are served by `bookmarks.media.serve_media`.
+# Set to "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd) to let
+#   the reverse proxy send the file after Django has checked the request.
+MEDIA_SENDFILE_HEADER = config("MEDIA_SENDFILE_HEADER", default=None)
+# nginx `internal` location aliased to `MEDIA_ROOT`.
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Directories of `MEDIA_ROOT` served to anyone: uploads of other directories
+#   (e.g. imported bookmark files) are private. Thumbnails are saved next to
+#   their source.
+MEDIA_PUBLIC_DIRS = ["images", "users", "variants"]
+# `Cache-Control: max-age` for originals. Image variants and thumbnails, named
+#   by a content hash, are cached for a year as `immutable`.
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# Media garbage collection (see `bookmarks.media_gc`)
+
+# Directories of `MEDIA_ROOT` searched for unreferenced files by `gc_media`:
+#   the upload directories (thumbnails are saved next to their source) and
+#   the image variants.
+MEDIA_GC_DIRS = ["images", "users", "imports", "variants"]
+# Younger files (in seconds) are never collected, their rows may not be
+#   committed yet.
+MEDIA_GC_MIN_AGE = 60 * 60 * 24
+
+# easy-thumbnails
+# https://easy-thumbnails.readthedocs.io/en/latest/ref/settings/
+
+# Named by the hash of the source's content. Thumbnails of the previous names
+#   are deleted by `gc_media`.
+THUMBNAIL_NAMER = "bookmarks.media.content_hashed_namer"
+
+# Profile photos (see `account.photos`)
+
+# Uploads larger than this are rejected before being decoded. A decoded
+#   picture takes 3 to 4 bytes per pixel, and is copied while normalized.
+#   JPEGs are decoded downscaled (by up to 8 times both ways).
+PROFILE_PHOTO_MAX_PIXELS = 64 * 1_000_000
+# Other formats are decoded at full size, so are held to less.
+PROFILE_PHOTO_MAX_UNSCALED_PIXELS = 16 * 1_000_000
+# Stored at most this many pixels wide and high, only shown as thumbnails.
+PROFILE_PHOTO_MAX_SIZE = 1024
+PROFILE_PHOTO_QUALITY = 85
+
+# Image variants
+
+# Widths of the responsive copies generated for each image.
+IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1280]
+# By preference. Formats the installed Pillow can't encode are skipped.
+IMAGE_VARIANT_FORMATS = ["avif", "webp"]
+IMAGE_VARIANT_QUALITY = {"avif": 55, "webp": 80}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -196,3 +281,107 @@ INTERNAL_IPS = [
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
 REDIS_DB = 0
+# Set to `fakeredis.FakeRedis` to run without a Redis server (e.g. load tests).
+REDIS_CLIENT_CLASS = config("REDIS_CLIENT_CLASS", default="redis.Redis")
+# Client of the async views, `fakeredis.FakeAsyncRedis` to run without Redis.
+REDIS_ASYNC_CLIENT_CLASS = config(
+    "REDIS_ASYNC_CLIENT_CLASS", default="redis.asyncio.Redis"
+)
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        # Set to `django.core.cache.backends.locmem.LocMemCache` to run without
+        #   a Redis server.
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.redis.RedisCache"
+        ),
+        # A separate database, so the cache can be flushed on its own.
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+    }
+}
+
+# Near-duplicate images
+
+# Max number of differing bits between perceptual hashes of the same picture.
+NEAR_DUPLICATE_DISTANCE = 6
+
+# Unique viewers
+
+# Days the daily unique viewers of images are kept, long enough for the weekly
+#   `rollup_viewers` to run late.
+VIEWERS_DAYS_KEPT = 14
+VIEWERS_WEEKS_KEPT = 12
+# Rank images by unique viewers instead of views (page loads, reloads
+#   included). The ranking only includes viewers counted since it was added.
+RANKING_BY_UNIQUE_VIEWERS = config(
+    "RANKING_BY_UNIQUE_VIEWERS", default=False, cast=bool
+)
+
+# Live counters
+
+# Updates of an image are pushed at most once per interval (seconds).
+LIVE_COALESCE_INTERVAL = 0.25
+# Seconds between comments sent on idle event streams, to keep them open.
+LIVE_HEARTBEAT_INTERVAL = 15
+# Images a single event stream can follow.
+LIVE_MAX_IMAGES = 100
+
+# Bookmark import
+
+# Rows downloaded and inserted together (and committed with the progress).
+IMPORT_BATCH_SIZE = 200
+IMPORT_MAX_WORKERS = 8
+# Politeness: concurrent requests per host, and seconds between their starts.
+IMPORT_PER_HOST = 2
+IMPORT_HOST_DELAY = 0.5
+IMPORT_MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# Minutes without progress before a running import is resumed by a worker.
+IMPORT_STALE_MINUTES = 10
+
+# Bookmark export
+
+# Rows read from the database at a time, and bytes read from files (and sent).
+EXPORT_ROW_CHUNK_SIZE = 500
+EXPORT_FILE_CHUNK_SIZE = 64 * 1024
+
+# Profiling (see `bookmarks.profiling`)
+
+PROFILING_DIR = BASE_DIR / "profiles"
+# Only the newest profiles are kept, older ones are deleted as new ones are
+#   written: by each worker, once every `PROFILING_PRUNE_EVERY` profiles.
+PROFILING_MAX_PROFILES = 1000
+PROFILING_PRUNE_EVERY = 50
+# Share of requests profiled without an `X-Profile` token, in [0, 1].
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+# Seconds between two samples of a profiled request's stack.
+PROFILING_INTERVAL = 0.005
+# Seconds `X-Profile` tokens are valid for.
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# Rate limiting
+
+RATELIMIT_ENABLED = config("RATELIMIT_ENABLED", default=True, cast=bool)
+# Rules applied by `RateLimitMiddleware`, keyed by URL name.
+#   `key` is one of "ip", "user", "user_or_ip" or "post:<field>".
+#   `rate` is "<limit>/<period>", where period is s, m, h or d (e.g. "100/5m").
+RATELIMITS = {
+    "login": [
+        {"key": "ip", "rate": "20/m", "methods": ["POST"]},
+        # Slows down brute-forcing a single account from many addresses.
+        {"key": "post:username", "rate": "10/5m", "methods": ["POST"]},
+    ],
+    "password_reset": [{"key": "ip", "rate": "5/h", "methods": ["POST"]}],
+    "images:create": [{"key": "user", "rate": "30/h", "methods": ["POST"]}],
+    "images:import": [{"key": "user", "rate": "5/h", "methods": ["POST"]}],
+    "images:export": [{"key": "user", "rate": "5/h"}],
+    "images:like": [{"key": "user", "rate": "60/m"}],
+    "user_follow": [{"key": "user", "rate": "30/m"}],
+    "api:v1:image_list": [{"key": "user", "rate": "30/h", "methods": ["POST"]}],
+    "api:v1:image_like": [{"key": "user", "rate": "60/m"}],
+    "api:v1:user_follow": [{"key": "user", "rate": "30/m"}],
+}
+# Only enable behind a reverse proxy that overwrites `X-Forwarded-For`.
+RATELIMIT_TRUST_X_FORWARDED_FOR = False
@@ -0,0 +1,43 @@
+"""
+Test helpers shared by the apps' tests.
+"""
+
+from unittest import mock
+
+import fakeredis
+import redis
+from django.test import override_settings
+
+from bookmarks.redis_client import r
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class FakeRedisMixin:
+    """
+    Run the tests of a `SimpleTestCase` with an in-memory Redis, a local
+    memory cache and no rate limits. The class's own `override_settings` still
+    apply over these.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Swap the shared client's connection pool, so every module using it
+        #   (including signal handlers run by `setUpTestData()`) talks to the
+        #   in-memory Redis.
+        patcher = mock.patch.object(
+            r, "connection_pool", fakeredis.FakeRedis().connection_pool
+        )
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        overrides = override_settings(CACHES=CACHES, RATELIMIT_ENABLED=False)
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+        super().setUpClass()
+
+
+def redis_unavailable():
+    """
+    Patch the shared client to connect to a port nothing listens on.
+    """
+    return mock.patch.object(r, "connection_pool", redis.ConnectionPool(port=1))
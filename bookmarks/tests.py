@@ -0,0 +1,548 @@
+import importlib
+import io
+import itertools
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import redis
+from benchmarks import data
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from easy_thumbnails.files import get_thumbnailer
+from easy_thumbnails.models import Thumbnail
+from images import variants
+from images.models import Image
+from PIL import Image as PILImage
+
+from bookmarks import fragments, profiling, ratelimit
+from bookmarks.backfill import backfill_count
+from bookmarks.media import THUMBNAIL_NAME_RE
+from bookmarks.media_gc import QUEUE_KEY
+from bookmarks.redis_client import r
+from bookmarks.replicas import PIN_COOKIE, ReplicaRouter, replicate, use_replicas
+from bookmarks.testing import FakeRedisMixin
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def picture_file(size: tuple[int, int]) -> ContentFile:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", size, (200, 120, 40)).save(buffer, "JPEG")
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], MEDIA_ROOT=MEDIA_ROOT)
+class ReplicaRoutingTests(FakeRedisMixin, TransactionTestCase):
+    """
+    Reads of safe requests go to a replica, except for users who just wrote.
+    The replica is a second SQLite database that only catches up with the
+    primary when `replicate()` is called: until then, it lags behind.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Only for these tests, rather than in the settings: the test runner
+        #   would create a replica database for every run. This one is only
+        #   written to by `replicate()`.
+        cls.replica_dir = tempfile.mkdtemp()
+        primary = connections["default"]
+        connections["replica"] = primary.__class__(
+            {
+                **primary.settings_dict,
+                "NAME": str(Path(cls.replica_dir, "replica.sqlite3")),
+            },
+            "replica",
+        )
+        cls.addClassCleanup(cls.remove_replica)
+
+    @classmethod
+    def remove_replica(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        owner = User.objects.create_user("owner")
+        self.image = Image.objects.create(
+            user=owner,
+            title="Sunset",
+            url="https://example.com/sunset.jpg",
+            image=data.sample_image_name(),
+        )
+        self.url = self.image.get_absolute_url()
+        self.liker, self.viewer = Client(), Client()
+        self.liker.force_login(User.objects.create_user("liker"))
+        self.viewer.force_login(User.objects.create_user("viewer"))
+        replicate("replica")
+
+    def assertLikes(self, client: Client, total: int):
+        response = client.get(self.url)
+        self.assertContains(response, f'<span class="total">{total}</span>')
+
+    def test_users_see_their_own_writes(self):
+        response = self.liker.post(
+            reverse("images:like"), {"id": self.image.id, "action": "like"}
+        )
+        self.assertEqual(response.json(), {"status": "ok"})
+        self.assertIn(PIN_COOKIE, self.liker.cookies)
+        # Pinned to the primary.
+        self.assertLikes(self.liker, 1)
+        # Others read the replica, which didn't catch up yet.
+        self.assertLikes(self.viewer, 0)
+
+        replicate("replica")
+        self.assertLikes(self.viewer, 1)
+
+    def test_pin_expires(self):
+        self.liker.post(reverse("images:like"), {"id": self.image.id, "action": "like"})
+        del self.liker.cookies[PIN_COOKIE]
+        # Stale: only with replicas lagging longer than `REPLICA_PIN_SECONDS`.
+        self.assertLikes(self.liker, 0)
+
+    def test_safe_requests_read_from_replicas(self):
+        router = ReplicaRouter()
+        token = use_replicas.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Image), "replica")
+            self.assertEqual(router.db_for_write(Image), "default")
+        finally:
+            use_replicas.reset(token)
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Image), "default")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaTests(FakeRedisMixin, TestCase):
+    """
+    Media are served with validators, and only from the public directories.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in [
+            "images/2026/10/19/sunset.jpg",
+            "variants/3f/3f2a9c0e4b1d7a65_640w.webp",
+            "imports/2026/10/19/bookmarks.html",
+        ]:
+            path = Path(MEDIA_ROOT, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"content")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_serves_public_files_with_validators(self):
+        response = self.client.get("/media/images/2026/10/19/sunset.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"content")
+        self.assertIn("max-age=86400", response["Cache-Control"])
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            "/media/images/2026/10/19/sunset.jpg",
+            headers={"If-None-Match": response["ETag"]},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_content_hashed_names_are_immutable(self):
+        response = self.client.get("/media/variants/3f/3f2a9c0e4b1d7a65_640w.webp")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_private_files_are_not_served(self):
+        for path in [
+            "/media/imports/2026/10/19/bookmarks.html",
+            "/media/images/../imports/2026/10/19/bookmarks.html",
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_missing_files(self):
+        self.assertEqual(self.client.get("/media/images/missing.jpg").status_code, 404)
+
+    def test_thumbnails_are_named_by_content(self):
+        name = "images/2026/10/19/photo.jpg"
+        options = {"size": (32, 32), "crop": True}
+        default_storage.save(name, picture_file((64, 48)))
+        thumbnail = get_thumbnailer(default_storage, name).get_thumbnail(options)
+        self.assertRegex(thumbnail.name, THUMBNAIL_NAME_RE)
+        response = self.client.get(f"/media/{thumbnail.name}")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        # Replaced under the same name.
+        default_storage.delete(name)
+        default_storage.save(name, picture_file((80, 60)))
+        replaced = get_thumbnailer(default_storage, name).get_thumbnail(options)
+        self.assertNotEqual(replaced.name, thumbnail.name)
+
+
+@override_settings(MEDIA_GC_MIN_AGE=0)
+class MediaGCTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.owner = User.objects.create_user("owner")
+        r.flushdb()
+
+    def create_image(self, name: str) -> Image:
+        name = default_storage.save(name, picture_file((64, 48)))
+        return Image.objects.create(
+            user=self.owner, title=name, url="https://example.com/a.jpg", image=name
+        )
+
+    def gc_media(self, *args) -> str:
+        stdout = io.StringIO()
+        call_command("gc_media", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def delete_media(self) -> str:
+        stdout = io.StringIO()
+        call_command("delete_media", "--once", stdout=stdout)
+        return stdout.getvalue()
+
+    def thumbnail(self, name: str) -> str:
+        return (
+            get_thumbnailer(default_storage, name)
+            .get_thumbnail({"size": (32, 32)})
+            .name
+        )
+
+    def test_orphans_are_deleted(self):
+        image = self.create_image("images/kept.jpg")
+        profile = self.owner.profile
+        profile.photo = default_storage.save("users/photo.jpg", picture_file((40, 40)))
+        profile.save()
+        orphan = default_storage.save("images/orphan.jpg", picture_file((80, 60)))
+        with self.settings(IMAGE_VARIANT_WIDTHS=[16, 32]), mock.patch.object(
+            variants, "available_formats", return_value=["webp"]
+        ):
+            with default_storage.open(image.image.name) as file:
+                image.variants = variants.generate_variants(file)
+            image.variants_digest = variants.variants_digest(image.variants)
+            image.save()
+            # Of a picture no image has anymore.
+            with default_storage.open(orphan) as file:
+                orphan_variants = variants.generate_variants(file)
+        kept = [
+            image.image.name,
+            profile.photo.name,
+            self.thumbnail(image.image.name),
+            *(v["name"] for v in image.variants["webp"]),
+        ]
+        orphans = [
+            orphan,
+            self.thumbnail(orphan),
+            *(v["name"] for v in orphan_variants["webp"]),
+        ]
+
+        listed = self.gc_media("--dry-run").splitlines()[:-1]
+        self.assertEqual(sorted(listed), sorted(orphans))
+        self.assertTrue(all(default_storage.exists(name) for name in orphans))
+
+        self.gc_media()
+        for name in kept:
+            self.assertTrue(default_storage.exists(name), name)
+        for name in orphans:
+            self.assertFalse(default_storage.exists(name), name)
+
+    def test_queued_deletions(self):
+        shared = self.create_image("images/shared.jpg")
+        Image.objects.create(
+            user=self.owner,
+            title="Copy",
+            url="https://example.com/a.jpg",
+            image=shared.image.name,
+        )
+        alone = self.create_image("images/alone.jpg")
+        thumbnail = self.thumbnail(alone.image.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            shared.delete()
+            alone.delete()
+        self.assertEqual(r.llen(QUEUE_KEY), 2)
+
+        self.delete_media()
+        self.assertEqual(r.llen(QUEUE_KEY), 0)
+        self.assertFalse(default_storage.exists(alone.image.name))
+        self.assertFalse(default_storage.exists(thumbnail))
+        # Still used by the copy.
+        self.assertTrue(default_storage.exists(shared.image.name))
+
+        # Deleting again (e.g. names queued twice) is harmless.
+        r.rpush(QUEUE_KEY, alone.image.name, shared.image.name)
+        self.delete_media()
+        self.assertEqual(r.llen(QUEUE_KEY), 0)
+        self.assertTrue(default_storage.exists(shared.image.name))
+
+    def test_failed_deletions_are_retried_by_gc(self):
+        image = self.create_image("images/photo.jpg")
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        with mock.patch.object(
+            default_storage, "delete", side_effect=PermissionError
+        ), self.assertLogs("bookmarks.media_gc", "ERROR"):
+            self.delete_media()
+        self.assertTrue(default_storage.exists(image.image.name))
+
+        self.gc_media()
+        self.assertFalse(default_storage.exists(image.image.name))
+
+    def test_thumbnails_of_previous_names_are_deleted(self):
+        image = self.create_image("images/photo.jpg")
+        thumbnailer = get_thumbnailer(image.image)
+        thumbnailer.thumbnail_namer = "easy_thumbnails.namers.source_hashed"
+        previous = thumbnailer.get_thumbnail({"size": (32, 32)}).name
+        current = get_thumbnailer(image.image).get_thumbnail({"size": (32, 32)}).name
+        self.assertTrue(default_storage.exists(previous))
+
+        self.gc_media()
+
+        self.assertTrue(default_storage.exists(image.image.name))
+        self.assertTrue(default_storage.exists(current))
+        self.assertFalse(default_storage.exists(previous))
+        self.assertFalse(Thumbnail.objects.filter(name=previous).exists())
+
+
+class FragmentTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner")
+        cls.images = [
+            Image.objects.create(
+                user=owner, title=title, url="https://example.com/a.jpg", image="a.jpg"
+            )
+            for title in ("Sunset", "Dawn")
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self) -> list[str]:
+        return fragments.render_fragments(
+            "images/image/card.html",
+            "image",
+            self.images,
+            lambda image: [(Image, image.id)],
+        )
+
+    def test_rendered_until_bumped(self):
+        with mock.patch.object(
+            fragments, "render_to_string", wraps=fragments.render_to_string
+        ) as render_to_string:
+            cards = self.render()
+            self.assertEqual(self.render(), cards)
+            self.assertEqual(render_to_string.call_count, 2)
+
+            sunset = self.images[0]
+            sunset.title = "Sunrise"
+            sunset.save()
+            self.assertIn("Sunrise", self.render()[0])
+            self.assertEqual(render_to_string.call_count, 3)
+
+    def test_redis_unavailable(self):
+        unavailable = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://127.0.0.1:1/1",
+            }
+        }
+        with self.settings(CACHES=unavailable), self.assertLogs(
+            "bookmarks.fragments", "ERROR"
+        ):
+            # Rendered without the cache, and changes still saved.
+            self.assertIn("Sunset", self.render()[0])
+            self.images[1].save()
+            self.images[1].user.save()
+
+
+class BackfillCountTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner")
+        likers = [User.objects.create_user(f"liker{i}") for i in range(3)]
+        cls.images = [
+            Image.objects.create(
+                user=owner, title=f"Image {i}", url=f"https://example.com/{i}.jpg"
+            )
+            for i in range(5)
+        ]
+        # Some images have no like at all.
+        cls.expected = [2, 0, 1, 0, 3]
+        for image, likes in zip(cls.images, cls.expected):
+            image.users_like.add(*likers[:likes])
+
+    def setUp(self):
+        # As before the backfill.
+        Image.objects.update(total_likes=99)
+
+    def assertCounts(self, expected: list[int]):
+        self.assertEqual(
+            list(Image.objects.order_by("id").values_list("total_likes", flat=True)),
+            expected,
+        )
+
+    def test_batches(self):
+        progress = []
+        done = backfill_count(
+            Image,
+            "total_likes",
+            Image.users_like.through,
+            "image",
+            batch_size=2,
+            progress=lambda done, last_pk: progress.append((done, last_pk)),
+        )
+        self.assertEqual(done, 5)
+        self.assertCounts(self.expected)
+        ids = [image.id for image in self.images]
+        self.assertEqual(progress, [(2, ids[1]), (4, ids[3]), (5, ids[4])])
+
+    def test_resumes_after_a_pk(self):
+        backfill_count(
+            Image,
+            "total_likes",
+            Image.users_like.through,
+            "image",
+            batch_size=2,
+            start_after=self.images[2].id,
+        )
+        self.assertCounts([99, 99, 99, 0, 3])
+
+    def test_migration(self):
+        migration = importlib.import_module(
+            "images.migrations.0003_patch_image_total_likes"
+        )
+        with mock.patch.object(migration, "BATCH_SIZE", 2):
+            migration.patch_image_total_likes(apps, connection.schema_editor())
+        self.assertCounts(self.expected)
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATELIMITS={"login": [{"key": "ip", "rate": "2/m", "methods": ["POST"]}]},
+)
+class RateLimitTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Within a single window.
+        clock = mock.patch.object(ratelimit, "time", **{"time.return_value": 6000.0})
+        clock.start()
+        cls.addClassCleanup(clock.stop)
+        super().setUpClass()
+
+    def setUp(self):
+        r.flushdb()
+        self.url = reverse("login")
+
+    def login(self):
+        return self.client.post(self.url, {"username": "a", "password": "b"})
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate("10/m"), (10, 60))
+        self.assertEqual(ratelimit.parse_rate("100/5m"), (100, 300))
+
+    def test_rejects_requests_over_the_rate(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 200)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+
+    def test_only_counts_the_rule_methods(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_previous_window_counts_for_its_overlap(self):
+        self.login()
+        self.login()
+        # Half of the previous window still overlaps the last minute.
+        with mock.patch.object(ratelimit.time, "time", return_value=6090.0):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_fails_open_without_redis(self):
+        with mock.patch.object(r, "pipeline", side_effect=redis.ConnectionError):
+            for _ in range(3):
+                self.assertEqual(self.login().status_code, 200)
+
+
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        patcher = mock.patch.object(profiling, "saves", itertools.count(1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def save_profiles(self, count: int) -> list[Path]:
+        return [
+            profiling.save_profile(
+                Counter({"view;query": 2}), {"url_name": f"view-{i}"}
+            )
+            for i in range(count)
+        ]
+
+    @override_settings(PROFILING_MAX_PROFILES=3, PROFILING_PRUNE_EVERY=5)
+    def test_keeps_the_newest_profiles(self):
+        with self.settings(PROFILING_DIR=self.directory):
+            paths = self.save_profiles(4)
+            self.assertEqual(len(list(self.directory.glob("*.collapsed"))), 4)
+            # Pruned on the 5th, not since.
+            paths += self.save_profiles(3)
+        self.assertEqual(sorted(self.directory.glob("*.collapsed")), paths[2:])
+        self.assertEqual(len(list(self.directory.glob("*.json"))), 5)
+        self.assertEqual(paths[-1].read_text(), "view;query 2\n")
+
+    @override_settings(PROFILING_PRUNE_EVERY=1)
+    def test_failed_prune(self):
+        with (
+            self.settings(PROFILING_DIR=self.directory),
+            mock.patch.object(profiling, "prune_profiles", side_effect=OSError),
+            self.assertLogs("bookmarks.profiling", "ERROR"),
+        ):
+            [path] = self.save_profiles(1)
+        self.assertTrue(path.exists())
+
+    def test_failed_save_returns_the_response(self):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get(
+            "/", headers={profiling.HEADER: profiling.make_token()}
+        )
+        # Can't create a directory under a file.
+        file = self.directory / "file"
+        file.touch()
+        with (
+            self.settings(PROFILING_DIR=file / "profiles"),
+            self.assertLogs("bookmarks.profiling", "ERROR"),
+        ):
+            response = middleware(request)
+        self.assertEqual(response.status_code, 200)
@@ -1,13 +1,60 @@
+from pathlib import Path
 from typing import Protocol, cast
 
 from django.conf import settings
 
 
 class _SettingsProtocol(Protocol):
+    BASE_DIR: Path
     AUTH_USER_MODEL: str
+    SOCIAL_AUTH_GOOGLE_OAUTH2_KEY: str
+    SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET: str
+    ASYNC_VIEWS: bool
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_DB: int
+    REDIS_CLIENT_CLASS: str
+    REDIS_ASYNC_CLIENT_CLASS: str
+    DATABASE_REPLICAS: list[str]
+    REPLICA_PIN_SECONDS: int
+    MEDIA_ROOT: str
+    MEDIA_SENDFILE_HEADER: str | None
+    MEDIA_ACCEL_REDIRECT_PREFIX: str
+    MEDIA_PUBLIC_DIRS: list[str]
+    MEDIA_CACHE_MAX_AGE: int
+    MEDIA_GC_DIRS: list[str]
+    MEDIA_GC_MIN_AGE: int
+    PROFILE_PHOTO_MAX_PIXELS: int
+    PROFILE_PHOTO_MAX_UNSCALED_PIXELS: int
+    PROFILE_PHOTO_MAX_SIZE: int
+    PROFILE_PHOTO_QUALITY: int
+    IMAGE_VARIANT_WIDTHS: list[int]
+    IMAGE_VARIANT_FORMATS: list[str]
+    IMAGE_VARIANT_QUALITY: dict[str, int]
+    NEAR_DUPLICATE_DISTANCE: int
+    VIEWERS_DAYS_KEPT: int
+    VIEWERS_WEEKS_KEPT: int
+    RANKING_BY_UNIQUE_VIEWERS: bool
+    LIVE_COALESCE_INTERVAL: float
+    LIVE_HEARTBEAT_INTERVAL: float
+    LIVE_MAX_IMAGES: int
+    IMPORT_BATCH_SIZE: int
+    IMPORT_MAX_WORKERS: int
+    IMPORT_PER_HOST: int
+    IMPORT_HOST_DELAY: float
+    IMPORT_MAX_IMAGE_BYTES: int
+    IMPORT_STALE_MINUTES: int
+    EXPORT_ROW_CHUNK_SIZE: int
+    EXPORT_FILE_CHUNK_SIZE: int
+    PROFILING_DIR: Path
+    PROFILING_MAX_PROFILES: int
+    PROFILING_PRUNE_EVERY: int
+    PROFILING_SAMPLE_RATE: float
+    PROFILING_INTERVAL: float
+    PROFILING_TOKEN_MAX_AGE: int
+    RATELIMIT_ENABLED: bool
+    RATELIMITS: dict[str, list[dict]]
+    RATELIMIT_TRUST_X_FORWARDED_FOR: bool
 
 
 settings = cast(_SettingsProtocol, settings)
@@ -20,15 +20,21 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-urlpatterns = (
-    [
-        path("admin/", admin.site.urls),
-        path("account/", include("account.urls")),
-        path("social-auth/", include("social_django.urls", namespace="social")),
-        path("images/", include("images.urls", namespace="images")),
+from .media import serve_media
+
+urlpatterns = [
+    path("admin/", admin.site.urls),
+    path("account/", include("account.urls")),
+    path("social-auth/", include("social_django.urls", namespace="social")),
+    path("images/", include("images.urls", namespace="images")),
+    path("api/", include("api.urls", namespace="api")),
+    # Unlike `static()`, also served when `DEBUG = False` (see `bookmarks.media`).
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name="media"),
+] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    # Development tools, only installed when `DEBUG` (see `bookmarks.settings`).
+    urlpatterns += [
         path("__reload__/", include("django_browser_reload.urls")),
         path("__debug__/", include("debug_toolbar.urls")),
     ]
-    + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-)
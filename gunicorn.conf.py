@@ -0,0 +1,24 @@
+# Gunicorn configuration, read from the working directory.
+# https://docs.gunicorn.org/en/stable/settings.html
+
+import gc
+
+wsgi_app = "bookmarks.wsgi:application"
+
+# Load the application once, in the master process, instead of in every
+#   worker: workers start faster and share its memory (copy-on-write).
+preload_app = True
+
+# No collections while the application is loaded: they would leave freed
+#   holes among the objects shared with the workers (see `gc.freeze()`).
+gc.disable()
+
+
+def when_ready(server):
+    # Before the workers are forked, which inherit the collector enabled
+    #   again: the master keeps running (and allocating) for as long as the
+    #   server does.
+    from bookmarks.preload import freeze
+
+    freeze()
+    gc.enable()
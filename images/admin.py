@@ -1,9 +1,15 @@
 from django.contrib import admin
 
-from .models import Image
+from .models import Image, ImportJob
 
 
 @admin.register(Image)
 class ImageAdmin(admin.ModelAdmin):
     list_display = ["title", "slug", "image", "created", "total_likes"]
     list_filter = ["created"]
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ["user", "status", "total", "processed", "imported", "created"]
+    list_filter = ["status", "created"]
@@ -0,0 +1,192 @@
+"""
+Native async versions of the views that mostly wait on Redis or other hosts,
+routed instead of `views` when `ASYNC_VIEWS` is enabled.
+
+They await that I/O on the event loop, and only hop to a thread
+(`sync_to_async`) for what Django can't run asynchronously: template
+rendering, sessions and ORM calls without an async variant.
+"""
+
+import httpx
+import orjson
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.http import HttpRequest, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.urls import reverse
+
+from bookmarks.redis_client import ar
+from bookmarks.typing import settings
+
+from . import export, live, recommendations, viewers
+from .forms import DOWNLOAD_ERROR, ImageCreateForm, validate_image_url
+from .models import Image
+from .views import create_image, export_headers, near_duplicates
+
+# Shared by every request of the process, to reuse connections (and TLS
+#   sessions) to the hosts images are bookmarked from.
+http_client = httpx.AsyncClient(follow_redirects=True, timeout=10)
+
+
+async def download_image(url: str) -> bytes | ValidationError:
+    try:
+        response = await http_client.get(url)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return ValidationError(DOWNLOAD_ERROR, code="download")
+    return response.content
+
+
+@login_required
+async def image_create(request: HttpRequest):
+    if request.method == "POST":
+        content = None
+        try:
+            url = validate_image_url(request.POST.get("url", ""))
+        except ValidationError:
+            pass  # Reported by the form.
+        else:
+            # Wait for the other host without holding a thread.
+            content = await download_image(url)
+        form = ImageCreateForm(data=request.POST, content=content)
+        # Decodes the image.
+        if await sync_to_async(form.is_valid)():
+            new_image = await sync_to_async(create_image)(request, form)
+            return redirect(new_image.get_absolute_url())
+    else:
+        form = ImageCreateForm(initial=request.GET.dict())
+
+    return await sync_to_async(render)(
+        request, "images/image/create.html", {"section": "images", "form": form}
+    )
+
+
+async def image_detail(request: HttpRequest, id, slug):
+    image = await aget_object_or_404(Image, id=id, slug=slug)
+    # Count the view and the viewer, and update the rankings, in a single round
+    #   trip (two for a new viewer).
+    total_views, total_viewers = await viewers.arecord_view(
+        image.id, await viewers.aviewer_id(request)
+    )
+    await live.apublish(image.id, views=total_views)
+    similar_ids = await recommendations.aget_similar_image_ids(image.id)
+    images_by_id = await Image.objects.ain_bulk(similar_ids)
+    return await sync_to_async(render)(
+        request,
+        "images/image/detail.html",
+        {
+            "section": "images",
+            "image": image,
+            "total_views": total_views,
+            "total_viewers": total_viewers,
+            "near_duplicates": await sync_to_async(near_duplicates)(image),
+            "similar_images": [
+                images_by_id[id] for id in similar_ids if id in images_by_id
+            ],
+            "events_url": f"{reverse('images:events')}?ids={image.id}",
+        },
+    )
+
+
+@login_required
+async def image_ranking(request: HttpRequest):
+    # Only the top 10, not the whole sorted set.
+    image_ranking_list: list[tuple[bytes, int]] = await ar.zrange(
+        viewers.ranking_key(), 0, 9, desc=True, withscores=True, score_cast_func=int
+    )
+    image_ranking = {int(key): value for key, value in image_ranking_list}
+    image_ranking_ids = list(image_ranking)
+    most_viewed = [
+        image async for image in Image.objects.filter(id__in=image_ranking_ids)
+    ]
+    # Sort by index of appearance in the image ranking.
+    most_viewed.sort(key=lambda image: image_ranking_ids.index(image.id))
+    for image in most_viewed:
+        image.views = image_ranking.get(image.id)
+
+    return await sync_to_async(render)(
+        request,
+        "images/image/ranking.html",
+        {
+            "section": "images",
+            "most_viewed": most_viewed,
+            "by_viewers": settings.RANKING_BY_UNIQUE_VIEWERS,
+        },
+    )
+
+
+@login_required
+async def image_export(request: HttpRequest):
+    # A sync iterator would be read whole before the response is sent.
+    user = await request.auser()
+    return StreamingHttpResponse(
+        export.astream_archive(user),
+        content_type="application/zip",
+        headers=export_headers(user),
+    )
+
+
+def get_total_likes(ids: list[int]) -> dict[int, int]:
+    # Run in a shared executor thread, and the connection closed right away:
+    #   opened from the request's context, it would stay open as long as the
+    #   stream, i.e. a database connection per idle browser.
+    try:
+        return dict(Image.objects.filter(id__in=ids).values_list("id", "total_likes"))
+    finally:
+        connection.close()
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return b"event: %s\ndata: %s\n\n" % (event.encode(), orjson.dumps(data))
+
+
+async def image_events(request: HttpRequest):
+    """
+    Stream the like and view counts of the images in `?ids=1,2,3` as
+    Server-Sent Events: their current values, then every update.
+
+    Idle connections only hold a coroutine and a `live.Listener`, no thread.
+    """
+    try:
+        ids = sorted({int(id) for id in request.GET.get("ids", "").split(",") if id})
+    except ValueError:
+        return HttpResponseBadRequest("Invalid image ids.")
+    if not 0 < len(ids) <= settings.LIVE_MAX_IMAGES:
+        return HttpResponseBadRequest(
+            f"Give between 1 and {settings.LIVE_MAX_IMAGES} image ids."
+        )
+
+    async def events():
+        listener = live.Listener(ids)
+        # Subscribed inside the stream, so the `finally` clause runs however
+        #   the connection ends.
+        await live.broadcaster.subscribe(listener)
+        try:
+            # Current values, read after subscribing so no update is missed.
+            likes = await sync_to_async(get_total_likes, thread_sensitive=False)(ids)
+            views = []
+            if likes:
+                views = await ar.mget([viewers.views_key(id) for id in likes])
+            yield b"retry: 5000\n\n"
+            for (id, total_likes), total_views in zip(likes.items(), views):
+                yield sse_event(
+                    "counts",
+                    {"id": id, "likes": total_likes, "views": int(total_views or 0)},
+                )
+            while True:
+                updates = await listener.get(settings.LIVE_HEARTBEAT_INTERVAL)
+                if not updates:
+                    # A comment, so proxies don't close the idle connection.
+                    yield b": heartbeat\n\n"
+                for id, counts in updates.items():
+                    yield sse_event("counts", {"id": id, **counts})
+        finally:
+            live.broadcaster.unsubscribe(listener)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Tell nginx not to buffer the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
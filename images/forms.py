@@ -1,9 +1,37 @@
-import requests
 from django import forms
 from django.core.files.base import ContentFile
 from django.utils.text import slugify
 
-from .models import Image
+from .models import Image, ImportJob
+
+VALID_EXTENSIONS = ["jpg", "jpeg", "png"]
+DOWNLOAD_ERROR = "The image couldn't be downloaded from the given URL."
+IMAGE_ERROR = "The given URL doesn't point to an image, or it's too large."
+
+
+def validate_image_url(url: str) -> str:
+    """
+    Return `url` without its querystring if it points to a supported image.
+    """
+    url = url.split("?")[0]  # To discard any querystring.
+    extension = url.rsplit(".", 1)[-1].lower()  # Splitting starts at the end.
+    if extension not in VALID_EXTENSIONS:
+        raise forms.ValidationError(
+            f"The given URL does not match valid image extensions. {extension}"
+        )
+    return url
+
+
+def download_image(url: str) -> bytes:
+    # Deferred, the HTTP client is only loaded by workers that save an image.
+    import requests
+
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException:
+        raise forms.ValidationError(DOWNLOAD_ERROR, code="download")
+    return response.content
 
 
 class ImageCreateForm(forms.ModelForm):
@@ -16,15 +44,38 @@ class ImageCreateForm(forms.ModelForm):
             "url": forms.HiddenInput,
         }
 
+    def __init__(
+        self, *args, content: bytes | forms.ValidationError | None = None, **kwargs
+    ):
+        """
+        Pass the `content` of the image URL if already downloaded (e.g. by an
+        async view or an import), or the error downloading it, to skip
+        downloading it here.
+        """
+        super().__init__(*args, **kwargs)
+        self.content = content
+        self.file = None
+
     def clean_url(self):
-        url: str = self.cleaned_data["url"]
-        url = url.split("?")[0]  # To discard any querystring.
-        valid_extensions = ["jpg", "jpeg", "png"]
-        extension = url.rsplit(".", 1)[1].lower()  # Splitting starts at the end.
-        if extension not in valid_extensions:
-            raise forms.ValidationError(
-                f"The given URL does not match valid image extensions. {extension}"
-            )
+        url = validate_image_url(self.cleaned_data["url"])
+        content = self.content if self.content is not None else download_image(url)
+        if isinstance(content, forms.ValidationError):
+            raise content
+
+        # Deferred, the image processing libraries are only loaded by workers
+        #   that save an image.
+        from PIL import Image as PILImage
+
+        from .ingest import process_image
+
+        # Decoded here rather than when saving, so that what isn't a picture
+        #   (e.g. an error page) is an error of the form.
+        file = ContentFile(content)
+        try:
+            process_image(self.instance, file)
+        except (OSError, PILImage.DecompressionBombError):
+            raise forms.ValidationError(IMAGE_ERROR, code="image")
+        self.file = file
         return url
 
     def save(self, force_insert=False, force_update=False, commit=True):
@@ -34,12 +85,22 @@ class ImageCreateForm(forms.ModelForm):
         extension = image_url.rsplit(".", 1)[1].lower()
         image_name = f"{name}.{extension}"
 
-        # Download image from the given URL.
-        response = requests.get(image_url)
         # `save=False` prevents the object (`image`) from being saved to the db.
-        image.image.save(image_name, ContentFile(response.content), save=False)
+        image.image.save(image_name, self.file, save=False)
 
         # To maintain the same behavior as the original `save()`.
         if commit:
             image.save()
         return image
+
+
+class ImportJobForm(forms.ModelForm):
+    class Meta:
+        model = ImportJob
+        fields = ["file"]
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if not file.name.lower().endswith((".html", ".htm", ".csv")):
+            raise forms.ValidationError("Upload a bookmarks HTML export or a CSV file.")
+        return file
@@ -0,0 +1,337 @@
+import csv
+import io
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from html.parser import HTMLParser
+from itertools import chain, islice, zip_longest
+from typing import Iterator
+from urllib.parse import urlparse
+
+import requests
+from actions.utils import create_action
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from bookmarks.typing import settings
+
+from . import search
+from .forms import ImageCreateForm, validate_image_url
+from .models import Image, ImportJob
+
+# `(url, title, description)`
+Row = tuple[str, str, str]
+
+# Errors kept on the job for the user to review.
+MAX_ERRORS = 100
+
+
+class BookmarksParser(HTMLParser):
+    """
+    Collect the links of a Netscape bookmarks file, as exported by browsers:
+    `<DT><A HREF="url">title</A>`, optionally followed by `<DD>description`.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: list[Row] = []
+        self.href = None
+        self.text = []
+        self.pending = None
+        self.in_description = False
+
+    def flush(self):
+        if self.pending is not None:
+            url, title = self.pending
+            self.rows.append((url, title, "".join(self.text).strip()))
+            self.pending = None
+        self.in_description = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self.flush()
+            self.href = dict(attrs).get("href")
+            self.text = []
+        elif tag == "dd" and self.pending is not None:
+            self.in_description = True
+            self.text = []
+        elif tag in ("dt", "dl", "h3"):
+            self.flush()
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self.href is not None:
+            self.pending = (self.href, "".join(self.text).strip())
+            self.href = None
+            self.text = []
+        elif tag == "dl":
+            self.flush()
+
+    def handle_data(self, data):
+        if self.href is not None or self.in_description:
+            self.text.append(data)
+
+    def pop_rows(self) -> list[Row]:
+        rows, self.rows = self.rows, []
+        return rows
+
+
+def parse_html(lines) -> Iterator[Row]:
+    # Fed line by line, so a large export is never held in memory at once.
+    parser = BookmarksParser()
+    for line in lines:
+        parser.feed(line)
+        yield from parser.pop_rows()
+    parser.close()
+    parser.flush()
+    yield from parser.pop_rows()
+
+
+def parse_csv(lines) -> Iterator[Row]:
+    """
+    Read `url,title,description` rows, with or without that header (in any
+    order, only `url` is required).
+    """
+    reader = csv.reader(lines)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [column.strip().lower() for column in first]
+    if "url" in header:
+        columns = [
+            header.index(name) if name in header else None
+            for name in ("url", "title", "description")
+        ]
+    else:
+        # No header, the first row is a bookmark.
+        columns = [0, 1, 2]
+        reader = chain([first], reader)
+    for row in reader:
+        values = [
+            row[i].strip() if i is not None and i < len(row) else "" for i in columns
+        ]
+        if values[0]:
+            yield tuple(values)
+
+
+def parse_bookmarks(file, name: str) -> Iterator[Row]:
+    lines = io.TextIOWrapper(file, encoding="utf-8", errors="replace", newline="")
+    if name.lower().endswith(".csv"):
+        return parse_csv(lines)
+    return parse_html(lines)
+
+
+def interleave_hosts(urls: list[str]) -> list[str]:
+    # Round-robin over hosts, so workers aren't all held up by the politeness
+    #   limits of one host while other hosts' URLs wait in the queue.
+    by_host = defaultdict(list)
+    for url in urls:
+        by_host[urlparse(url).hostname].append(url)
+    return [
+        url
+        for urls in zip_longest(*by_host.values())
+        for url in urls
+        if url is not None
+    ]
+
+
+class Fetcher:
+    """
+    Download URLs with a bounded pool of threads, making at most `per_host`
+    concurrent requests to each host, started at least `delay` seconds apart.
+    """
+
+    def __init__(self, max_workers: int, per_host: int, delay: float, max_bytes: int):
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.delay = delay
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.slots = defaultdict(lambda: threading.Semaphore(per_host))
+        self.next_start = defaultdict(float)
+        # One session (connection pool) per thread.
+        self.local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.executor.shutdown(cancel_futures=True)
+
+    def fetch(self, urls: list[str]) -> dict[str, bytes | Exception]:
+        futures = {
+            url: self.executor.submit(self.download, url)
+            for url in interleave_hosts(urls)
+        }
+        results = {}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except (requests.RequestException, ValueError) as e:
+                results[url] = e
+        return results
+
+    def download(self, url: str) -> bytes:
+        host = urlparse(url).hostname
+        with self.lock:
+            slot = self.slots[host]
+        with slot:
+            with self.lock:
+                start = max(time.monotonic(), self.next_start[host])
+                self.next_start[host] = start + self.delay
+            time.sleep(max(0.0, start - time.monotonic()))
+
+            if not hasattr(self.local, "session"):
+                self.local.session = requests.Session()
+            with self.local.session.get(url, stream=True, timeout=10) as response:
+                response.raise_for_status()
+                content = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    content += chunk
+                    if len(content) > self.max_bytes:
+                        raise ValueError("The image is too large.")
+        return bytes(content)
+
+
+def add_error(job: ImportJob, url: str, error):
+    if len(job.errors) < MAX_ERRORS:
+        job.errors.append({"url": url, "error": str(error)})
+
+
+def import_batch(job: ImportJob, rows: list[Row], fetcher: Fetcher):
+    # Same validation as the bookmarklet's, the URL first: only valid ones are
+    #   downloaded.
+    candidates = []
+    for url, title, description in rows:
+        try:
+            url = validate_image_url(url)
+        except ValidationError as e:
+            job.skipped += 1
+            add_error(job, url, "; ".join(e.messages))
+            continue
+        # Titles are optional in bookmark files, default to the file name.
+        title = (title or url.rstrip("/").rsplit("/", 1)[-1])[:200]
+        candidates.append((url, title, description))
+
+    # Skip images the user already bookmarked, which also makes importing a
+    #   batch again (after an interruption) harmless.
+    existing = set(
+        Image.objects.filter(
+            user=job.user, url__in=[url for url, _, _ in candidates]
+        ).values_list("url", flat=True)
+    )
+    new_rows = {}
+    for url, title, description in candidates:
+        if url in existing or url in new_rows:
+            job.skipped += 1
+        else:
+            new_rows[url] = (title, description)
+
+    contents = fetcher.fetch(list(new_rows))
+    images = []
+    for url, (title, description) in new_rows.items():
+        content = contents[url]
+        if isinstance(content, Exception):
+            job.failed += 1
+            add_error(job, url, content)
+            continue
+        form = ImageCreateForm(
+            data={"url": url, "title": title, "description": description},
+            content=content,
+        )
+        # Decodes the image, one that can't be read fails only its row.
+        if not form.is_valid():
+            job.failed += 1
+            add_error(job, url, "; ".join(e for es in form.errors.values() for e in es))
+            continue
+        image = form.save(commit=False)
+        image.user = job.user
+        # Set by `Image.save()`, which `bulk_create()` doesn't call.
+        image.slug = slugify(image.title)
+        images.append(image)
+
+    # Rows and progress are committed together, so a resumed import starts
+    #   right after the last inserted batch.
+    with transaction.atomic():
+        Image.objects.bulk_create(images)
+        # `bulk_create()` sends no `post_save` signals, index the images here.
+        search.index_images(
+            (image.id, image.title, image.description, image.url) for image in images
+        )
+        job.processed += len(rows)
+        job.imported += len(images)
+        job.save()
+
+
+def run_import(job: ImportJob, progress=None):
+    """
+    Import (or resume importing) the bookmarks file of `job`.
+    """
+    job.status = ImportJob.Status.RUNNING
+    job.save(update_fields=["status", "updated"])
+    try:
+        if job.total is None:
+            with job.file.open("rb") as file:
+                job.total = sum(1 for _ in parse_bookmarks(file, job.file.name))
+            job.save(update_fields=["total", "updated"])
+
+        with job.file.open("rb") as file, Fetcher(
+            settings.IMPORT_MAX_WORKERS,
+            settings.IMPORT_PER_HOST,
+            settings.IMPORT_HOST_DELAY,
+            settings.IMPORT_MAX_IMAGE_BYTES,
+        ) as fetcher:
+            # Skip the rows handled before an interruption.
+            rows = islice(parse_bookmarks(file, job.file.name), job.processed, None)
+            while batch := list(islice(rows, settings.IMPORT_BATCH_SIZE)):
+                import_batch(job, batch, fetcher)
+                if progress:
+                    progress(job)
+    except Exception as e:
+        add_error(job, "", e)
+        finish(job, ImportJob.Status.FAILED)
+        raise
+
+    # A single summarized action, instead of one per image.
+    if job.imported:
+        create_action(
+            job.user, f"imported {job.imported} image{'s' if job.imported > 1 else ''}"
+        )
+    finish(job, ImportJob.Status.DONE)
+
+
+def finish(job: ImportJob, status: ImportJob.Status):
+    # The uploaded file holds the user's bookmarks, keep it no longer than the
+    #   import needs it.
+    job.file.delete(save=False)
+    job.status = status
+    job.save()
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Mark running imports that stopped making progress as pending again, to be
+    resumed: they save their progress after every batch, so those not updated
+    for a while lost their worker (e.g. to a restart).
+    """
+    stale = timezone.now() - timedelta(minutes=settings.IMPORT_STALE_MINUTES)
+    return ImportJob.objects.filter(
+        status=ImportJob.Status.RUNNING, updated__lt=stale
+    ).update(status=ImportJob.Status.PENDING)
+
+
+def claim_job() -> ImportJob | None:
+    """
+    Take the oldest pending import, which no other worker can take anymore.
+    """
+    pending = ImportJob.objects.filter(status=ImportJob.Status.PENDING)
+    while job := pending.order_by("created").first():
+        # Only one worker's update finds it still pending.
+        if pending.filter(id=job.id).update(
+            status=ImportJob.Status.RUNNING, updated=timezone.now()
+        ):
+            job.status = ImportJob.Status.RUNNING
+            return job
+    return None
@@ -0,0 +1,18 @@
+from django.core.files.base import File
+from PIL import Image as PILImage
+
+from . import metadata, phash, variants
+from .models import Image
+
+
+def process_image(image: Image, file: File):
+    """
+    Derive everything stored about a picture, once, when it's ingested.
+    """
+    for field, value in metadata.extract_metadata(file).items():
+        setattr(image, field, value)
+    with PILImage.open(file) as picture:
+        phash.set_hash(image, phash.dhash(picture))
+    image.variants = variants.generate_variants(file)
+    image.variants_digest = variants.variants_digest(image.variants)
+    file.seek(0)
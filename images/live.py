@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+import orjson
+from redis.exceptions import ConnectionError
+
+from bookmarks.redis_client import ar, r
+from bookmarks.typing import settings
+
+logger = logging.getLogger(__name__)
+
+
+def channel(image_id: int) -> str:
+    return f"image:{image_id}:counts"
+
+
+# Totals are published rather than deltas: coalescing only keeps the latest,
+#   and a missed message is corrected by the next one.
+def publish(image_id: int, **counts: int):
+    """
+    Publish the new totals of an image's counters, e.g. `likes=3`.
+    """
+    r.publish(channel(image_id), orjson.dumps(counts))
+
+
+async def apublish(image_id: int, **counts: int):
+    await ar.publish(channel(image_id), orjson.dumps(counts))
+
+
+class Listener:
+    """
+    Counter updates waiting to be sent to one connection, merged until it
+    reads them.
+    """
+
+    def __init__(self, image_ids: list[int]):
+        self.image_ids = image_ids
+        self.pending: dict[int, dict] = {}
+        self.ready = asyncio.Event()
+
+    def push(self, image_id: int, counts: dict):
+        self.pending.setdefault(image_id, {}).update(counts)
+        self.ready.set()
+
+    async def get(self, timeout: float) -> dict[int, dict]:
+        """
+        Return the pending updates, waiting up to `timeout` seconds for some.
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except TimeoutError:
+            return {}
+        self.ready.clear()
+        pending, self.pending = self.pending, {}
+        return pending
+
+
+class Broadcaster:
+    """
+    Fan the counter updates out to the connections of this process, from a
+    single Redis subscription to the channels of the images they follow.
+
+    Updates of an image are coalesced: they're dispatched at most once per
+    `LIVE_COALESCE_INTERVAL`, however fast they're published.
+    """
+
+    def __init__(self):
+        self.listeners: dict[int, set[Listener]] = defaultdict(set)
+        self.dirty: dict[int, dict] = {}
+        self.pubsub = None
+        self.reader = None
+        self.flush_handle = None
+        # Orders the (un)subscriptions: an unsubscription still pending when
+        #   a channel is subscribed again must not be sent after it.
+        self.lock = asyncio.Lock()
+        # Keeps the pending unsubscriptions from being garbage collected.
+        self.tasks = set()
+
+    async def subscribe(self, listener: Listener):
+        if self.pubsub is None:
+            self.pubsub = ar.pubsub(ignore_subscribe_messages=True)
+        new_ids = [id for id in listener.image_ids if not self.listeners.get(id)]
+        for id in listener.image_ids:
+            self.listeners[id].add(listener)
+        if new_ids:
+            async with self.lock:
+                await self.pubsub.subscribe(*[channel(id) for id in new_ids])
+        if self.reader is None:
+            self.reader = asyncio.create_task(self.read())
+
+    def unsubscribe(self, listener: Listener):
+        # Not a coroutine, it runs when the connection's task is cancelled.
+        unused_ids = []
+        for id in listener.image_ids:
+            self.listeners[id].discard(listener)
+            if not self.listeners[id]:
+                del self.listeners[id]
+                unused_ids.append(id)
+        if unused_ids:
+            task = asyncio.create_task(self.unsubscribe_unused(unused_ids))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def unsubscribe_unused(self, image_ids: list[int]):
+        async with self.lock:
+            # Unless a new listener subscribed them meanwhile.
+            image_ids = [id for id in image_ids if not self.listeners.get(id)]
+            if image_ids:
+                await self.pubsub.unsubscribe(*[channel(id) for id in image_ids])
+
+    async def read(self):
+        try:
+            while True:
+                try:
+                    message = await self.pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=None
+                    )
+                    if message is not None:
+                        self.dispatch(message)
+                except ConnectionError:
+                    # The connection is reopened, and the channels subscribed
+                    #   again, by the next read.
+                    await asyncio.sleep(1)
+                except Exception:
+                    # Keep serving every other connection.
+                    logger.exception("Couldn't read counter updates")
+                    await asyncio.sleep(1)
+        finally:
+            # Started again by the next subscription if it's cancelled.
+            self.reader = None
+
+    def dispatch(self, message: dict):
+        image_id = int(message["channel"].split(b":")[1])
+        self.dirty.setdefault(image_id, {}).update(orjson.loads(message["data"]))
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                settings.LIVE_COALESCE_INTERVAL, self.flush
+            )
+
+    def flush(self):
+        self.flush_handle = None
+        dirty, self.dirty = self.dirty, {}
+        for image_id, counts in dirty.items():
+            for listener in self.listeners.get(image_id, ()):
+                listener.push(image_id, counts)
+
+
+# Bound to the event loop of the ASGI server on first use, one per process.
+broadcaster = Broadcaster()
@@ -0,0 +1,42 @@
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from images import metadata
+from images.models import Image
+from PIL import Image as PILImage
+
+from bookmarks.backfill import backfill_files
+
+
+def extract_file_metadata(row: tuple[int, str]) -> tuple[int, dict | None]:
+    id, name = row
+    try:
+        with default_storage.open(name, "rb") as file:
+            return id, metadata.extract_metadata(File(file))
+    except (OSError, PILImage.DecompressionBombError):
+        return id, None
+
+
+class Command(BaseCommand):
+    help = "Extract the metadata of images that don't have it yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Defaults to the CPU count."
+        )
+
+    def handle(self, *args, **options):
+        done, _ = backfill_files(
+            Image.objects.filter(width__isnull=True),
+            "image",
+            extract_file_metadata,
+            metadata.FIELDS,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            progress=self.write_progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Extracted metadata of {done} images."))
+
+    def write_progress(self, done: int, failed: int):
+        self.stdout.write(f"{done} images processed, {failed} failed")
@@ -0,0 +1,44 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from images import phash
+from images.models import Image
+from PIL import Image as PILImage
+
+from bookmarks.backfill import backfill_files
+
+
+def hash_file(row: tuple[int, str]) -> tuple[int, dict | None]:
+    id, name = row
+    try:
+        with default_storage.open(name, "rb") as file, PILImage.open(file) as picture:
+            value = phash.dhash(picture)
+    except (OSError, PILImage.DecompressionBombError):
+        return id, None
+    image = Image(id=id)
+    phash.set_hash(image, value)
+    return id, {field: getattr(image, field) for field in phash.FIELDS}
+
+
+class Command(BaseCommand):
+    help = "Compute perceptual hashes of images that don't have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Defaults to the CPU count."
+        )
+
+    def handle(self, *args, **options):
+        done, _ = backfill_files(
+            Image.objects.filter(phash__isnull=True),
+            "image",
+            hash_file,
+            phash.FIELDS,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            progress=self.write_progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Hashed {done} images."))
+
+    def write_progress(self, done: int, failed: int):
+        self.stdout.write(f"{done} images hashed, {failed} failed")
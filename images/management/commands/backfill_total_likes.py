@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from images.models import Image
+
+from bookmarks.backfill import backfill_count
+
+
+class Command(BaseCommand):
+    help = "Recompute `Image.total_likes` from the likes table, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--start-after",
+            type=int,
+            help="Resume after this image id (as reported by a previous run).",
+        )
+
+    def handle(self, *args, **options):
+        def progress(done, last_pk):
+            self.stdout.write(f"{done} images updated, last id {last_pk}")
+
+        done = backfill_count(
+            Image,
+            "total_likes",
+            Image.users_like.through,
+            "image",
+            batch_size=options["batch_size"],
+            start_after=options["start_after"],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {done} images."))
@@ -0,0 +1,48 @@
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from images import variants
+from images.models import Image
+from PIL import Image as PILImage
+
+from bookmarks.backfill import backfill_files
+
+
+def generate_file_variants(row: tuple[int, str]) -> tuple[int, dict | None]:
+    id, name = row
+    try:
+        with default_storage.open(name, "rb") as file:
+            generated = variants.generate_variants(File(file))
+    except (OSError, PILImage.DecompressionBombError):
+        return id, None
+    return id, {
+        "variants": generated,
+        "variants_digest": variants.variants_digest(generated),
+    }
+
+
+class Command(BaseCommand):
+    help = "Generate the responsive variants of images that don't have any yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Defaults to the CPU count."
+        )
+
+    def handle(self, *args, **options):
+        done, _ = backfill_files(
+            Image.objects.filter(variants={}),
+            "image",
+            generate_file_variants,
+            ["variants", "variants_digest"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            # Each picture is resized and encoded several times.
+            chunksize=1,
+            progress=self.write_progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Generated variants of {done} images."))
+
+    def write_progress(self, done: int, failed: int):
+        self.stdout.write(f"{done} images processed, {failed} failed")
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from images import recommendations
+
+from bookmarks.redis_client import r
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the most similar images of every image from co-occurring likes "
+        "and store them in Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-k", type=int, default=10, help="Neighbors per image.")
+        parser.add_argument("--chunk-size", type=int, default=100_000)
+        parser.add_argument("--block-size", type=int, default=1000)
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only recompute images whose likes changed since the last run, "
+                "from the likes of their likers, and their place among the "
+                "neighbors of the images co-liked with them."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["incremental"]:
+            # Take the dirty set atomically, so likes arriving meanwhile are
+            #   left for the next run.
+            pipe = r.pipeline()
+            pipe.smembers(recommendations.DIRTY_KEY)
+            pipe.delete(recommendations.DIRTY_KEY)
+            dirty_ids = np.array(sorted(int(id) for id in pipe.execute()[0]))
+            if not len(dirty_ids):
+                self.stdout.write("No images to update.")
+                return
+
+        likes = None
+        if options["incremental"]:
+            # Only the likes of their likers: the images they share a liker
+            #   with, through the likers they share.
+            likes = recommendations.likes_of_likers(dirty_ids.tolist())
+        image_ids, matrix = recommendations.load_like_matrix(
+            options["chunk_size"], likes
+        )
+        self.stdout.write(
+            f"Loaded {matrix.nnz} likes of {matrix.shape[0]} images "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        if options["incremental"]:
+            # The matrix lacks the likes of other users: norms are computed
+            #   from every like of the images.
+            norms = np.sqrt(recommendations.like_counts(image_ids))
+            done = recommendations.update_similar(
+                image_ids,
+                matrix,
+                np.flatnonzero(np.isin(image_ids, dirty_ids)),
+                options["k"],
+                norms,
+            )
+            # Images that lost all their likes are no longer in the matrix.
+            recommendations.remove_similar(np.setdiff1d(dirty_ids, image_ids).tolist())
+        else:
+            results = recommendations.top_k_similar(
+                matrix, options["k"], block_size=options["block_size"]
+            )
+            done = recommendations.store_similar(image_ids, results)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored similar images of {done} images "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from bookmarks.media_gc import QUEUE_KEY, delete_files
+from bookmarks.redis_client import r
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the media files queued by deleted rows (images, profiles, "
+        "imports), with their thumbnails. Runs until stopped, unless --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            # Waits for the next name, then takes the rest of a batch at once.
+            item = r.blpop([QUEUE_KEY], timeout=1 if options["once"] else 30)
+            if item is None:
+                if options["once"]:
+                    break
+                continue
+            names = [item[1], *(r.lpop(QUEUE_KEY, options["batch_size"] - 1) or [])]
+            # Between long waits, the database may have closed the connection.
+            close_old_connections()
+            # Names taken from the queue are lost if this process dies before
+            #   deleting them: `gc_media` finds those files later.
+            deleted = delete_files([name.decode() for name in names])
+            total += deleted
+            self.stdout.write(f"{deleted} files deleted ({len(names)} queued)")
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} files."))
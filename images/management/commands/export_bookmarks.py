@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from images.export import stream_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the bookmarks of a user as a ZIP archive: the original files, "
+        "and their metadata as NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument(
+            "--output", help='Archive to write. Defaults to "<username>.zip".'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['username']!r} doesn't exist.")
+
+        output = options["output"] or f"{user.username}.zip"
+        size = 0
+        with open(output, "wb") as f:
+            for block in stream_archive(user):
+                f.write(block)
+                size += len(block)
+        self.stdout.write(
+            self.style.SUCCESS(f"Exported {output} ({size / 1024 / 1024:.1f} MB).")
+        )
@@ -0,0 +1,52 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from easy_thumbnails.models import Source, Thumbnail
+
+from bookmarks.media_gc import BATCH_SIZE, delete_file, find_orphans
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the files of MEDIA_GC_DIRS no row references: originals and "
+        "profile photos of deleted rows, orphaned or renamed thumbnails and "
+        "variants. Files younger than MEDIA_GC_MIN_AGE are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the unreferenced files without deleting them.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=8, help="Directories scanned at once."
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        count = size = 0
+        deleted = []
+        for name, file_size in find_orphans(options["workers"]):
+            if dry_run:
+                self.stdout.write(name)
+            elif delete_file(default_storage, name):
+                deleted.append(name)
+            else:
+                continue
+            count += 1
+            size += file_size
+            if len(deleted) == BATCH_SIZE:
+                self.delete_sources(deleted)
+                deleted = []
+        self.delete_sources(deleted)
+
+        verb = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {count} files ({size / 1024 / 1024:.1f} MB).")
+        )
+
+    def delete_sources(self, names: list[str]):
+        # Thumbnail records of deleted originals, cascaded from their source,
+        #   and of deleted thumbnails.
+        Source.objects.filter(name__in=names).delete()
+        Thumbnail.objects.filter(name__in=names).delete()
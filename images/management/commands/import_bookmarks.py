@@ -0,0 +1,94 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from images.imports import claim_job, requeue_stale_jobs, run_import
+from images.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a bookmarks file (browser HTML export or CSV) for a user, or run "
+        "the imports started on the site."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", nargs="?", help="Bookmarks file to import.")
+        parser.add_argument("--user", help="Username to import the file for.")
+        parser.add_argument("--job", type=int, help="Id of an import to resume.")
+        parser.add_argument(
+            "--worker",
+            action="store_true",
+            help=(
+                "Run pending imports, and resume those that stopped making "
+                "progress, as they come. Runs until stopped, unless --once."
+            ),
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no import is pending."
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds between checks for new imports.",
+        )
+
+    def handle(self, *args, **options):
+        if options["file"]:
+            if not options["user"]:
+                raise CommandError("--user is required to import a file.")
+            try:
+                user = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User {options['user']!r} doesn't exist.")
+            job = ImportJob(user=user)
+            with open(options["file"], "rb") as file:
+                job.file.save(os.path.basename(options["file"]), File(file))
+            self.run(job)
+        elif options["job"]:
+            job = ImportJob.objects.filter(id=options["job"]).first()
+            if job is None:
+                raise CommandError(f"Import {options['job']} doesn't exist.")
+            if not job.file:
+                # Deleted once the import is done or failed.
+                raise CommandError(f"Import {options['job']} is finished.")
+            self.run(job)
+        elif options["worker"]:
+            self.work(options["once"], options["poll_interval"])
+        else:
+            raise CommandError("Give a file to import, --job or --worker.")
+
+    def work(self, once: bool, poll_interval: float):
+        while True:
+            # Between long waits, the database may have closed the connection.
+            close_old_connections()
+            if requeued := requeue_stale_jobs():
+                self.stdout.write(f"{requeued} stale imports to resume")
+            job = claim_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            try:
+                self.run(job)
+            except Exception as e:
+                # Recorded on the job, the next ones still run.
+                self.stderr.write(f"Import {job.id} failed: {e}")
+
+    def run(self, job: ImportJob):
+        self.stdout.write(f"Import {job.id} of {job.user}:")
+        run_import(job, progress=self.write_progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {job.imported} images, skipped {job.skipped}, "
+                f"{job.failed} failed."
+            )
+        )
+
+    def write_progress(self, job: ImportJob):
+        self.stdout.write(f"{job.processed}/{job.total} bookmarks processed")
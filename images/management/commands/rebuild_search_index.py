@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from images import search
+from images.models import Image
+
+
+class Command(BaseCommand):
+    help = "Rebuild the image search index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = Image.objects.order_by("id").values_list(
+            "id", "title", "description", "url"
+        )
+        total = rows.count()
+        search.clear_index()
+
+        done = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                with transaction.atomic():
+                    search.index_images(batch)
+                done += len(batch)
+                batch = []
+                self.stdout.write(f"{done}/{total} images indexed")
+        search.index_images(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} images."))
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from images import viewers
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the daily unique viewers of images into weekly ones (PFMERGE). "
+        "Run weekly, the daily ones expire after VIEWERS_DAYS_KEPT days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--week",
+            help='ISO week, such as "2024-W07". Defaults to the last complete one.',
+        )
+
+    def handle(self, *args, **options):
+        week = options["week"]
+        if week is None:
+            week = viewers.iso_week(timezone.localdate() - datetime.timedelta(weeks=1))
+        try:
+            viewers.week_days(week)
+        except ValueError:
+            raise CommandError(f'Invalid week "{week}", expected e.g. "2024-W07".')
+
+        count = viewers.rollup_week(week)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rolled up the viewers of {count} images for {week}.")
+        )
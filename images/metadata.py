@@ -0,0 +1,129 @@
+import numpy as np
+from django.core.files.base import File
+from PIL import ExifTags, ImageOps
+from PIL import Image as PILImage
+
+# Pictures are analyzed from a copy at most this many pixels wide and high.
+SAMPLE_SIZE = 64
+# Blurhash components, horizontally and vertically.
+BLURHASH_X = 4
+BLURHASH_Y = 3
+BASE83 = (
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    "abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+)
+FIELDS = [
+    "width",
+    "height",
+    "format",
+    "file_size",
+    "orientation",
+    "dominant_color",
+    "blurhash",
+]
+
+
+def extract_metadata(file: File) -> dict:
+    """
+    Return the values of the metadata fields of `Image` (`FIELDS`) for the
+    picture in `file`. Width and height are the displayed ones, after the EXIF
+    orientation is applied.
+    """
+    file.seek(0)
+    with PILImage.open(file) as picture:
+        orientation = picture.getexif().get(ExifTags.Base.Orientation, 1)
+        width, height = picture.size
+        # Orientations 5 to 8 rotate the picture by a quarter turn.
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+        metadata = {
+            "width": width,
+            "height": height,
+            "format": picture.format or "",
+            "file_size": file.size,
+            "orientation": orientation,
+        }
+
+        # Let the JPEG decoder downscale while decoding.
+        picture.draft("RGB", (SAMPLE_SIZE, SAMPLE_SIZE))
+        sample = ImageOps.exif_transpose(picture).convert("RGBA")
+        sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), PILImage.Resampling.BILINEAR)
+    file.seek(0)
+
+    pixels = np.asarray(sample, dtype=np.float32) / 255
+    metadata["dominant_color"] = dominant_color(pixels)
+    metadata["blurhash"] = blurhash(pixels[..., :3])
+    return metadata
+
+
+def dominant_color(pixels: np.ndarray) -> str:
+    """
+    Return the mean color, as `#rrggbb`, of the most common color bin (4 bits
+    per channel) among the opaque `pixels` (RGBA floats in [0, 1]).
+    """
+    opaque = pixels[pixels[..., 3] > 0.5][:, :3]
+    if not len(opaque):
+        opaque = pixels.reshape(-1, 4)[:, :3]
+    quantized = (opaque * 15.999).astype(np.int32)
+    bins = quantized[:, 0] << 8 | quantized[:, 1] << 4 | quantized[:, 2]
+    mean = opaque[bins == np.bincount(bins).argmax()].mean(axis=0)
+    r, g, b = np.round(mean * 255).astype(int)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    return np.where(
+        values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4
+    )
+
+
+def linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def encode83(value: int, length: int) -> str:
+    return "".join(BASE83[value // 83 ** (length - i - 1) % 83] for i in range(length))
+
+
+def blurhash(pixels: np.ndarray) -> str:
+    """
+    Encode `pixels` (RGB floats in [0, 1]) as a blurhash
+    (https://blurha.sh), a short string decoded client-side into a blurred
+    placeholder.
+    """
+    height, width = pixels.shape[:2]
+    linear = srgb_to_linear(pixels)
+    # The DCT of every component at once: cosine bases along each axis,
+    #   contracted with the pixels.
+    basis_x = np.cos(np.pi * np.outer(np.arange(BLURHASH_X), np.arange(width)) / width)
+    basis_y = np.cos(
+        np.pi * np.outer(np.arange(BLURHASH_Y), np.arange(height)) / height
+    )
+    factors = np.einsum("jy,ix,yxc->jic", basis_y, basis_x, linear) / (width * height)
+    factors[1:] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+    dc, ac = factors[0], factors[1:]
+
+    hash = encode83((BLURHASH_X - 1) + (BLURHASH_Y - 1) * 9, 1)
+    if len(ac):
+        quantized_max = int(max(0, min(82, int(np.abs(ac).max() * 166 - 0.5))))
+        max_value = (quantized_max + 1) / 166
+        hash += encode83(quantized_max, 1)
+    else:
+        max_value = 1
+        hash += encode83(0, 1)
+    hash += encode83(
+        (linear_to_srgb(dc[0]) << 16)
+        + (linear_to_srgb(dc[1]) << 8)
+        + linear_to_srgb(dc[2]),
+        4,
+    )
+    signed_sqrt = np.sign(ac / max_value) * np.abs(ac / max_value) ** 0.5
+    quantized_ac = np.clip(np.floor(signed_sqrt * 9 + 9.5), 0, 18).astype(int)
+    for r, g, b in quantized_ac:
+        hash += encode83(r * 19 * 19 + g * 19 + b, 2)
+    return hash
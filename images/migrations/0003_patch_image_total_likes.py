@@ -1,16 +1,38 @@
 # Generated by Django 5.1.4 on 2024-12-28 04:08
 
 from django.apps.registry import Apps
-from django.db import migrations
+from django.db import migrations, transaction
 
 from ..models import Image
 
+BATCH_SIZE = 10000
+
 
 def patch_image_total_likes(apps: Apps, schema_editor):
+    # Self-contained rather than calling app code, which may change after this
+    #   migration: count likes in the database, one committed range of ids at
+    #   a time, instead of running `users_like.count()` and `save()` per image.
     image_model: Image = apps.get_model("images", "Image")
-    for image in image_model.objects.all():
-        image.total_likes = image.users_like.count()
-        image.save()
+    like_model = image_model.users_like.through
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    table = quote(image_model._meta.db_table)
+    pk = quote(image_model._meta.pk.column)
+    sql = (
+        f"UPDATE {table} SET {quote('total_likes')} = ("
+        f"SELECT COUNT(*) FROM {quote(like_model._meta.db_table)} "
+        f"WHERE {quote(like_model._meta.get_field('image').column)} = {table}.{pk}"
+        f") WHERE {pk} BETWEEN %s AND %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({pk}), MAX({pk}) FROM {table}")
+        first_id, last_id = cursor.fetchone()
+    if first_id is None:
+        return
+    for start in range(first_id, last_id + 1, BATCH_SIZE):
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [start, start + BATCH_SIZE - 1])
 
 
 def undo_patch_image_total_likes(apps: Apps, schema_editor):
@@ -19,6 +41,9 @@ def undo_patch_image_total_likes(apps: Apps, schema_editor):
 
 
 class Migration(migrations.Migration):
+    # Commit each batch on its own rather than holding one long transaction.
+    #   Rerunning after an interruption is safe, counts are recomputed.
+    atomic = False
 
     dependencies = [
         ("images", "0002_image_total_likes_and_more"),
@@ -0,0 +1,33 @@
+from django.apps.registry import Apps
+from django.db import migrations
+
+from .. import search
+from ..models import Image
+
+
+def create_search_index(apps: Apps, schema_editor):
+    search.create_index(schema_editor)
+    image_model: Image = apps.get_model("images", "Image")
+    rows = image_model.objects.values_list("id", "title", "description", "url")
+    batch = []
+    for row in rows.iterator(chunk_size=5000):
+        batch.append(row)
+        if len(batch) == 5000:
+            search.index_images(batch)
+            batch = []
+    search.index_images(batch)
+
+
+def drop_search_index(apps: Apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0003_patch_image_total_likes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0008_image_metadata"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="image",
+            name="variants",
+            field=models.JSONField(
+                blank=True, db_default={}, default=dict, editable=False
+            ),
+        ),
+    ]
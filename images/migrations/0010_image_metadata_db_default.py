@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0009_image_variants_db_default"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="image",
+            name="blurhash",
+            field=models.CharField(
+                blank=True, db_default="", default="", editable=False, max_length=64
+            ),
+        ),
+        migrations.AlterField(
+            model_name="image",
+            name="dominant_color",
+            field=models.CharField(
+                blank=True, db_default="", default="", editable=False, max_length=7
+            ),
+        ),
+        migrations.AlterField(
+            model_name="image",
+            name="format",
+            field=models.CharField(
+                blank=True, db_default="", default="", editable=False, max_length=10
+            ),
+        ),
+    ]
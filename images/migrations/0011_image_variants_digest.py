@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0010_image_metadata_db_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="variants_digest",
+            field=models.CharField(
+                blank=True, db_default="", default="", editable=False, max_length=16
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(
+                fields=["variants_digest"], name="images_imag_variant_d5385c_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:12
+
+import re
+
+from django.apps.registry import Apps
+from django.db import migrations, transaction
+
+from ..models import Image
+
+BATCH_SIZE = 2000
+# As named by `images.variants.generate_variants()`, inlined: app code may
+#   change after this migration.
+DIGEST_RE = re.compile(r"^variants/[0-9a-f]{2}/([0-9a-f]{16})_")
+
+
+def patch_image_variants_digest(apps: Apps, schema_editor):
+    # One committed batch of ids at a time, read from the variants' names.
+    image_model: Image = apps.get_model("images", "Image")
+    alias = schema_editor.connection.alias
+    images = (
+        image_model.objects.using(alias)
+        .filter(variants_digest="")
+        .exclude(variants={})
+        .order_by("id")
+        .only("id", "variants")
+    )
+    last_id = 0
+    while batch := list(images.filter(id__gt=last_id)[:BATCH_SIZE]):
+        for image in batch:
+            names = [v["name"] for vs in image.variants.values() for v in vs]
+            match = DIGEST_RE.match(names[0]) if names else None
+            image.variants_digest = match[1] if match else ""
+        with transaction.atomic(using=alias):
+            image_model.objects.using(alias).bulk_update(batch, ["variants_digest"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    # Commit each batch on its own rather than holding one long transaction.
+    #   Rerunning after an interruption is safe, only the missing digests are
+    #   filled.
+    atomic = False
+
+    dependencies = [
+        ("images", "0011_image_variants_digest"),
+    ]
+
+    operations = [
+        migrations.RunPython(patch_image_variants_digest, migrations.RunPython.noop),
+    ]
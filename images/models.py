@@ -21,11 +21,49 @@ class Image(models.Model):
     )
     # Denormalizes `users_like` counts.
     total_likes = models.PositiveIntegerField(default=0)
+    # 64-bit perceptual hash (see `images.phash`), stored as a signed integer.
+    phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    # `phash` split into 16-bit blocks, indexed for near-duplicate lookups.
+    phash_0 = models.IntegerField(null=True, blank=True, editable=False)
+    phash_1 = models.IntegerField(null=True, blank=True, editable=False)
+    phash_2 = models.IntegerField(null=True, blank=True, editable=False)
+    phash_3 = models.IntegerField(null=True, blank=True, editable=False)
+    # Extracted once, at ingest (see `images.metadata`). Dimensions are the
+    #   displayed ones, after the EXIF orientation is applied.
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    format = models.CharField(
+        max_length=10, default="", db_default="", blank=True, editable=False
+    )
+    file_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # EXIF orientation, from 1 (upright) to 8.
+    orientation = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False
+    )
+    dominant_color = models.CharField(
+        max_length=7, default="", db_default="", blank=True, editable=False
+    )
+    # Placeholder decoded client-side (https://blurha.sh).
+    blurhash = models.CharField(
+        max_length=64, default="", db_default="", blank=True, editable=False
+    )
+    # Resized WebP/AVIF copies, by format (see `images.variants`).
+    variants = models.JSONField(default=dict, db_default={}, blank=True, editable=False)
+    # The content hash their names start with, indexed so `gc_media` can look
+    #   variant files up (see `images.variants.variants_digest()`).
+    variants_digest = models.CharField(
+        max_length=16, default="", db_default="", blank=True, editable=False
+    )
 
     class Meta:
         indexes = [
             models.Index(fields=["-created"]),
             models.Index(fields=["-total_likes"]),
+            models.Index(fields=["phash_0"]),
+            models.Index(fields=["phash_1"]),
+            models.Index(fields=["phash_2"]),
+            models.Index(fields=["phash_3"]),
+            models.Index(fields=["variants_digest"]),
         ]
         ordering = ["-created"]
 
@@ -39,3 +77,39 @@ class Image(models.Model):
 
     def get_absolute_url(self):
         return reverse("images:detail", args=[self.id, self.slug])
+
+
+# Bulk import of a bookmarks file (see `images.imports`).
+class ImportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="import_jobs", on_delete=models.CASCADE
+    )
+    # Netscape bookmarks HTML (as exported by browsers) or CSV.
+    file = models.FileField(upload_to="imports/%Y/%m/%d/")
+    status = models.CharField(max_length=10, choices=Status, default=Status.PENDING)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    # Rows of the file already handled, where a resumed import starts.
+    processed = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    # Invalid rows and images that were already bookmarked.
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # The first errors, for the user to review.
+    errors = models.JSONField(default=list, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"Import {self.id} of {self.user}"
+
+    def get_absolute_url(self):
+        return reverse("images:import_detail", args=[self.id])
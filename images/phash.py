@@ -0,0 +1,141 @@
+from itertools import combinations
+
+from django.db.models import Q
+from PIL import Image as PILImage
+
+from .models import Image
+
+HASH_SIZE = 8
+# The 64-bit hash is split into `BLOCKS` blocks of `BLOCK_BITS` bits.
+BLOCKS = 4
+BLOCK_BITS = 64 // BLOCKS
+BLOCK_FIELDS = [f"phash_{i}" for i in range(BLOCKS)]
+# Every field of `Image` set by `set_hash()`.
+FIELDS = ["phash", *BLOCK_FIELDS]
+
+
+def dhash(image: PILImage.Image) -> int:
+    """
+    Compute the 64-bit difference hash of `image`.
+
+    Each bit tells whether a pixel is brighter than its right neighbour in a
+    9x8 grayscale copy, so the hash survives resizing and re-encoding.
+    """
+    # Deferred, only images being ingested are hashed.
+    import numpy as np
+
+    # Let the JPEG decoder downscale while decoding, instead of decoding the
+    #   full resolution picture only to throw most of it away.
+    image.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))
+    small = image.convert("L").resize(
+        (HASH_SIZE + 1, HASH_SIZE), PILImage.Resampling.BILINEAR
+    )
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed(value: int) -> int:
+    # Databases have no unsigned 64-bit integer, store the same bits signed.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def split_blocks(value: int) -> list[int]:
+    mask = (1 << BLOCK_BITS) - 1
+    return [(value >> (BLOCK_BITS * i)) & mask for i in range(BLOCKS)]
+
+
+def block_variants(block: int, radius: int) -> list[int]:
+    """
+    Return every block value within `radius` bits of `block`.
+    """
+    variants = [block]
+    for r in range(1, radius + 1):
+        for positions in combinations(range(BLOCK_BITS), r):
+            flipped = block
+            for position in positions:
+                flipped ^= 1 << position
+            variants.append(flipped)
+    return variants
+
+
+def set_hash(image: Image, value: int):
+    image.phash = to_signed(value)
+    for field, block in zip(BLOCK_FIELDS, split_blocks(value)):
+        setattr(image, field, block)
+
+
+def find_near_duplicates(value: int, max_distance: int, exclude_id=None):
+    """
+    Return `(distance, image)` pairs within `max_distance` bits of `value`,
+    closest first.
+
+    Multi-index hashing: if two hashes differ in at most `max_distance` bits,
+    at least one of the `BLOCKS` blocks differs in at most
+    `max_distance // BLOCKS` bits (pigeonhole principle). Candidates are
+    found with indexed lookups on the blocks, then checked exactly.
+    """
+    radius = max_distance // BLOCKS
+    lookup = Q()
+    for field, block in zip(BLOCK_FIELDS, split_blocks(value)):
+        lookup |= Q(**{f"{field}__in": block_variants(block, radius)})
+
+    candidates = Image.objects.filter(lookup)
+    if exclude_id is not None:
+        candidates = candidates.exclude(id=exclude_id)
+
+    matches = []
+    for image in candidates.only("id", "slug", "title", "image", "phash"):
+        distance = hamming(value, to_unsigned(image.phash))
+        if distance <= max_distance:
+            matches.append((distance, image))
+    matches.sort(key=lambda match: match[0])
+    return matches
+
+
+class BKTree:
+    """
+    In-memory Burkhard-Keller tree over Hamming distance.
+
+    Every child sits on the edge labelled with its distance to the parent, so
+    by the triangle inequality a search only descends into edges within
+    `max_distance` of the distance between the query and the node.
+    """
+
+    def __init__(self):
+        # Node: `[value, item, {distance: child}]`.
+        self.root = None
+
+    def add(self, value: int, item=None):
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, object]]:
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return matches
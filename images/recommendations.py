@@ -0,0 +1,221 @@
+from django.db.models import Count
+
+from bookmarks.redis_client import ar, r
+
+from .models import Image
+
+Like = Image.users_like.through
+
+# Images whose likes changed since the last run (see `images.signals`).
+DIRTY_KEY = "similar_images:dirty"
+
+# NumPy and SciPy are imported by the functions computing similarities, only
+#   run by commands: web workers just read the results from Redis.
+
+
+def similar_key(image_id: int) -> str:
+    return f"image:{image_id}:similar"
+
+
+def likes_of_likers(image_ids):
+    """
+    Return the likes of the users who like any of `image_ids`: every image
+    sharing a liker with one of them, and every liker they share.
+    """
+    likers = Like.objects.filter(image_id__in=image_ids).values("user_id")
+    return Like.objects.filter(user_id__in=likers)
+
+
+def load_like_matrix(chunk_size: int = 100_000, likes=None):
+    """
+    Load the likes table (or the `likes` queryset) as a sparse images x users
+    matrix.
+
+    Rows are read in chunks straight into NumPy arrays, so memory is
+    proportional to the number of likes, not to Python objects per like.
+    Returns the image id of every row and the matrix.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    image_chunks, user_chunks = [], []
+    likes = Like.objects.all() if likes is None else likes
+    rows = likes.order_by().values_list("image_id", "user_id")
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            pairs = np.array(chunk, dtype=np.int64)
+            image_chunks.append(pairs[:, 0])
+            user_chunks.append(pairs[:, 1])
+            chunk = []
+    if chunk:
+        pairs = np.array(chunk, dtype=np.int64)
+        image_chunks.append(pairs[:, 0])
+        user_chunks.append(pairs[:, 1])
+    if not image_chunks:
+        return np.empty(0, dtype=np.int64), sparse.csr_matrix((0, 0))
+
+    # Map database ids to contiguous row and column numbers.
+    image_ids, image_rows = np.unique(np.concatenate(image_chunks), return_inverse=True)
+    _, user_columns = np.unique(np.concatenate(user_chunks), return_inverse=True)
+    data = np.ones(len(image_rows), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, (image_rows, user_columns)))
+    return image_ids, matrix
+
+
+def like_counts(image_ids):
+    """
+    Return the number of likes of each of `image_ids`, as an array.
+    """
+    import numpy as np
+
+    counts = dict(
+        Like.objects.filter(image_id__in=[int(id) for id in image_ids])
+        .order_by()
+        .values("image_id")
+        .annotate(count=Count("*"))
+        .values_list("image_id", "count")
+    )
+    return np.array([counts.get(int(id), 0) for id in image_ids], dtype=np.float32)
+
+
+def normalize_rows(matrix, norms=None):
+    import numpy as np
+    from scipy import sparse
+
+    # Unit-length rows turn dot products into cosine similarities.
+    if norms is None:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms = np.where(norms == 0, 1, norms)
+    return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def similarities(matrix, rows=None, block_size: int = 1000, norms=None):
+    """
+    Yield `(row, neighbor_rows, scores)` with every row similar to each
+    requested row (all rows by default), by cosine similarity.
+
+    Similarities are computed one block of rows at a time, as a sparse
+    product, so only images that share at least one liker are ever compared.
+    Pass the `norms` of the rows if `matrix` only holds some of their columns
+    (see `likes_of_likers()`).
+    """
+    import numpy as np
+
+    normalized = normalize_rows(matrix, norms)
+    transposed = normalized.T.tocsr()
+    rows = np.arange(matrix.shape[0]) if rows is None else np.asarray(rows)
+
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start : start + block_size]
+        products = (normalized[block_rows] @ transposed).tocsr()
+        for i, row in enumerate(block_rows):
+            begin, end = products.indptr[i], products.indptr[i + 1]
+            neighbors = products.indices[begin:end]
+            scores = products.data[begin:end]
+            not_self = neighbors != row
+            yield row, neighbors[not_self], scores[not_self]
+
+
+def top_k(neighbors, scores, k: int):
+    """
+    Return the `k` best of `neighbors` and their `scores`, best first.
+    """
+    import numpy as np
+
+    if len(scores) > k:
+        # Partial sort: only the top `k` need to be ordered.
+        top = np.argpartition(-scores, k)[:k]
+        neighbors, scores = neighbors[top], scores[top]
+    order = np.argsort(-scores, kind="stable")
+    return neighbors[order], scores[order]
+
+
+def top_k_similar(matrix, k: int, rows=None, block_size: int = 1000):
+    """
+    Yield `(row, neighbor_rows, scores)` with the `k` most similar rows of
+    every requested row (see `similarities()`), most similar first.
+    """
+    for row, neighbors, scores in similarities(matrix, rows, block_size):
+        yield row, *top_k(neighbors, scores, k)
+
+
+def store_similar(image_ids, results, batch_size: int = 1000) -> int:
+    """
+    Replace the stored neighbors of every image in `results`.
+    """
+    done = 0
+    pipe = r.pipeline(transaction=False)
+    for row, neighbors, scores in results:
+        key = similar_key(int(image_ids[row]))
+        pipe.delete(key)
+        if len(neighbors):
+            pipe.zadd(
+                key,
+                {
+                    int(image_ids[neighbor]): float(score)
+                    for neighbor, score in zip(neighbors, scores)
+                },
+            )
+        done += 1
+        if done % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+    return done
+
+
+def update_similar(image_ids, matrix, dirty_rows, k: int, norms) -> int:
+    """
+    Recompute the neighbors of the images of `dirty_rows`, whose likes changed,
+    and their place among the neighbors of the images co-liked with them.
+    `matrix` only needs the likes of their likers (see `likes_of_likers()`):
+    the similarity of two other images didn't change.
+
+    Approximate: an image that only shared the likers who took their like
+    back, and wasn't among the dirty image's neighbors, keeps it among its
+    own, with its old score, until the next full run. Neither is a neighbor
+    dropped from an image's top `k` brought back when a score decreases.
+    Returns the number of dirty images.
+    """
+    done = 0
+    for row, neighbors, scores in similarities(matrix, dirty_rows, norms=norms):
+        image_id = int(image_ids[row])
+        neighbor_ids = [int(image_ids[neighbor]) for neighbor in neighbors]
+        # Neighbors they no longer share a liker with.
+        previous = {int(id) for id in r.zrange(similar_key(image_id), 0, -1)}
+        pipe = r.pipeline(transaction=False)
+        for id in previous - set(neighbor_ids):
+            pipe.zrem(similar_key(id), image_id)
+        for id, score in zip(neighbor_ids, scores):
+            pipe.zadd(similar_key(id), {image_id: float(score)})
+            pipe.zremrangebyrank(similar_key(id), 0, -(k + 1))
+        pipe.execute()
+        store_similar(image_ids, [(row, *top_k(neighbors, scores, k))])
+        done += 1
+    return done
+
+
+def remove_similar(image_ids):
+    """
+    Remove the neighbors of `image_ids` (e.g. images no one likes anymore),
+    and remove them from their neighbors'.
+    """
+    for image_id in image_ids:
+        previous = r.zrange(similar_key(image_id), 0, -1)
+        pipe = r.pipeline(transaction=False)
+        for id in previous:
+            pipe.zrem(similar_key(int(id)), image_id)
+        pipe.delete(similar_key(image_id))
+        pipe.execute()
+
+
+def get_similar_image_ids(image_id: int, limit: int = 6) -> list[int]:
+    return [int(id) for id in r.zrange(similar_key(image_id), 0, limit - 1, desc=True)]
+
+
+async def aget_similar_image_ids(image_id: int, limit: int = 6) -> list[int]:
+    return [
+        int(id)
+        for id in await ar.zrange(similar_key(image_id), 0, limit - 1, desc=True)
+    ]
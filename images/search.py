@@ -0,0 +1,117 @@
+import re
+from urllib.parse import urlparse
+
+from django.db import connection
+
+from .models import Image
+
+# SQLite: FTS5 table whose `rowid` is the image id.
+# PostgreSQL: `tsvector` table with a GIN index.
+TABLE = "images_image_search"
+# Column weights: a match in the title counts the most, then the domain.
+SQLITE_WEIGHTS = "10.0, 1.0, 4.0"
+
+TERM_RE = re.compile(r"\w+")
+
+
+def create_index(schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE} ("
+            " image_id bigint PRIMARY KEY REFERENCES images_image (id)"
+            " ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {TABLE}_document ON {TABLE} USING GIN (document)"
+        )
+    else:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+            " title, description, domain, tokenize='porter unicode61')"
+        )
+
+
+def drop_index(schema_editor):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def index_images(rows):
+    """
+    Add or update index entries from `(id, title, description, url)` rows.
+    """
+    rows = [
+        (id, title, description, urlparse(url).hostname or "")
+        for id, title, description, url in rows
+    ]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (image_id, document) VALUES (%s,"
+                " setweight(to_tsvector('english', %s), 'A')"
+                " || setweight(to_tsvector('english', %s), 'C')"
+                " || setweight(to_tsvector('simple', %s), 'B'))"
+                " ON CONFLICT (image_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {TABLE} (rowid, title, description, domain)"
+                " VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+
+
+def index_image(image: Image):
+    index_images([(image.id, image.title, image.description, image.url)])
+
+
+def remove_image(image_id: int):
+    column = "image_id" if connection.vendor == "postgresql" else "rowid"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {column} = %s", [image_id])
+
+
+def clear_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+
+
+def search(query: str, after: tuple[float, int] | None = None, limit: int = 20):
+    """
+    Return `(score, image_id)` pairs matching `query`, best matches first.
+
+    Results are paginated with a keyset: pass the last pair of a page as
+    `after` to get the next one, which costs the same for every page.
+    """
+    terms = TERM_RE.findall(query)
+    if not terms:
+        return []
+
+    if connection.vendor == "postgresql":
+        sql = (
+            "SELECT * FROM (SELECT ts_rank_cd(document, query) AS score,"
+            f" image_id AS id FROM {TABLE}, websearch_to_tsquery('english', %s) query"
+            " WHERE document @@ query) results"
+        )
+        params = [query]
+    else:
+        # Quote every term, so user input can't use FTS5 query syntax, and
+        #   match the last one as a prefix for search-as-you-type.
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        # `bm25()` is lower for better matches, negate it to sort like Postgres.
+        sql = (
+            f"SELECT * FROM (SELECT -bm25({TABLE}, {SQLITE_WEIGHTS}) AS score,"
+            f" rowid AS id FROM {TABLE} WHERE {TABLE} MATCH %s) results"
+        )
+        params = [match]
+
+    if after is not None:
+        sql += " WHERE score < %s OR (score = %s AND id > %s)"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY score DESC, id LIMIT %s"
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
@@ -1,12 +1,105 @@
-from django.db.models.signals import m2m_changed
+import logging
+
+import redis
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Image
+from bookmarks.fragments import bump_versions
+from bookmarks.media_gc import queue_deletion
+from bookmarks.redis_client import r
+
+from . import live, recommendations, search
+from .models import Image, ImportJob
+
+logger = logging.getLogger(__name__)
+
+
+def changed_image_ids(instance, action, reverse, pk_set) -> list[int]:
+    """
+    Return the ids of the images whose likes an `m2m_changed` signal changed:
+    `instance` is an `Image`, or a `User` if `reverse`
+    (e.g. `user.images_liked.add(...)`).
+    """
+    if not reverse:
+        return [instance.id]
+    if action == "post_clear":
+        return instance._cleared_image_ids
+    return sorted(pk_set)
 
 
 # Define Signals receiver function (it's like an event handler).
 # `.through` refers to the intermediary table, `images.models.Image_users_like`.
 @receiver(m2m_changed, sender=Image.users_like.through)
-def users_like_changed(sender, instance: Image, **kwargs):
-    instance.total_likes = instance.users_like.count()
-    instance.save()
+def users_like_clearing(sender, instance, action, reverse, **kwargs):
+    # `post_clear` doesn't tell which images a user no longer likes.
+    if action == "pre_clear" and reverse:
+        instance._cleared_image_ids = list(
+            instance.images_liked.values_list("id", flat=True)
+        )
+
+
+@receiver(m2m_changed, sender=Image.users_like.through)
+def users_like_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # `pre_*` actions run before the change.
+    if not action.startswith("post_"):
+        return
+    ids = changed_image_ids(instance, action, reverse, pk_set)
+    images = [instance] if not reverse else Image.objects.filter(id__in=ids)
+    for image in images:
+        image.total_likes = image.users_like.count()
+        image.save(update_fields=["total_likes"])
+        try:
+            live.publish(image.id, likes=image.total_likes)
+        except redis.RedisError:
+            # Fail open: the like is saved, open pages show it on reload.
+            logger.exception("Couldn't publish the likes of image %s", image.id)
+
+
+@receiver(m2m_changed, sender=Image.users_like.through)
+def users_like_changed_similar_images(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # Queue the images for the next incremental `compute_similar_images` run.
+    if action in ("post_add", "post_remove", "post_clear"):
+        ids = changed_image_ids(instance, action, reverse, pk_set)
+        if not ids:
+            return
+        try:
+            r.sadd(recommendations.DIRTY_KEY, *ids)
+        except redis.RedisError:
+            # Fail open: the like is saved, only its neighbors are late (until
+            #   the next full run).
+            logger.exception("Couldn't queue images %s", ids)
+
+
+# Keep the search index in sync, one row at a time.
+@receiver(post_save, sender=Image)
+def image_saved(sender, instance: Image, update_fields=None, **kwargs):
+    # Saving only counters (e.g. `total_likes`) doesn't change indexed text.
+    if update_fields and not {"title", "description", "url"} & set(update_fields):
+        return
+    search.index_image(instance)
+
+
+@receiver(post_delete, sender=Image)
+def image_deleted(sender, instance: Image, **kwargs):
+    search.remove_image(instance.id)
+
+
+# Files are deleted by the `delete_media` worker, not while the request (e.g.
+#   deleting a user and all their images) waits.
+@receiver(post_delete, sender=Image)
+def image_deleted_file(sender, instance: Image, **kwargs):
+    queue_deletion(instance.image.name)
+
+
+@receiver(post_delete, sender=ImportJob)
+def import_job_deleted_file(sender, instance: ImportJob, **kwargs):
+    queue_deletion(instance.file.name)
+
+
+# Re-render the cached fragments showing the image (cards, feed items).
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def image_changed_fragments(sender, instance: Image, **kwargs):
+    bump_versions(Image, [instance.id])
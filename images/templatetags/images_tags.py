@@ -0,0 +1,78 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from images.models import Image
+from images.variants import MIME_TYPES, srcset
+
+from bookmarks.fragments import render_fragments
+from bookmarks.typing import settings
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image: Image, sizes: str, **attrs):
+    """
+    Render a `<picture>` offering the image's variants through `srcset`s, from
+    their stored metadata only (nothing is read from the storage).
+
+    e.g. `{% picture image sizes="220px" loading="lazy" %}`
+    """
+    # In order of preference, which a JSON object doesn't keep on every database.
+    formats = [
+        format
+        for format in settings.IMAGE_VARIANT_FORMATS
+        if image.variants.get(format)
+    ]
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[format], srcset(image.variants[format]), sizes)
+            for format in formats
+        ),
+    )
+    # The size sets the aspect ratio before the picture is loaded.
+    if image.width:
+        attrs = {"width": image.width, "height": image.height, **attrs}
+    elif formats:
+        largest = image.variants[formats[0]][-1]
+        attrs = {"width": largest["width"], "height": largest["height"], **attrs}
+    # Browsers without `<picture>` or any variant format get the original.
+    return format_html(
+        '<picture>{}<img src="{}"{}></picture>',
+        sources,
+        image.image.url,
+        flatatt({"alt": image.title, **placeholder_attrs(image), **attrs}),
+    )
+
+
+def placeholder_attrs(image: Image) -> dict:
+    # Shown until the picture is loaded: the dominant color right away, then
+    #   the blurhash, once decoded by the page's script.
+    attrs = {}
+    if image.dominant_color:
+        attrs["style"] = f"background-color: {image.dominant_color}"
+    if image.blurhash:
+        attrs["data-blurhash"] = image.blurhash
+    return attrs
+
+
+@register.simple_tag
+def placeholder(image: Image):
+    """
+    Render the placeholder attributes of an `<img>` of `image`.
+    """
+    return flatatt(placeholder_attrs(image))
+
+
+@register.simple_tag
+def image_cards(images):
+    """
+    Render the cards of `images`, from the fragment cache where possible.
+    """
+    cards = render_fragments(
+        "images/image/card.html", "image", images, lambda image: [(Image, image.id)]
+    )
+    return mark_safe("".join(cards))
@@ -1,3 +1,861 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import importlib
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import httpx
+import orjson
+import requests
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+from django.utils.html import escape
+from PIL import ExifTags
+from PIL import Image as PILImage
+
+from bookmarks.redis_client import r
+from bookmarks.testing import FakeRedisMixin, redis_unavailable
+from bookmarks.typing import settings
+
+from . import (
+    async_views,
+    export,
+    imports,
+    live,
+    metadata,
+    phash,
+    recommendations,
+    search,
+    urls,
+    variants,
+    viewers,
+)
+from .forms import DOWNLOAD_ERROR, IMAGE_ERROR, ImageCreateForm
+from .models import Image, ImportJob
+from .templatetags import images_tags
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def picture(size=(64, 48), color=(200, 120, 40), format="JPEG") -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", size, color).save(buffer, format)
+    return buffer.getvalue()
+
+
+def gradient(size=(64, 48), inverted=False) -> PILImage.Image:
+    """
+    A picture with some structure for `phash.dhash()` to see, unlike a plain
+    color.
+    """
+    width, height = size
+    values = [
+        (x * 255 // width + y * 3 % 17 * 7) % 256
+        for y in range(height)
+        for x in range(width)
+    ]
+    image = PILImage.new("L", size)
+    image.putdata([255 - value for value in values] if inverted else values)
+    return image.convert("RGB")
+
+
+class SearchTests(FakeRedisMixin, TestCase):
+    """
+    The index is kept in sync by the `post_save` and `post_delete` handlers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+        cls.in_title = cls.create_image("Mountain lake", "A quiet morning.")
+        cls.in_description = cls.create_image("Morning", "A lake in the mountains.")
+        cls.other = cls.create_image("City lights", "Downtown at night.")
+
+    @classmethod
+    def create_image(cls, title: str, description: str) -> Image:
+        return Image.objects.create(
+            user=cls.user,
+            title=title,
+            description=description,
+            url="https://photos.example.com/picture.jpg",
+            image="images/picture.jpg",
+        )
+
+    def ids(self, query: str, **kwargs) -> list[int]:
+        return [id for _, id in search.search(query, **kwargs)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.ids("lake"), [self.in_title.id, self.in_description.id])
+
+    def test_last_term_is_a_prefix(self):
+        self.assertEqual(self.ids("city li"), [self.other.id])
+
+    def test_matches_the_domain(self):
+        self.assertEqual(len(self.ids("photos")), 3)
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.ids('lake" OR "city'), [])
+        self.assertEqual(self.ids("***"), [])
+
+    def test_keyset_pages(self):
+        first = search.search("lake", limit=1)
+        self.assertEqual(self.ids("lake", after=first[-1]), [self.in_description.id])
+
+    def test_index_follows_changes(self):
+        self.other.title = "Lake at night"
+        self.other.save()
+        self.assertIn(self.other.id, self.ids("lake"))
+
+        self.in_title.delete()
+        self.assertNotIn(self.in_title.id, self.ids("lake"))
+
+    def test_search_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("images:search"), {"q": "mountain"})
+        self.assertContains(response, "Mountain lake")
+        self.assertNotContains(response, "City lights")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImportTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Instead of the network.
+        download = mock.patch.object(
+            imports.Fetcher, "download", return_value=picture()
+        )
+        download.start()
+        cls.addClassCleanup(download.stop)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_import_deletes_the_file_once_done(self):
+        job = ImportJob(user=User.objects.create_user("owner"))
+        job.file.save(
+            "bookmarks.csv",
+            ContentFile(
+                b"url,title\n"
+                b"https://example.com/sunset.jpg,Sunset\n"
+                b"https://example.com/page.html,Not an image\n"
+            ),
+        )
+        name = job.file.name
+
+        imports.run_import(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual((job.imported, job.skipped, job.failed), (1, 1, 0))
+        self.assertEqual(
+            list(Image.objects.values_list("title", flat=True)), ["Sunset"]
+        )
+        self.assertFalse(job.file)
+        self.assertFalse(job.file.storage.exists(name))
+
+    def create_job(self, content: bytes, **fields) -> ImportJob:
+        job = ImportJob(user=User.objects.get_or_create(username="owner")[0], **fields)
+        job.file.save("bookmarks.csv", ContentFile(content))
+        return job
+
+    def test_decompression_bomb_fails_its_row(self):
+        job = self.create_job(
+            b"https://example.com/small.jpg,Small\n"
+            b"https://example.com/bomb.jpg,Bomb\n"
+        )
+        sizes = {"small": (64, 48), "bomb": (200, 200)}
+        with mock.patch.object(
+            imports.Fetcher,
+            "download",
+            side_effect=lambda url: picture(sizes[url.split("/")[-1][:-4]]),
+        ), mock.patch.object(PILImage, "MAX_IMAGE_PIXELS", 64 * 48):
+            imports.run_import(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual((job.imported, job.skipped, job.failed), (1, 0, 1))
+        self.assertEqual(job.errors[0]["url"], "https://example.com/bomb.jpg")
+        self.assertEqual(job.errors[0]["error"], IMAGE_ERROR)
+
+    def test_view_leaves_the_import_to_the_worker(self):
+        self.client.force_login(User.objects.create_user("owner"))
+        upload = ContentFile(b"https://example.com/sunset.jpg\n", name="b.csv")
+        response = self.client.post(reverse("images:import"), {"file": upload})
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, job.get_absolute_url())
+        self.assertEqual(job.status, ImportJob.Status.PENDING)
+
+        call_command("import_bookmarks", "--worker", "--once", stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.imported, 1)
+
+    def test_worker_resumes_stale_imports(self):
+        rows = b"https://example.com/sunset.jpg\nhttps://example.com/dawn.jpg\n"
+        # Interrupted after the first row.
+        stale = self.create_job(rows, status=ImportJob.Status.RUNNING, processed=1)
+        running = self.create_job(rows, status=ImportJob.Status.RUNNING)
+        ImportJob.objects.filter(id=stale.id).update(
+            updated=timezone.now() - datetime.timedelta(minutes=11)
+        )
+
+        call_command("import_bookmarks", "--worker", "--once", stdout=io.StringIO())
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.Status.DONE)
+        self.assertEqual(stale.imported, 1)
+        running.refresh_from_db()
+        self.assertEqual(running.status, ImportJob.Status.RUNNING)
+
+
+class LikeTests(FakeRedisMixin, TestCase):
+    def test_publishes_the_new_count_once(self):
+        user = User.objects.create_user("owner")
+        image = Image.objects.create(
+            user=user, title="Sunset", url="https://example.com/sunset.jpg"
+        )
+        with mock.patch.object(live, "publish") as publish:
+            image.users_like.add(user)
+        publish.assert_called_once_with(image.id, likes=1)
+        image.refresh_from_db()
+        self.assertEqual(image.total_likes, 1)
+
+    def test_liked_while_redis_is_unavailable(self):
+        user = User.objects.create_user("owner")
+        image = Image.objects.create(
+            user=user, title="Sunset", url="https://example.com/sunset.jpg"
+        )
+        with redis_unavailable(), self.assertLogs("images.signals", "ERROR"):
+            image.users_like.add(user)
+        image.refresh_from_db()
+        self.assertEqual(image.total_likes, 1)
+
+
+class RecommendationTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}") for i in range(4)]
+        cls.images = [
+            Image.objects.create(
+                user=cls.users[0], title=title, url=f"https://example.com/{title}"
+            )
+            for title in "abcd"
+        ]
+        a, b, c, d = cls.images
+        a.users_like.add(*cls.users[:3])
+        b.users_like.add(*cls.users[:2])
+        c.users_like.add(cls.users[2])
+        d.users_like.add(cls.users[3])
+
+    def setUp(self):
+        r.flushdb()
+
+    def compute(self, *args):
+        call_command("compute_similar_images", *args, stdout=io.StringIO())
+
+    def similar(self) -> dict[str, list[str]]:
+        titles = {image.id: image.title for image in self.images}
+        return {
+            image.title: [
+                titles[id] for id in recommendations.get_similar_image_ids(image.id)
+            ]
+            for image in self.images
+        }
+
+    def test_most_similar_first(self):
+        self.compute()
+        # a~b: 2 / sqrt(3 * 2), a~c: 1 / sqrt(3 * 1), b and c share no liker.
+        self.assertEqual(
+            self.similar(), {"a": ["b", "c"], "b": ["a"], "c": ["a"], "d": []}
+        )
+
+    def test_incremental_run_matches_a_full_run(self):
+        a, b, c, d = self.images
+        self.compute()
+        self.users[3].images_liked.add(b)
+        c.users_like.remove(self.users[2])
+        self.compute("--incremental")
+        incremental = self.similar()
+
+        r.flushdb()
+        self.compute()
+        self.assertEqual(incremental, self.similar())
+        self.assertEqual(
+            incremental, {"a": ["b"], "b": ["a", "d"], "c": [], "d": ["b"]}
+        )
+
+    def test_incremental_run_only_loads_the_likes_of_likers(self):
+        a, b, c, d = self.images
+        r.sadd(recommendations.DIRTY_KEY, c.id)
+        with mock.patch.object(
+            recommendations,
+            "load_like_matrix",
+            wraps=recommendations.load_like_matrix,
+        ) as load_like_matrix:
+            self.compute("--incremental")
+        likes = load_like_matrix.call_args.args[1]
+        # Only the likes of `users[2]`, who likes `a` and `c`.
+        self.assertEqual(
+            set(likes.values_list("image_id", "user_id")),
+            {(a.id, self.users[2].id), (c.id, self.users[2].id)},
+        )
+
+    def test_reverse_changes_update_the_liked_images(self):
+        a, b, c, d = self.images
+        user = self.users[3]
+        user.images_liked.add(a, b)
+        self.assertEqual(
+            {int(id) for id in r.smembers(recommendations.DIRTY_KEY)}, {a.id, b.id}
+        )
+        a.refresh_from_db()
+        self.assertEqual(a.total_likes, 4)
+
+        r.flushdb()
+        user.images_liked.clear()
+        self.assertEqual(
+            {int(id) for id in r.smembers(recommendations.DIRTY_KEY)},
+            {a.id, b.id, d.id},
+        )
+        self.assertEqual(
+            [image.total_likes for image in Image.objects.order_by("id")],
+            [3, 2, 1, 0],
+        )
+
+
+class ViewerTests(FakeRedisMixin, SimpleTestCase):
+    # Monday to Sunday of 2026-W03.
+    week = "2026-W03"
+    monday = datetime.date(2026, 1, 12)
+
+    def setUp(self):
+        r.flushdb()
+
+    def view(self, image_id: int, viewer: str, day: datetime.date | None = None):
+        with mock.patch.object(
+            viewers.timezone, "localdate", return_value=day or self.monday
+        ):
+            return viewers.record_view(image_id, viewer)
+
+    def test_views_and_unique_viewers(self):
+        self.assertEqual(self.view(1, "alice"), (1, 1))
+        self.assertEqual(self.view(1, "alice"), (2, 1))
+        self.assertEqual(self.view(1, "bob"), (3, 2))
+        for _ in range(4):
+            self.view(2, "alice")
+        self.assertEqual(r.zrange(viewers.RANKING_KEY, 0, -1, desc=True), [b"2", b"1"])
+        self.assertEqual(
+            r.zrange(viewers.VIEWERS_RANKING_KEY, 0, -1, desc=True), [b"1", b"2"]
+        )
+
+    def test_recent_viewers_counts_the_union_of_days(self):
+        for day, viewer in [(0, "alice"), (1, "alice"), (2, "bob"), (8, "carol")]:
+            self.view(1, viewer, self.monday + datetime.timedelta(days=day))
+        with mock.patch.object(
+            viewers.timezone,
+            "localdate",
+            return_value=self.monday + datetime.timedelta(days=8),
+        ):
+            self.assertEqual(viewers.recent_viewers(1, days=7), 2)
+            self.assertEqual(viewers.recent_viewers(1, days=9), 3)
+
+    def test_rollup(self):
+        sunday = self.monday + datetime.timedelta(days=6)
+        self.view(1, "alice", self.monday)
+        self.view(1, "alice", sunday)
+        self.view(1, "bob", sunday)
+        self.view(2, "carol", sunday)
+        # The next week's.
+        self.view(1, "dave", sunday + datetime.timedelta(days=1))
+
+        for _ in range(2):
+            call_command("rollup_viewers", week=self.week, stdout=io.StringIO())
+            self.assertEqual(viewers.week_viewers(1, self.week), 2)
+            self.assertEqual(viewers.week_viewers(2, self.week), 1)
+        self.assertGreater(r.ttl(viewers.week_viewers_key(1, self.week)), 0)
+
+        with self.assertRaises(CommandError):
+            call_command("rollup_viewers", week="2026-03")
+
+
+@override_settings(LIVE_COALESCE_INTERVAL=0.01)
+class BroadcasterTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        patcher = mock.patch.object(live, "ar", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.broadcaster = live.Broadcaster()
+
+    async def asyncTearDown(self):
+        if self.broadcaster.reader:
+            self.broadcaster.reader.cancel()
+
+    async def publish(self, image_id: int, data: bytes):
+        await self.redis.publish(live.channel(image_id), data)
+
+    async def test_updates_are_coalesced(self):
+        listener = live.Listener([1])
+        await self.broadcaster.subscribe(listener)
+        await live.apublish(1, likes=1)
+        await live.apublish(1, likes=2)
+        self.assertEqual(await listener.get(timeout=1), {1: {"likes": 2}})
+
+    async def test_subscribing_again_while_unsubscribing(self):
+        first, second = live.Listener([1]), live.Listener([1])
+        await self.broadcaster.subscribe(first)
+        # Its unsubscription is still pending when the next one subscribes.
+        self.broadcaster.unsubscribe(first)
+        await self.broadcaster.subscribe(second)
+        await asyncio.gather(*self.broadcaster.tasks)
+        await live.apublish(1, likes=1)
+        self.assertEqual(await second.get(timeout=1), {1: {"likes": 1}})
+
+    async def test_reader_survives_bad_messages(self):
+        listener = live.Listener([1])
+        await self.broadcaster.subscribe(listener)
+        with self.assertLogs("images.live", "ERROR"):
+            await self.publish(1, b"not json")
+            await live.apublish(1, likes=1)
+            # After the reader's pause.
+            self.assertEqual(await listener.get(timeout=3), {1: {"likes": 1}})
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageCreateTests(FakeRedisMixin, TestCase):
+    """
+    The picture is downloaded and decoded when the form is validated: what
+    isn't one is an error of the form, not of the request.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def form(self, content=None) -> ImageCreateForm:
+        return ImageCreateForm(
+            data={"title": "Sunset", "url": "https://example.com/sunset.jpg"},
+            content=content,
+        )
+
+    def download(self, content: bytes = b"", status: int = 200):
+        response = requests.Response()
+        response.status_code = status
+        response._content = content
+        return mock.patch.object(requests, "get", return_value=response)
+
+    def test_valid_picture(self):
+        with self.download(picture()):
+            form = self.form()
+            self.assertTrue(form.is_valid())
+        image = form.save(commit=False)
+        self.assertEqual((image.width, image.height), (64, 48))
+        self.assertIsNotNone(image.phash)
+        self.assertTrue(image.image.name.startswith("images/"))
+
+    def test_not_a_picture(self):
+        form = self.form(b"<html>404 not found</html>")
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["url"], [IMAGE_ERROR])
+
+    def test_decompression_bomb(self):
+        with mock.patch.object(PILImage, "MAX_IMAGE_PIXELS", 100):
+            form = self.form(picture())
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["url"], [IMAGE_ERROR])
+
+    def test_download_errors(self):
+        with self.download(status=404):
+            form = self.form()
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["url"], [DOWNLOAD_ERROR])
+
+        with mock.patch.object(requests, "get", side_effect=requests.Timeout):
+            form = self.form()
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["url"], [DOWNLOAD_ERROR])
+
+    def test_views(self):
+        self.client.force_login(self.user)
+        data = {"title": "Sunset", "url": "https://example.com/sunset.jpg"}
+        with self.download(b"<html>404 not found</html>"):
+            response = self.client.post(reverse("images:create"), data)
+            self.assertContains(response, escape(IMAGE_ERROR))
+            response = self.client.post(
+                reverse("api:v1:image_list"), data, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Image.objects.exists())
+
+    async def test_async_view(self):
+        request = AsyncRequestFactory().post(
+            reverse("images:create"),
+            {"title": "Sunset", "url": "https://example.com/sunset.jpg"},
+        )
+        request.auser = mock.AsyncMock(return_value=self.user)
+        request.user = self.user
+        transport = httpx.MockTransport(lambda request: httpx.Response(404))
+        with mock.patch.object(
+            async_views, "http_client", httpx.AsyncClient(transport=transport)
+        ):
+            response = await async_views.image_create(request)
+        self.assertContains(response, escape(DOWNLOAD_ERROR))
+
+
+def reload_urls():
+    # The project's resolvers keep the patterns they were created with.
+    importlib.reload(urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RANKING_BY_UNIQUE_VIEWERS=False)
+class AsyncViewTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Routed as under an ASGI server.
+        overrides = override_settings(ASYNC_VIEWS=True)
+        overrides.enable()
+        reload_urls()
+
+        def restore():
+            overrides.disable()
+            reload_urls()
+
+        cls.addClassCleanup(restore)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+        cls.images = [
+            Image.objects.create(
+                user=cls.user,
+                title=title,
+                url=f"https://example.com/{title}.jpg",
+                image=ContentFile(picture(), name=f"{title}.jpg"),
+            )
+            for title in ("Sunset", "Dawn", "Dusk")
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # The async client of every module the views use.
+        self.redis = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+        for module in (async_views, live, recommendations, viewers):
+            patcher = mock.patch.object(module, "ar", self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.async_client.force_login(self.user)
+
+    async def test_create(self):
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=picture())
+        )
+        with mock.patch.object(
+            async_views, "http_client", httpx.AsyncClient(transport=transport)
+        ):
+            response = await self.async_client.post(
+                reverse("images:create"),
+                {"title": "Noon", "url": "https://example.com/noon.jpg"},
+            )
+        image = await Image.objects.aget(title="Noon")
+        self.assertRedirects(
+            response, image.get_absolute_url(), fetch_redirect_response=False
+        )
+        self.assertEqual((image.width, image.height), (64, 48))
+
+    async def test_detail(self):
+        sunset, dawn, dusk = self.images
+        await self.redis.zadd(
+            recommendations.similar_key(sunset.id), {dawn.id: 0.5, dusk.id: 0.9}
+        )
+        response = await self.async_client.get(sunset.get_absolute_url())
+        self.assertEqual(response.context["total_views"], 1)
+        self.assertEqual(response.context["similar_images"], [dusk, dawn])
+        self.assertEqual(
+            response.context["events_url"],
+            f"{reverse('images:events')}?ids={sunset.id}",
+        )
+
+    async def test_ranking(self):
+        sunset, dawn, dusk = self.images
+        await self.redis.zadd(
+            viewers.ranking_key(), {sunset.id: 2, dawn.id: 7, dusk.id: 5}
+        )
+        response = await self.async_client.get(reverse("images:ranking"))
+        self.assertEqual(
+            [(image.title, image.views) for image in response.context["most_viewed"]],
+            [("Dawn", 7), ("Dusk", 5), ("Sunset", 2)],
+        )
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    IMAGE_VARIANT_WIDTHS=[320, 640],
+    IMAGE_VARIANT_FORMATS=["avif", "webp"],
+)
+class VariantTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Whether or not this Pillow build can encode AVIF.
+        patcher = mock.patch.object(
+            variants, "available_formats", return_value=["webp"]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_widths_and_names(self):
+        file = ContentFile(picture((1000, 750)))
+        generated = variants.generate_variants(file)
+        self.assertEqual(
+            [(v["width"], v["height"]) for v in generated["webp"]],
+            [(320, 240), (640, 480)],
+        )
+        for variant in generated["webp"]:
+            self.assertRegex(variant["name"], r"^variants/\w\w/\w{16}_\d+w\.webp$")
+            with default_storage.open(variant["name"]) as stored:
+                self.assertEqual(PILImage.open(stored).width, variant["width"])
+        # Named by content: the same picture gets the same variants.
+        self.assertEqual(variants.generate_variants(file), generated)
+
+    def test_narrow_pictures_are_not_upscaled(self):
+        generated = variants.generate_variants(ContentFile(picture((200, 100))))
+        self.assertEqual(
+            [(v["width"], v["height"]) for v in generated["webp"]], [(200, 100)]
+        )
+
+    def test_picture_srcset(self):
+        image = Image(
+            title="Sunset",
+            image="images/sunset.jpg",
+            width=1000,
+            height=750,
+            variants={
+                "webp": [
+                    {"width": 320, "height": 240, "name": "variants/ab/ab_320w.webp"},
+                    {"width": 640, "height": 480, "name": "variants/ab/ab_640w.webp"},
+                ],
+                "avif": [
+                    {"width": 320, "height": 240, "name": "variants/ab/ab_320w.avif"}
+                ],
+            },
+        )
+        self.assertHTMLEqual(
+            images_tags.picture(image, sizes="300px", loading="lazy"),
+            "<picture>"
+            '<source type="image/avif" srcset="/media/variants/ab/ab_320w.avif 320w"'
+            ' sizes="300px">'
+            '<source type="image/webp" srcset="/media/variants/ab/ab_320w.webp 320w,'
+            ' /media/variants/ab/ab_640w.webp 640w" sizes="300px">'
+            '<img src="/media/images/sunset.jpg" alt="Sunset" width="1000"'
+            ' height="750" loading="lazy">'
+            "</picture>",
+        )
+
+
+class MetadataTests(SimpleTestCase):
+    def extract(self, picture: PILImage.Image, format="PNG", **params) -> dict:
+        buffer = io.BytesIO()
+        picture.save(buffer, format, **params)
+        return metadata.extract_metadata(ContentFile(buffer.getvalue()))
+
+    def test_known_picture(self):
+        # Green over the top rows, then red on the left and blue on the right.
+        picture = PILImage.new("RGB", (64, 48), (255, 0, 0))
+        picture.paste((0, 0, 255), (32, 0, 64, 48))
+        picture.paste((0, 200, 0), (0, 0, 64, 20))
+        self.assertEqual(
+            self.extract(picture),
+            {
+                "width": 64,
+                "height": 48,
+                "format": "PNG",
+                "file_size": mock.ANY,
+                "orientation": 1,
+                "dominant_color": "#00c800",
+                # As encoded by the reference implementation.
+                "blurhash": "L#G[c_|mn~J;8eFha}w@KsOGa}oI",
+            },
+        )
+
+    def test_exif_orientation(self):
+        exif = PILImage.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        extracted = self.extract(gradient((64, 48)), "JPEG", exif=exif)
+        self.assertEqual(
+            (extracted["width"], extracted["height"], extracted["orientation"]),
+            (48, 64, 6),
+        )
+
+    def test_dominant_color_of_opaque_pixels(self):
+        picture = PILImage.new("RGBA", (64, 48), (255, 0, 0, 0))
+        picture.paste((0, 0, 255, 255), (0, 0, 16, 16))
+        self.assertEqual(self.extract(picture)["dominant_color"], "#0000ff")
+
+
+# The async stream reads the rows from a thread (and connection) of its own.
+@override_settings(EXPORT_FILE_CHUNK_SIZE=256)
+class ExportTests(FakeRedisMixin, TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user("owner")
+        self.images = []
+        # Same file names in different directories, and a missing file.
+        for directory, title in [("a", "Sunset"), ("b", "Dawn"), ("c", "Lost")]:
+            name = default_storage.save(
+                f"images/{directory}/photo.jpg", ContentFile(picture((64, 48)))
+            )
+            self.images.append(
+                Image.objects.create(
+                    user=self.user,
+                    title=title,
+                    url=f"https://example.com/{title}.jpg",
+                    image=name,
+                )
+            )
+        default_storage.delete(self.images[2].image.name)
+        Image.objects.create(
+            user=User.objects.create_user("other"),
+            title="Other",
+            url="https://example.com/other.jpg",
+            image="images/a/photo.jpg",
+        )
+
+    def check_archive(self, blocks: list[bytes]):
+        # Streamed in blocks, not built whole.
+        self.assertGreater(len(blocks), 2)
+        with zipfile.ZipFile(io.BytesIO(b"".join(blocks))) as archive:
+            self.assertIsNone(archive.testzip())
+            sunset, dawn, lost = self.images
+            self.assertEqual(
+                archive.namelist(),
+                [
+                    f"images/{sunset.id}-photo.jpg",
+                    f"images/{dawn.id}-photo.jpg",
+                    "bookmarks.ndjson",
+                ],
+            )
+            for image in (sunset, dawn):
+                with default_storage.open(image.image.name) as file:
+                    self.assertEqual(
+                        archive.read(f"images/{image.id}-photo.jpg"), file.read()
+                    )
+            rows = [
+                orjson.loads(line)
+                for line in archive.read("bookmarks.ndjson").splitlines()
+            ]
+        self.assertEqual(
+            [(row["id"], row["title"], row["file"]) for row in rows],
+            [
+                (sunset.id, "Sunset", f"images/{sunset.id}-photo.jpg"),
+                (dawn.id, "Dawn", f"images/{dawn.id}-photo.jpg"),
+                (lost.id, "Lost", None),
+            ],
+        )
+        self.assertEqual(set(rows[0]), {*export.METADATA_FIELDS, "file"})
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("images:export"))
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertRegex(
+            response["Content-Disposition"],
+            r'^attachment; filename="bookmarks-owner-\d{4}-\d\d-\d\d\.zip"$',
+        )
+        self.check_archive(list(response.streaming_content))
+
+    async def test_async_stream(self):
+        blocks = [block async for block in export.astream_archive(self.user)]
+        self.check_archive(blocks)
+
+
+class NearDuplicateTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+        cls.value = 0x0123456789ABCDEF
+
+    def create_image(self, bits: list[int]) -> Image:
+        value = self.value
+        for bit in bits:
+            value ^= 1 << bit
+        image = Image(user=self.user, title=str(bits), url="https://example.com/a.jpg")
+        phash.set_hash(image, value)
+        image.save()
+        return image
+
+    def test_distance_threshold(self):
+        same = self.create_image([])
+        # Spread over the blocks: none of them is within 0 bits, one is within
+        #   1 bit, as the lookup of a distance of 6 expects at most.
+        six = self.create_image([0, 1, 16, 17, 32, 48])
+        seven = self.create_image([0, 1, 16, 17, 32, 33, 48])
+        three = self.create_image([63, 62, 61])
+        matches = phash.find_near_duplicates(self.value, 6)
+        self.assertEqual(
+            [(distance, image.id) for distance, image in matches],
+            [(0, same.id), (3, three.id), (6, six.id)],
+        )
+        self.assertNotIn(seven.id, [image.id for _, image in matches])
+        self.assertEqual(
+            phash.find_near_duplicates(self.value, 6, exclude_id=same.id)[0][1], three
+        )
+
+    def test_dhash_survives_resizing(self):
+        original = phash.dhash(gradient((640, 480)))
+        self.assertLessEqual(
+            phash.hamming(original, phash.dhash(gradient((320, 240)))), 6
+        )
+        self.assertGreater(
+            phash.hamming(original, phash.dhash(gradient((640, 480), inverted=True))),
+            6,
+        )
+
+    def test_bk_tree_matches_a_linear_scan(self):
+        values = [self.value ^ (0x1F << shift) for shift in range(0, 60, 3)]
+        tree = phash.BKTree()
+        for value in values:
+            tree.add(value, value)
+        for query in values[:5]:
+            with self.subTest(query=query):
+                expected = sorted(
+                    (phash.hamming(query, value), value)
+                    for value in values
+                    if phash.hamming(query, value) <= 6
+                )
+                self.assertEqual(sorted(tree.search(query, 6)), expected)
@@ -1,13 +1,32 @@
 from django.urls import path
 
+from bookmarks.typing import settings
+
 from . import views
 
 app_name = "images"
 
+# Views with a native async version, used under an ASGI server. Only imported
+#   then, with the HTTP client they need.
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    io_views = async_views
+else:
+    io_views = views
+
 urlpatterns = [
-    path("create/", views.image_create, name="create"),
-    path("detail/<int:id>/<slug:slug>/", views.image_detail, name="detail"),
+    path("create/", io_views.image_create, name="create"),
+    path("detail/<int:id>/<slug:slug>/", io_views.image_detail, name="detail"),
     path("like/", views.image_like, name="like"),
     path("", views.image_list, name="list"),
-    path("ranking/", views.image_ranking, name="ranking"),
+    path("ranking/", io_views.image_ranking, name="ranking"),
+    path("search/", views.image_search, name="search"),
+    path("import/", views.image_import, name="import"),
+    path("import/<int:id>/", views.image_import_detail, name="import_detail"),
+    path("export/", io_views.image_export, name="export"),
 ]
+
+if settings.ASYNC_VIEWS:
+    # Streams stay open, which only an ASGI server can afford.
+    urlpatterns.append(path("events/", async_views.image_events, name="events"))
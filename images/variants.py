@@ -0,0 +1,96 @@
+import hashlib
+import io
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+from bookmarks.media import VARIANT_NAME_RE
+from bookmarks.typing import settings
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def available_formats() -> list[str]:
+    """
+    Return the configured variant formats this Pillow build can encode (AVIF
+    needs Pillow >= 11.2 built with libavif).
+    """
+    PILImage.init()
+    return [
+        format
+        for format in settings.IMAGE_VARIANT_FORMATS
+        if format.upper() in PILImage.SAVE
+    ]
+
+
+def variant_widths(width: int) -> list[int]:
+    # Never upscale: pictures narrower than every width get a single variant
+    #   at their own width.
+    return [w for w in settings.IMAGE_VARIANT_WIDTHS if w < width] or [width]
+
+
+def generate_variants(file: File) -> dict[str, list[dict]]:
+    """
+    Encode resized copies of the picture in `file` in every available format,
+    save them to the default storage and return their metadata, e.g.
+    `{"webp": [{"width": 320, "height": 240, "name": "variants/..."}, ...]}`,
+    widths ascending.
+    """
+    file.seek(0)
+    # Content-addressed names, the same picture always gets the same variants
+    #   and their URLs can be cached as immutable.
+    digest = hashlib.sha256(file.read()).hexdigest()[:16]
+    file.seek(0)
+
+    formats = available_formats()
+    variants = {format: [] for format in formats}
+    with PILImage.open(file) as picture:
+        # Let the JPEG decoder downscale while decoding, to about the largest
+        #   variant.
+        largest = max(settings.IMAGE_VARIANT_WIDTHS)
+        picture.draft("RGB", (largest, largest))
+        # Apply the EXIF orientation, the variants carry no EXIF data.
+        picture = ImageOps.exif_transpose(picture)
+        has_alpha = picture.mode in ("RGBA", "LA") or "transparency" in picture.info
+        picture = picture.convert("RGBA" if has_alpha else "RGB")
+
+        # Largest first, each variant downscaled from the previous one.
+        source = picture
+        for width in reversed(variant_widths(picture.width)):
+            height = max(1, round(picture.height * width / picture.width))
+            source = source.resize((width, height), PILImage.Resampling.LANCZOS)
+            for format in formats:
+                buffer = io.BytesIO()
+                source.save(
+                    buffer,
+                    format.upper(),
+                    quality=settings.IMAGE_VARIANT_QUALITY[format],
+                )
+                name = f"variants/{digest[:2]}/{digest}_{width}w.{format}"
+                if not default_storage.exists(name):
+                    name = default_storage.save(name, ContentFile(buffer.getvalue()))
+                variants[format].insert(
+                    0, {"width": width, "height": height, "name": name}
+                )
+    file.seek(0)
+    return variants
+
+
+def srcset(variants: list[dict]) -> str:
+    return ", ".join(
+        f"{default_storage.url(variant['name'])} {variant['width']}w"
+        for variant in variants
+    )
+
+
+def variants_digest(variants: dict[str, list[dict]]) -> str:
+    """
+    Return the content hash the names of `variants` start with (all of them,
+    they're variants of one picture), or `""` if there are none.
+    """
+    for format_variants in variants.values():
+        for variant in format_variants:
+            return VARIANT_NAME_RE.match(variant["name"])["digest"]
+    return ""
@@ -0,0 +1,166 @@
+"""
+View counters of images: raw views, and unique viewers estimated with Redis
+HyperLogLogs (`PFADD`/`PFCOUNT`).
+
+A HyperLogLog takes at most about 12 KB however many viewers it counts, and
+estimates within 0.81% (standard error), where an exact set would grow with
+every viewer. Each image has an all-time one, one per day (kept
+`VIEWERS_DAYS_KEPT` days) and one per week, merged from the days by the
+`rollup_viewers` command (kept `VIEWERS_WEEKS_KEPT` weeks).
+"""
+
+import datetime
+
+from django.http import HttpRequest
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from bookmarks.ratelimit import get_client_ip
+from bookmarks.redis_client import ar, r
+from bookmarks.typing import settings
+
+# Image ids scored by raw views, and by unique viewers.
+RANKING_KEY = "image_ranking"
+VIEWERS_RANKING_KEY = "image_ranking:viewers"
+
+
+def views_key(image_id: int) -> str:
+    return f"image:{image_id}:views"
+
+
+def viewers_key(image_id: int, day: datetime.date | None = None) -> str:
+    if day is None:
+        return f"image:{image_id}:viewers"
+    return f"image:{image_id}:viewers:{day.isoformat()}"
+
+
+def week_viewers_key(image_id: int, week: str) -> str:
+    return f"image:{image_id}:viewers:{week}"
+
+
+def viewed_images_key(day: datetime.date) -> str:
+    # The ids of the images viewed that day, for the rollup.
+    return f"viewed_images:{day.isoformat()}"
+
+
+def iso_week(day: datetime.date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def week_days(week: str) -> list[datetime.date]:
+    """
+    Return the days, Monday to Sunday, of an ISO week such as `"2024-W07"`.
+    """
+    monday = datetime.datetime.strptime(f"{week}-1", "%G-W%V-%u").date()
+    return [monday + datetime.timedelta(days=i) for i in range(7)]
+
+
+def viewer_id(request: HttpRequest) -> str:
+    """
+    Identify the viewer of a page: users by id, anonymous visitors by session
+    or, without one, by IP address. Session keys and addresses are hashed
+    (keyed with `SECRET_KEY`), so they're never stored.
+    """
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return anonymous_viewer_id(request)
+
+
+async def aviewer_id(request: HttpRequest) -> str:
+    user = await request.auser()
+    if user.is_authenticated:
+        return f"user:{user.pk}"
+    return anonymous_viewer_id(request)
+
+
+def anonymous_viewer_id(request: HttpRequest) -> str:
+    # The key sent by the browser, the session itself isn't loaded.
+    session_key = request.session.session_key
+    if session_key:
+        value = f"session:{session_key}"
+    else:
+        value = f"ip:{get_client_ip(request)}"
+    return salted_hmac("images.viewers", value).hexdigest()[:16]
+
+
+def queue_view(pipe, image_id: int, viewer: str):
+    # Queued on a sync or an async pipeline, see `record_view()`.
+    today = timezone.localdate()
+    return (
+        pipe.incr(views_key(image_id))
+        .zincrby(RANKING_KEY, 1, image_id)
+        .pfadd(viewers_key(image_id), viewer)
+        .pfcount(viewers_key(image_id))
+        .pfadd(viewers_key(image_id, today), viewer)
+        .expire(viewers_key(image_id, today), settings.VIEWERS_DAYS_KEPT * 86400)
+        .sadd(viewed_images_key(today), image_id)
+        .expire(viewed_images_key(today), settings.VIEWERS_DAYS_KEPT * 86400)
+    )
+
+
+def record_view(image_id: int, viewer: str) -> tuple[int, int]:
+    """
+    Count a view of an image by `viewer` (see `viewer_id()`) and return the
+    image's total views and unique viewers.
+    """
+    total_views, _, changed, total_viewers, *_ = queue_view(
+        r.pipeline(transaction=False), image_id, viewer
+    ).execute()
+    # `PFADD` only reports a change for a (probably) new viewer, the ranking
+    #   isn't written on every view. `gt`: never lowered by a slower request.
+    if changed:
+        r.zadd(VIEWERS_RANKING_KEY, {image_id: total_viewers}, gt=True)
+    return total_views, total_viewers
+
+
+async def arecord_view(image_id: int, viewer: str) -> tuple[int, int]:
+    total_views, _, changed, total_viewers, *_ = await queue_view(
+        ar.pipeline(transaction=False), image_id, viewer
+    ).execute()
+    if changed:
+        await ar.zadd(VIEWERS_RANKING_KEY, {image_id: total_viewers}, gt=True)
+    return total_views, total_viewers
+
+
+def ranking_key() -> str:
+    if settings.RANKING_BY_UNIQUE_VIEWERS:
+        return VIEWERS_RANKING_KEY
+    return RANKING_KEY
+
+
+def recent_viewers(image_id: int, days: int = 7) -> int:
+    """
+    Estimate the unique viewers of an image over the last `days` days.
+    """
+    today = timezone.localdate()
+    keys = [
+        viewers_key(image_id, today - datetime.timedelta(days=i)) for i in range(days)
+    ]
+    # `PFCOUNT` of several keys counts their union, without storing it.
+    return r.pfcount(*keys)
+
+
+def week_viewers(image_id: int, week: str) -> int:
+    # Only after the week was rolled up.
+    return r.pfcount(week_viewers_key(image_id, week))
+
+
+def rollup_week(week: str, batch_size: int = 1000) -> int:
+    """
+    Merge the daily unique viewers of every image viewed during `week` (see
+    `week_days()`) into its weekly HyperLogLog. Merging again is harmless, the
+    weekly one is part of the union. Return the number of images.
+    """
+    days = week_days(week)
+    image_ids = r.sunion([viewed_images_key(day) for day in days])
+    pipe = r.pipeline(transaction=False)
+    for i, image_id in enumerate(image_ids, 1):
+        image_id = int(image_id)
+        key = week_viewers_key(image_id, week)
+        pipe.pfmerge(key, *(viewers_key(image_id, day) for day in days))
+        pipe.expire(key, settings.VIEWERS_WEEKS_KEPT * 7 * 86400)
+        if i % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+    return len(image_ids)
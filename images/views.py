@@ -1,22 +1,65 @@
-import redis
 from actions.utils import create_action
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import AbstractUser
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.http.request import HttpRequest
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.http import content_disposition_header
 from django.views.decorators.http import require_POST
 
+from bookmarks.redis_client import r
 from bookmarks.typing import settings
 
-from .forms import ImageCreateForm
-from .models import Image
+from . import export, live, phash, recommendations, search, viewers
+from .forms import ImageCreateForm, ImportJobForm
+from .models import Image, ImportJob
 
-# Connect to redis
-r = redis.Redis(
-    host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB
-)
+SEARCH_PAGE_SIZE = 24
+
+
+def near_duplicates(image: Image) -> list[Image]:
+    if image.phash is None:
+        return []
+    matches = phash.find_near_duplicates(
+        phash.to_unsigned(image.phash),
+        settings.NEAR_DUPLICATE_DISTANCE,
+        exclude_id=image.id,
+    )
+    return [duplicate for _, duplicate in matches]
+
+
+def similar_images(image: Image) -> list[Image]:
+    # Neighbors are precomputed by `compute_similar_images`.
+    ids = recommendations.get_similar_image_ids(image.id)
+    images_by_id = Image.objects.in_bulk(ids)
+    return [images_by_id[id] for id in ids if id in images_by_id]
+
+
+def create_image(request: HttpRequest, form: ImageCreateForm) -> Image:
+    """
+    Save a valid `ImageCreateForm` as a new image of the current user.
+    """
+    new_image = form.save(commit=False)
+    # Assign current user to the object.
+    new_image.user = request.user
+    new_image.save()
+    create_action(request.user, "bookmarked image", new_image)
+    messages.success(request, "Image added successfully")
+    duplicates = near_duplicates(new_image)
+    if duplicates:
+        messages.info(
+            request,
+            format_html(
+                'This image was already bookmarked as <a href="{}">{}</a>.',
+                duplicates[0].get_absolute_url(),
+                duplicates[0].title,
+            ),
+        )
+    return new_image
 
 
 @login_required
@@ -26,18 +69,13 @@ def image_create(request: HttpRequest):
         form = ImageCreateForm(data=request.POST)
         if form.is_valid():
             # form data is valid
-            cd = form.cleaned_data
-            new_image = form.save(commit=False)
-            # Assign current user to the object.
-            new_image.user = request.user
-            new_image.save()
-            create_action(request.user, "bookmarked image", new_image)
-            messages.success(request, "Image added successfully")
+            new_image = create_image(request, form)
             # Redirect to new created item detail view.
             return redirect(new_image.get_absolute_url())
     else:
-        # Build form with data provided by the bookmarklet via GET.
-        form = ImageCreateForm(data=request.GET)
+        # Build form with data provided by the bookmarklet via GET. Unbound:
+        #   validating it would download the image.
+        form = ImageCreateForm(initial=request.GET.dict())
 
     return render(
         request, "images/image/create.html", {"section": "images", "form": form}
@@ -46,14 +84,22 @@ def image_create(request: HttpRequest):
 
 def image_detail(request, id, slug):
     image = get_object_or_404(Image, id=id, slug=slug)
-    # Increment total image views by 1.
-    total_views = r.incr(f"image:{image.id}:views")
-    # Increment image ranking by 1.
-    r.zincrby("image_ranking", 1, image.id)
+    # Count the view, and the viewer if new, and update the rankings.
+    total_views, total_viewers = viewers.record_view(
+        image.id, viewers.viewer_id(request)
+    )
+    live.publish(image.id, views=total_views)
     return render(
         request,
         "images/image/detail.html",
-        {"section": "images", "image": image, "total_views": total_views},
+        {
+            "section": "images",
+            "image": image,
+            "total_views": total_views,
+            "total_viewers": total_viewers,
+            "near_duplicates": near_duplicates(image),
+            "similar_images": similar_images(image),
+        },
     )
 
 
@@ -115,7 +161,7 @@ def image_ranking(request):
     # `start=0` specifies the lowest score. `end=-1` specifies the highest score.
     #   Range of 0 to -1 returns all elements.
     image_ranking_list: list[tuple[bytes, int]] = r.zrange(
-        "image_ranking",
+        viewers.ranking_key(),
         start=0,
         end=-1,
         desc=True,
@@ -135,5 +181,92 @@ def image_ranking(request):
     return render(
         request,
         "images/image/ranking.html",
-        {"section": "images", "most_viewed": most_viewed},
+        {
+            "section": "images",
+            "most_viewed": most_viewed,
+            "by_viewers": settings.RANKING_BY_UNIQUE_VIEWERS,
+        },
+    )
+
+
+@login_required
+def image_search(request: HttpRequest):
+    query = request.GET.get("q", "").strip()
+    # Keyset cursor, `<score>_<id>` of the last result of the previous page.
+    after = None
+    try:
+        score, id = request.GET["after"].rsplit("_", 1)
+        after = (float(score), int(id))
+    except (KeyError, ValueError):
+        pass
+
+    results = search.search(query, after=after, limit=SEARCH_PAGE_SIZE)
+    images_by_id = Image.objects.in_bulk([id for _, id in results])
+    # Keep the ranking order (and skip images deleted since being indexed).
+    images = [images_by_id[id] for _, id in results if id in images_by_id]
+    next_cursor = None
+    if len(results) == SEARCH_PAGE_SIZE:
+        score, id = results[-1]
+        next_cursor = f"{score!r}_{id}"
+
+    return render(
+        request,
+        "images/image/search.html",
+        {
+            "section": "images",
+            "query": query,
+            "images": images,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+@login_required
+def image_import(request: HttpRequest):
+    if request.method == "POST":
+        form = ImportJobForm(request.POST, request.FILES)
+        if form.is_valid():
+            job = form.save(commit=False)
+            job.user = request.user
+            # Pending, until the `import_bookmarks --worker` process takes it:
+            #   web workers are neither tied up by imports nor lose them when
+            #   they restart.
+            job.save()
+            return redirect(job.get_absolute_url())
+    else:
+        form = ImportJobForm()
+
+    return render(
+        request,
+        "images/image/import.html",
+        {
+            "section": "images",
+            "form": form,
+            "jobs": request.user.import_jobs.all()[:10],
+        },
+    )
+
+
+@login_required
+def image_import_detail(request: HttpRequest, id: int):
+    job = get_object_or_404(ImportJob, id=id, user=request.user)
+    return render(
+        request,
+        "images/image/import_detail.html",
+        {"section": "images", "job": job},
+    )
+
+
+def export_headers(user: AbstractUser) -> dict:
+    filename = f"bookmarks-{user.username}-{timezone.localdate():%Y-%m-%d}.zip"
+    return {"Content-Disposition": content_disposition_header(True, filename)}
+
+
+@login_required
+def image_export(request: HttpRequest):
+    # Generated while it's sent (see `images.export`).
+    return StreamingHttpResponse(
+        export.stream_archive(request.user),
+        content_type="application/zip",
+        headers=export_headers(request.user),
     )
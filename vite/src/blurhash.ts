@@ -0,0 +1,101 @@
+// Decodes the blurhash placeholders of images (https://blurha.sh), encoded
+//   at ingest by `images.metadata.blurhash`.
+
+const BASE83 =
+  "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~";
+// Placeholders are decoded at this size, and stretched over the image.
+const SIZE = 32;
+
+const decode83 = (value: string) =>
+  [...value].reduce((total, char) => total * 83 + BASE83.indexOf(char), 0);
+
+const sRGBToLinear = (value: number) => {
+  const v = value / 255;
+  return v <= 0.04045 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4);
+};
+
+const linearToSRGB = (value: number) => {
+  const v = Math.max(0, Math.min(1, value));
+  return v <= 0.0031308
+    ? Math.trunc(v * 12.92 * 255 + 0.5)
+    : Math.trunc((1.055 * Math.pow(v, 1 / 2.4) - 0.055) * 255 + 0.5);
+};
+
+const signPow = (value: number, exponent: number) =>
+  Math.sign(value) * Math.pow(Math.abs(value), exponent);
+
+export const decodeBlurhash = (
+  hash: string,
+  width: number,
+  height: number
+): Uint8ClampedArray => {
+  const sizeFlag = decode83(hash[0]);
+  const numX = (sizeFlag % 9) + 1;
+  const numY = Math.floor(sizeFlag / 9) + 1;
+  const maxValue = (decode83(hash[1]) + 1) / 166;
+
+  const colors: number[][] = [];
+  for (let i = 0; i < numX * numY; i++) {
+    if (i === 0) {
+      const value = decode83(hash.substring(2, 6));
+      colors.push(
+        [value >> 16, (value >> 8) & 255, value & 255].map(sRGBToLinear)
+      );
+    } else {
+      const value = decode83(hash.substring(4 + i * 2, 6 + i * 2));
+      colors.push(
+        [Math.floor(value / 361), Math.floor(value / 19) % 19, value % 19].map(
+          (quantized) => signPow((quantized - 9) / 9, 2) * maxValue
+        )
+      );
+    }
+  }
+
+  const pixels = new Uint8ClampedArray(width * height * 4);
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      let [r, g, b] = [0, 0, 0];
+      for (let j = 0; j < numY; j++) {
+        for (let i = 0; i < numX; i++) {
+          const basis =
+            Math.cos((Math.PI * x * i) / width) *
+            Math.cos((Math.PI * y * j) / height);
+          const color = colors[i + j * numX];
+          r += color[0] * basis;
+          g += color[1] * basis;
+          b += color[2] * basis;
+        }
+      }
+      const index = 4 * (x + y * width);
+      pixels[index] = linearToSRGB(r);
+      pixels[index + 1] = linearToSRGB(g);
+      pixels[index + 2] = linearToSRGB(b);
+      pixels[index + 3] = 255;
+    }
+  }
+  return pixels;
+};
+
+// Paint the placeholders of the images in `root` that are still loading, as
+//   their background (which the loaded picture covers).
+export const paintPlaceholders = (root: ParentNode = document) => {
+  const canvas = document.createElement("canvas");
+  canvas.width = SIZE;
+  canvas.height = SIZE;
+  const context = canvas.getContext("2d")!;
+
+  root
+    .querySelectorAll<HTMLImageElement>("img[data-blurhash]")
+    .forEach((img) => {
+      const hash = img.dataset.blurhash!;
+      delete img.dataset.blurhash;
+      if (img.complete) {
+        return; // Already loaded (e.g. from the browser's cache).
+      }
+      const imageData = context.createImageData(SIZE, SIZE);
+      imageData.data.set(decodeBlurhash(hash, SIZE, SIZE));
+      context.putImageData(imageData, 0, 0);
+      img.style.backgroundImage = `url(${canvas.toDataURL()})`;
+      img.style.backgroundSize = "100% 100%";
+    });
+};
@@ -1,10 +1,15 @@
 import { onDomReady } from "./base";
-import { SimpleResponse } from "./types";
+import { paintPlaceholders } from "./blurhash";
+import { ImageCounts, SimpleResponse } from "./types";
 
 onDomReady(({ csrfToken }) => {
+  paintPlaceholders();
+
   const templateData =
     document.querySelector<HTMLDivElement>(".template-data")!.dataset;
   const url = templateData.url!;
+  // Only set when the server runs the async views (see `ASYNC_VIEWS`).
+  const eventsUrl = templateData.eventsUrl;
 
   const options: RequestInit = {
     method: "POST",
@@ -12,6 +17,27 @@ onDomReady(({ csrfToken }) => {
     mode: "same-origin", // Indicates the request is made to the same origin.
   };
 
+  const likeCount = document.querySelector(
+    "span.count .total"
+  ) as HTMLSpanElement;
+  const viewCount = document.querySelector(
+    "span.count .views"
+  ) as HTMLSpanElement;
+
+  if (eventsUrl) {
+    // Live counts, from everyone's likes and views.
+    const events = new EventSource(eventsUrl);
+    events.addEventListener("counts", (e) => {
+      const counts: ImageCounts = JSON.parse((e as MessageEvent).data);
+      if (counts.likes !== undefined) {
+        likeCount.textContent = counts.likes.toString();
+      }
+      if (counts.views !== undefined) {
+        viewCount.textContent = counts.views.toString();
+      }
+    });
+  }
+
   const likeButton = document.querySelector("a.like") as HTMLAnchorElement;
   likeButton.addEventListener("click", async (e) => {
     e.preventDefault();
@@ -33,10 +59,10 @@ onDomReady(({ csrfToken }) => {
       likeButton.dataset.action = action;
       likeButton.textContent = action;
 
-      // Update like count.
-      const likeCount = document.querySelector(
-        "span.count .total"
-      ) as HTMLSpanElement;
+      // Update like count, unless pushed by the server.
+      if (eventsUrl) {
+        return;
+      }
       const totalLikes = parseInt(likeCount.innerText);
       likeCount.textContent = (
         previousAction === "like" ? totalLikes + 1 : totalLikes - 1
@@ -1,6 +1,9 @@
 import { onDomReady } from "./base";
+import { paintPlaceholders } from "./blurhash";
 
 onDomReady(() => {
+  paintPlaceholders();
+
   let page = 1;
   let emptyPage = false;
   // Prevents sending additional requests while an request is in progress.
@@ -23,6 +26,7 @@ onDomReady(() => {
           "image-list"
         ) as HTMLDivElement;
         imageList.insertAdjacentHTML("beforeend", htmlText); // Parses and inserts.
+        paintPlaceholders(imageList);
         blockRequest = false;
       }
     }
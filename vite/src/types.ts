@@ -1,3 +1,10 @@
 export type SimpleResponse = {
   status: "ok" | "error";
 };
+
+// Pushed by the `images:events` stream, with the counters that changed.
+export type ImageCounts = {
+  id: number;
+  likes?: number;
+  views?: number;
+};
@@ -1,7 +1,10 @@
 import { onDomReady } from "./base";
+import { paintPlaceholders } from "./blurhash";
 import { SimpleResponse } from "./types";
 
 onDomReady(({ csrfToken }) => {
+  paintPlaceholders();
+
   const templateData =
     document.querySelector<HTMLDivElement>(".template-data")!.dataset;
   const url = templateData.url!;